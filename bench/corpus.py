@@ -0,0 +1,111 @@
+'''
+ Synthetic Rimu document generator.
+
+ Documents are generated from a seeded random number generator so the same
+ seed, size and parameters always generate the same document.
+'''
+
+import random
+from typing import List
+
+WORDS = ('lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore '
+         'et dolore magna aliqua enim ad minim veniam quis nostrud exercitation ullamco laboris nisi aliquip '
+         'ex ea commodo consequat duis aute irure in reprehenderit voluptate velit esse cillum eu fugiat nulla '
+         'pariatur excepteur sint occaecat cupidatat non proident sunt culpa qui officia deserunt mollit anim '
+         'id est laborum').split()
+QUOTES = ['*', '_', '`', '**', '__', '~~', '"']
+LIST_MARKERS = ['-', '*', '**', '***', '+', '++', '+++', '1.', '..', '...']
+
+
+class Parameters:
+    '''Document generation parameters.'''
+    paragraphLength: int  # Mean number of words per paragraph.
+    quoteDensity: float  # Fraction of words that are quoted.
+    linkDensity: float  # Fraction of words that are links (or macro invocations if there are macros).
+    listDepth: int  # Maximum list nesting depth (0 for no lists).
+    macroCount: int  # Number of macro definitions.
+    blockDepth: int  # Maximum delimited block nesting depth (0 for no delimited blocks).
+
+    def __init__(self, paragraphLength: int = 40, quoteDensity: float = 0.05, linkDensity: float = 0.02,
+                 listDepth: int = 2, macroCount: int = 10, blockDepth: int = 1):
+        self.paragraphLength = paragraphLength
+        self.quoteDensity = quoteDensity
+        self.linkDensity = linkDensity
+        self.listDepth = listDepth
+        self.macroCount = macroCount
+        self.blockDepth = blockDepth
+
+
+def generate(size: int, seed: int = 1, params: Parameters = Parameters()) -> str:
+    '''Return a document of at least `size` characters.'''
+    rng = random.Random(seed)
+    result: List[str] = []
+    length = 0
+    for n in range(params.macroCount):
+        result.append(f"{{macro{n}}}='{text(rng, params, 4, macros=False)}'")
+    section = 0
+    while length < size:
+        section += 1
+        blocks = [f'## Section {section}', paragraph(rng, params)]
+        if params.listDepth > 0:
+            blocks.append(itemList(rng, params))
+        if params.blockDepth > 0:
+            blocks.append(delimitedBlock(rng, params, rng.randint(1, params.blockDepth)))
+        blocks.append(paragraph(rng, params))
+        result.extend(blocks)
+        length += sum(len(block) + 2 for block in blocks)
+    return '\n\n'.join(result) + '\n'
+
+
+def text(rng: random.Random, params: Parameters, count: int, macros: bool = True) -> str:
+    '''Return `count` words of inline text with quotes, links and (optionally) macro invocations.'''
+    words = []
+    for _ in range(count):
+        word = rng.choice(WORDS)
+        r = rng.random()
+        if r < params.quoteDensity:
+            quote = rng.choice(QUOTES)
+            word = quote + word + quote
+        elif r < params.quoteDensity + params.linkDensity:
+            if macros and params.macroCount > 0 and rng.random() < 0.5:
+                word = f'{{macro{rng.randrange(params.macroCount)}}}'
+            else:
+                word = f'<https://example.com/{word}|{word}>'
+        words.append(word)
+    return ' '.join(words)
+
+
+def paragraph(rng: random.Random, params: Parameters) -> str:
+    '''Return a paragraph with lines of up to 12 words.'''
+    count = max(1, int(rng.gauss(params.paragraphLength, params.paragraphLength / 4)))
+    lines = []
+    while count > 0:
+        lines.append(text(rng, params, min(count, 12)))
+        count -= 12
+    return '\n'.join(lines)
+
+
+def itemList(rng: random.Random, params: Parameters) -> str:
+    '''Return a list nested up to `params.listDepth` levels.'''
+    lines = []
+    depth = 1
+    for _ in range(rng.randint(3, 8)):
+        lines.append(f'{"  " * (depth - 1)}{LIST_MARKERS[depth - 1]} {text(rng, params, rng.randint(3, 12))}')
+        depth = max(1, min(depth + rng.choice([-1, 0, 1]), params.listDepth, len(LIST_MARKERS)))
+    return '\n'.join(lines)
+
+
+def delimitedBlock(rng: random.Random, params: Parameters, depth: int) -> str:
+    '''Return a delimited block containing blocks nested `depth` levels.'''
+    if depth == 1:
+        kind = rng.choice(['code', 'quote', 'division'])
+        if kind == 'code':
+            return '``\n' + '\n'.join(' '.join(rng.choices(WORDS, k=6)) for _ in range(rng.randint(2, 8))) + '\n``'
+        if kind == 'quote':
+            return '""\n' + paragraph(rng, params) + '\n""'
+    # Nested divisions have longer delimiters than the enclosing division.
+    delimiter = '.' * (params.blockDepth - depth + 2)
+    content = [paragraph(rng, params)]
+    if depth > 1:
+        content.append(delimitedBlock(rng, params, depth - 1))
+    return f'.note\n{delimiter}\n' + '\n\n'.join(content) + f'\n{delimiter}'
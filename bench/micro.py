@@ -0,0 +1,234 @@
+'''
+ Micro-benchmarks.
+
+ Each micro-benchmark times an optimized render phase on synthetic input and
+ checks its output (wall-clock timings are too noisy for the unit tests). The
+ `allocations` micro-benchmark counts the Fragment and Expand objects a render
+ allocates. Run them with `python -m bench.micro [NAME...]`.
+'''
+
+import argparse
+import json
+import re
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+from unittest.mock import patch
+
+import rimu
+from rimu import document, macros, options, replacements
+from rimu.expansion import Expand
+from rimu.spans import Fragment, defrag, postReplacements, preReplacements
+
+from bench import corpus
+
+Result = Dict[str, float]
+
+# The Rimu compliance tests.
+RIMU_TESTS = './tests/rimu-tests.json'
+
+# A document with Simple, Parametized and Inclusion macro invocations.
+MACROS_DOCUMENT = "{product}='Rimu'\n{v}='$1 v$2'\n\n" + \
+    '# Heading {product}\n\n- Item one\n- Item *two*\n\n' \
+    'A paragraph of text without any macro invocations.\n\n' \
+    'A {product} paragraph {v|a|b} {product=Rimu}line.\n\n' * 20
+
+# A reference manual section, `{n}` is the section number.
+REFERENCE_SECTION = '## Section {n}\n\n' \
+    'A paragraph of reference text describing the *option* and its `value`.\n' \
+    'The second line of the paragraph continues the description.\n\n' \
+    '- First item of the list\n  continued on a second line\n- Second item\n' \
+    '- Third item with a longer description\n\n' \
+    '.note\nAn annotated paragraph.\n\n' \
+    '``\ncode block line one\ncode block line two\n``\n\n' \
+    'term:: definition text\n\n'
+
+
+def referenceManual(sections: int) -> str:
+    '''Return a generated reference manual with `sections` sections.'''
+    return ''.join(REFERENCE_SECTION.replace('{n}', str(n)) for n in range(sections))
+
+
+def benchSpans(scale: int = 1) -> Result:
+    '''Time fragment assembly and replacement placeholder restoration for
+       paragraphs from 1 KB to 10 MB (divided by `scale`). The times scale
+       linearly (quadratic assembly made the 10 MB paragraph ~10000 times
+       slower than the 100 KB paragraph).'''
+    with rimu.Renderer().activate():  # Isolate the definition updates.
+        document.init()
+        replacements.defs = [replacements.Def(re.compile(r'\\?&amp;'), '&amp;')]
+        unit = 'Lorem ipsum dolor sit amet &amp; consectetur adipiscing elit. '
+        result = {}
+        for size in [1_000, 10_000, 100_000, 1_000_000, 10_000_000]:
+            size //= scale
+            text = unit * (size // len(unit))
+            fragments = [Fragment(text=unit, done=False), Fragment(text='<em>', done=True)] * (size // len(unit))
+            best = float('inf')
+            for _ in range(max(1, 100_000 // size)):
+                start = time.perf_counter()
+                output = postReplacements(preReplacements(text))
+                defrag(fragments)
+                best = min(best, time.perf_counter() - start)
+            assert output == text
+            result[f'{size} bytes'] = best
+    return result
+
+
+def twoPassRender(text: str, silent: bool = False) -> str:
+    '''Reference macro expansion implementation: a Simple invocations pass
+       followed by a Parametrized, Inclusion and Exclusion invocations pass.'''
+    result = text
+    for find in [macros.MATCH_SIMPLE, macros.MATCH_COMPLEX]:
+        result = find.sub(lambda match: macros.expand(
+            match[0], match[1], match[2], text, silent, options.errorCallback), result)
+    if '\u0002' in result:
+        result = '\n'.join(filter(lambda line: '\u0002' not in line, result.split('\n')))
+    return result
+
+
+def rimuTests() -> List[Tuple[str, Dict[str, Any]]]:
+    '''Return the inputs and options of the Rimu compliance tests.'''
+    with open(RIMU_TESTS) as f:
+        return [(spec['input'], spec['options']) for spec in json.load(f) if 'py' not in spec.get('unsupported', '')]
+
+
+def benchMacros(scale: int = 1) -> Result:
+    '''Time macro expansion with the two pass reference implementation and
+       with single pass expansion in a document with 100 (divided by `scale`)
+       copies of `MACROS_DOCUMENT` and in the Rimu compliance test inputs
+       (rendered 10 times divided by `scale`).'''
+    corpora: List[Tuple[str, List[Tuple[str, Dict[str, Any]]]]] = [
+        ('', [(MACROS_DOCUMENT * max(1, 100 // scale), {})]),
+        ('rimu-tests ', rimuTests() * max(1, 10 // scale)),
+    ]
+    result = {}
+    for prefix, sources in corpora:
+        outputs = []
+        for name, implementation in [('two pass', twoPassRender), ('single pass', macros.render)]:
+            elapsed = 0.0
+
+            def timedRender(text: str, silent: bool = False, implementation: Callable[[str, bool], str] = implementation) -> str:
+                nonlocal elapsed
+                start = time.perf_counter()
+                output = implementation(text, silent)
+                elapsed += time.perf_counter() - start
+                return output
+            with patch.object(macros, 'render', timedRender):
+                start = time.perf_counter()
+                outputs.append([rimu.Renderer().render(source, rimu.RenderOptions(
+                    safeMode=opts.get('safeMode'), htmlReplacement=opts.get('htmlReplacement'), callback=lambda _: None))
+                    for source, opts in sources])
+                result[f'{prefix}{name} total'] = time.perf_counter() - start
+            result[f'{prefix}{name} macros'] = elapsed
+        assert outputs[0] == outputs[1]
+    return result
+
+
+def benchLinekinds(scale: int = 1) -> Result:
+    '''Time rendering a reference manual with 1000 (divided by `scale`)
+       sections with and without the line classification pass, and the
+       classification itself.'''
+    source = referenceManual(max(1, 1000 // scale))
+    result = {}
+    outputs = []
+    for classifyLines in [False, True]:
+        r = rimu.Renderer()
+        best = float('inf')
+        for _ in range(2):
+            start = time.perf_counter()
+            output = r.render(source, rimu.RenderOptions(reset=True, classifyLines=classifyLines))
+            best = min(best, time.perf_counter() - start)
+        result['with classification' if classifyLines else 'without classification'] = best
+        outputs.append(output)
+    assert outputs[0] == outputs[1]
+    with rimu.Renderer().activate():
+        document.init()
+        classifier = document.lineClassifier()
+        start = time.perf_counter()
+        classifier.classify(source)
+        result['classification'] = time.perf_counter() - start
+    return result
+
+
+def instanceSize(create: Callable[[], Any], count: int = 1000) -> int:
+    '''Return the memory (bytes) traced by tracemalloc for each object returned
+       by `create`.'''
+    objects: List[Any] = [None] * count
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        for i in range(count):
+            objects[i] = create()
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return (after - before) // count
+
+
+def allocations(render: Callable[[], Any]) -> Dict[str, int]:
+    '''Call `render` and return the number of Fragment and Expand objects it
+       allocates, their total size in bytes and the render's peak memory
+       (traced by tracemalloc).'''
+    counts = {Fragment: 0, Expand: 0}
+
+    def counter(cls: type) -> Any:
+        init = vars(cls)['__init__']
+
+        def counted(self: Any, *args: Any, **kwargs: Any) -> None:
+            counts[cls] += 1
+            init(self, *args, **kwargs)
+        return patch.object(cls, '__init__', counted)
+    with counter(Fragment), counter(Expand):
+        tracemalloc.start()
+        try:
+            render()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    sizes = {Fragment: instanceSize(lambda: Fragment(text='', done=False)), Expand: instanceSize(Expand)}
+    result = {}
+    for cls, count in counts.items():
+        result[f'{cls.__name__} allocations'] = count
+        result[f'{cls.__name__} bytes'] = count * sizes[cls]
+    result['peak memory bytes'] = peak
+    return result
+
+
+def benchAllocations(scale: int = 1) -> Result:
+    '''Count the Fragment and Expand allocations and bytes for a render of the
+       200 KB (divided by `scale`) mixed benchmark corpus document (see
+       `bench.run`).'''
+    source = corpus.generate(200_000 // scale, 1, corpus.Parameters())
+    return {label: float(value) for label, value in
+            allocations(lambda: rimu.Renderer().render(source, rimu.RenderOptions(reset=True))).items()}
+
+
+BENCHMARKS: Dict[str, Callable[..., Result]] = {
+    'spans': benchSpans,
+    'macros': benchMacros,
+    'linekinds': benchLinekinds,
+    'allocations': benchAllocations,
+}
+# Benchmarks whose results are counts (the other results are seconds).
+COUNTS = {'allocations'}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog='python -m bench.micro', description='Run the Rimu micro-benchmarks.')
+    parser.add_argument('names', nargs='*', metavar='NAME',
+                        help=f'benchmarks to run: {", ".join(BENCHMARKS)} (default all)')
+    args = parser.parse_args()
+    names: List[str] = args.names or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            parser.error(f'unknown benchmark: {name}')
+    for name in names:
+        for label, value in BENCHMARKS[name]().items():
+            if name in COUNTS:
+                print(f'{name:12} {label:32} {value:10.0f}')
+            else:
+                print(f'{name:12} {label:32} {value * 1000:10.3f} ms')
+
+
+if __name__ == '__main__':
+    main()
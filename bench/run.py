@@ -0,0 +1,247 @@
+'''
+ Benchmark runners.
+
+ Each benchmark renders a generated document (see `corpus`) and measures its
+ throughput (MB/s of Rimu source), per-block latency percentiles and peak
+ memory (the `rimu.render()` benchmarks also count Fragment and Expand
+ allocations). The `rimu.render()` benchmarks run in-process, the `rimuc`
+ benchmarks run the rimuc command in a child process. The `import` benchmark
+ measures the rimuc command start up latency (the time to import the
+ `rimuc.rimuc` command module reported by `python -X importtime`). Results are written as JSON and can be
+ compared with the results of a previous (baseline) run.
+'''
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import rimu
+from rimu import document, io
+from rimuc.rimuc import VERSION
+
+from bench import corpus, micro
+
+try:
+    import resource
+except ImportError:  # Windows.
+    resource = None  # type: ignore
+
+# Benchmarked documents: a typical document and documents that stress one feature.
+DOCUMENTS: Dict[str, corpus.Parameters] = {
+    'mixed': corpus.Parameters(),
+    'quotes': corpus.Parameters(quoteDensity=0.3, linkDensity=0.1),
+    'lists': corpus.Parameters(paragraphLength=10, listDepth=6),
+    'macros': corpus.Parameters(linkDensity=0.2, macroCount=500),
+    'blocks': corpus.Parameters(paragraphLength=10, blockDepth=6),
+}
+# Default throughput and peak memory regression threshold (percent).
+THRESHOLD = 10.0
+
+Result = Dict[str, Any]
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    '''Return the 50th, 90th, 99th percentiles and maximum of samples (in milliseconds).'''
+    samples = sorted(samples)
+    result = {}
+    for name, p in [('p50', 0.5), ('p90', 0.9), ('p99', 0.99)]:
+        result[name] = round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 4)
+    result['max'] = round(samples[-1] * 1000, 4)
+    return result
+
+
+def benchRender(source: str, repeat: int) -> Result:
+    '''Benchmark `rimu.render()`.'''
+    size = len(source.encode())
+    best = float('inf')
+    for _ in range(repeat):
+        r = rimu.Renderer()
+        start = time.perf_counter()
+        r.render(source, rimu.RenderOptions(reset=True))
+        best = min(best, time.perf_counter() - start)
+    # Time each top-level block.
+    latencies = []
+    r = rimu.Renderer()
+    r.render('', rimu.RenderOptions(reset=True))
+    with r.activate():
+        blocks = document.renderBlocks(io.Reader(source))
+        while True:
+            start = time.perf_counter()
+            if next(blocks, None) is None:
+                break
+            latencies.append(time.perf_counter() - start)
+    counts = micro.allocations(lambda: rimu.Renderer().render(source, rimu.RenderOptions(reset=True)))
+    peak = counts.pop('peak memory bytes')
+    return {
+        'bytes': size,
+        'seconds': round(best, 6),
+        'mbPerSecond': round(size / best / 1e6, 4),
+        'blocks': len(latencies),
+        'latency': percentiles(latencies),
+        'peakMemory': peak,
+        'allocations': counts,  # Fragment and Expand allocations and bytes.
+    }
+
+
+def benchRimuc(source: str, repeat: int) -> Result:
+    '''Benchmark the rimuc command (includes interpreter start up).'''
+    size = len(source.encode())
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(sys.path)
+    best = float('inf')
+    peak: Optional[int] = None
+    with tempfile.TemporaryDirectory() as tmp:
+        infile = os.path.join(tmp, 'bench.rmu')
+        with open(infile, 'w') as f:
+            f.write(source)
+        args = [sys.executable, '-m', 'rimuc', '--no-rimurc', '--output', os.path.join(tmp, 'bench.html'), infile]
+        for _ in range(repeat):
+            start = time.perf_counter()
+            child = subprocess.Popen(args, env=env)
+            if resource is not None:
+                _, status, usage = os.wait4(child.pid, 0)
+                child.returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+                # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+                rss = usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+                peak = rss if peak is None else max(peak, rss)
+            else:
+                child.wait()
+            best = min(best, time.perf_counter() - start)
+            if child.returncode != 0:
+                raise RuntimeError(f'rimuc exited with status {child.returncode}')
+    return {
+        'bytes': size,
+        'seconds': round(best, 6),
+        'mbPerSecond': round(size / best / 1e6, 4),
+        'peakMemory': peak,
+    }
+
+
+def benchImport(repeat: int) -> Result:
+    '''Benchmark importing the rimuc command (in a child process).'''
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(sys.path)
+    best = float('inf')
+    slowest: List[List[Any]] = []
+    for _ in range(repeat):
+        child = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import rimuc.rimuc'],
+                               env=env, stderr=subprocess.PIPE, universal_newlines=True, check=True)
+        # Lines are formatted 'import time: <self us> | <cumulative us> | <indented module name>'.
+        modules = []
+        seconds = 0.0
+        for line in child.stderr.splitlines():
+            fields = line.split('|')
+            if len(fields) == 3 and fields[1].strip().isdigit():
+                name = fields[2].strip()
+                modules.append((name, int(fields[0].split(':')[1]), int(fields[1])))
+                if fields[2][1] != ' ' and name.split('.')[0] == 'rimuc':  # Top-level rimuc import.
+                    seconds += int(fields[1]) / 1e6
+        if seconds < best:
+            best = seconds
+            slowest = [[name, selfTime] for name, selfTime, _ in sorted(modules, key=lambda m: -m[1])[:5]]
+    return {
+        'seconds': round(best, 6),
+        'modules': len(modules),
+        'slowest': slowest,  # The five modules with the largest self import time (microseconds).
+        'peakMemory': None,
+    }
+
+
+def run(size: int, seed: int, repeat: int, rimuc: bool = True) -> Dict[str, Any]:
+    '''Run the benchmarks and return the results.'''
+    results: Dict[str, Result] = {}
+    if rimuc:
+        results['import/rimuc'] = benchImport(repeat)
+    for name, params in DOCUMENTS.items():
+        source = corpus.generate(size, seed, params)
+        results[f'render/{name}'] = benchRender(source, repeat)
+        if rimuc:
+            results[f'rimuc/{name}'] = benchRimuc(source, repeat)
+    return {
+        'version': VERSION,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'size': size,
+        'seed': seed,
+        'results': results,
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float = THRESHOLD) -> List[str]:
+    '''Return the regressions: benchmarks whose throughput decreased, or whose
+       time (import benchmarks) or peak memory increased, by more than
+       `threshold` percent.'''
+    regressions = []
+    for name, result in results['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        if 'mbPerSecond' in result:
+            change = (result['mbPerSecond'] - base['mbPerSecond']) / base['mbPerSecond'] * 100
+            if change < -threshold:
+                regressions.append(f'{name}: throughput {base["mbPerSecond"]} -> {result["mbPerSecond"]} MB/s ({change:+.1f}%)')
+        else:
+            change = (result['seconds'] - base['seconds']) / base['seconds'] * 100
+            if change > threshold:
+                regressions.append(f'{name}: time {base["seconds"]} -> {result["seconds"]} seconds ({change:+.1f}%)')
+        if result['peakMemory'] and base['peakMemory']:
+            change = (result['peakMemory'] - base['peakMemory']) / base['peakMemory'] * 100
+            if change > threshold:
+                regressions.append(f'{name}: peak memory {base["peakMemory"]} -> {result["peakMemory"]} bytes ({change:+.1f}%)')
+    return regressions
+
+
+def report(results: Dict[str, Any], baseline: Optional[Dict[str, Any]]) -> str:
+    '''Return a text table of the results (and the throughput, or time, change from the baseline).'''
+    lines = [f'{"benchmark":16} {"MB/s":>8} {"ms":>8} {"change":>8} {"p50 ms":>8} {"p99 ms":>8} {"peak MB":>8}']
+    for name, result in results['results'].items():
+        base = baseline['results'].get(name) if baseline else None
+        throughput = f'{result["mbPerSecond"]:.3f}' if 'mbPerSecond' in result else ''
+        change = ''
+        if base:
+            if throughput:
+                change = f'{(result["mbPerSecond"] / base["mbPerSecond"] - 1) * 100:+.1f}%'
+            else:
+                change = f'{(result["seconds"] / base["seconds"] - 1) * 100:+.1f}%'
+        latency = result.get('latency', {})
+        peak = f'{result["peakMemory"] / 1e6:.1f}' if result['peakMemory'] else ''
+        lines.append(f'{name:16} {throughput:>8} {result["seconds"] * 1000:8.1f} {change:>8} {latency.get("p50", ""):>8} '
+                     f'{latency.get("p99", ""):>8} {peak:>8}')
+    return '\n'.join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog='python -m bench', description='Run the Rimu benchmarks.')
+    parser.add_argument('--size', type=int, default=200_000, help='generated document size (characters)')
+    parser.add_argument('--seed', type=int, default=1, help='document generator seed')
+    parser.add_argument('--repeat', type=int, default=3, help='number of timed runs (the best is reported)')
+    parser.add_argument('--no-rimuc', action='store_true', help='skip the rimuc command benchmarks')
+    parser.add_argument('--output', help='write the results to a JSON file')
+    parser.add_argument('--baseline', help='compare the results with a baseline results JSON file')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help='regression threshold (percent)')
+    args = parser.parse_args()
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        # Compare like with like.
+        args.size = baseline['size']
+        args.seed = baseline['seed']
+    results = run(args.size, args.seed, args.repeat, not args.no_rimuc)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+            f.write('\n')
+    print(report(results, baseline))
+    if baseline:
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print('regression: ' + regression, file=sys.stderr)
+        if regressions:
+            sys.exit(1)
@@ -26,6 +26,7 @@ setuptools.setup(
     python_requires='>=3.8',
     package_dir={'': 'src'},
     packages=setuptools.find_packages(where='src'),
+    package_data={'rimuc': ['resources/*']},
     entry_points={
         'console_scripts': [
             'rimupy=rimuc.rimuc:main',
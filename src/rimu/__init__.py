@@ -1,2 +1,6 @@
+from rimu.cache import RenderCache
 from rimu.options import CallbackMessage, RenderOptions
-from rimu.rimu import render
+from rimu.renderer import Renderer, Snapshot
+from rimu.rimu import parse, render, render_ir, render_iter, render_parallel
+from rimu.incremental import IncrementalRenderer
+from rimu.profiler import Profiler
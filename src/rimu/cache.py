@@ -0,0 +1,166 @@
+'''
+ This module implements the opt-in render cache.
+
+ Rendered HTML is cached by a key computed from the source text, the render
+ options and a fingerprint of the renderer state: macro, quote, replacement and
+ delimited block definitions, pending Block Attributes and allocated HTML ids.
+ A repeated render of the same source in the same state returns the cached HTML
+ without parsing the source.
+
+ Only renders that leave the renderer state unchanged and do not report any
+ messages are cached (a render that defines macros, for example, is rendered
+ every time).
+'''
+
+import collections
+import hashlib
+import os
+import threading
+import weakref
+from typing import TYPE_CHECKING, Any, Optional
+
+if TYPE_CHECKING:
+    import sqlite3
+
+    from rimu import renderer
+
+# Name of the on-disk cache database file.
+DATABASE_NAME = 'rimu-cache.sqlite'
+
+# Definition fingerprints of snapshots (snapshot definitions are immutable).
+_fingerprints: 'weakref.WeakKeyDictionary[renderer.Snapshot, str]' = weakref.WeakKeyDictionary()
+
+
+class RenderCache:
+    '''Least recently used cache of rendered HTML limited to `maxEntries` entries
+       and `maxBytes` bytes of (UTF-8 encoded) HTML. If a `directory` is specified
+       entries are also stored in an SQLite database in the directory and are
+       shared by caches (and processes) using the same directory.'''
+    hits: int  # Number of lookups that returned cached HTML.
+    misses: int  # Number of lookups that did not.
+    evictions: int  # Number of entries evicted from memory by the size limits.
+    bytes: int  # Size of the HTML entries in memory.
+
+    def __init__(self, maxEntries: int = 1024, maxBytes: int = 64 * 1024 * 1024, directory: Optional[str] = None):
+        self.maxEntries = maxEntries
+        self.maxBytes = maxBytes
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+        self._entries: 'collections.OrderedDict[str, str]' = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional['sqlite3.Connection'] = None
+        if directory is not None:
+            import sqlite3
+            os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(os.path.join(directory, DATABASE_NAME), timeout=30, check_same_thread=False)
+            with self._db:
+                self._db.execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, html TEXT NOT NULL)')
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[str]:
+        '''Return the cached HTML or None if the key is not cached.'''
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+            elif self._db is not None:
+                row = self._db.execute('SELECT html FROM cache WHERE key = ?', (key,)).fetchone()
+                if row is not None:
+                    html = row[0]
+                    self._store(key, html)
+            if html is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return html
+
+    def put(self, key: str, html: str) -> None:
+        '''Cache the HTML.'''
+        with self._lock:
+            if key in self._entries:
+                return
+            self._store(key, html)
+            if self._db is not None:
+                with self._db:
+                    self._db.execute('INSERT OR REPLACE INTO cache (key, html) VALUES (?, ?)', (key, html))
+
+    def clear(self) -> None:
+        '''Delete all entries (including on-disk entries) and reset the counters.'''
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = self.bytes = 0
+            if self._db is not None:
+                with self._db:
+                    self._db.execute('DELETE FROM cache')
+
+    def close(self) -> None:
+        '''Close the on-disk database.'''
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _store(self, key: str, html: str) -> None:
+        '''Add an entry to memory, evicting least recently used entries to honor the limits.'''
+        size = len(html.encode())
+        if size > self.maxBytes:
+            return
+        self._entries[key] = html
+        self.bytes += size
+        while len(self._entries) > self.maxEntries or self.bytes > self.maxBytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= len(evicted.encode())
+            self.evictions += 1
+
+
+def fingerprint(r: 'renderer.Renderer') -> str:
+    '''Return a fingerprint of the renderer state that affects rendering.'''
+    h = hashlib.sha256()
+    update(h, r.safeMode, r.htmlReplacement, r.replacementsEngine,
+           r.classes, r.id, r.css, r.attributes, expandState(r.opts), list(r.ids))
+    h.update(definitionsFingerprint(r).encode())
+    return h.hexdigest()
+
+
+def definitionsFingerprint(r: 'renderer.Renderer') -> str:
+    '''Return a fingerprint of the renderer definitions.'''
+    from rimu.renderer import DEFINITION_FIELDS  # Deferred to avoid a circular import.
+    snapshot = r._snapshot
+    shared = snapshot is not None and all(getattr(r, f) is getattr(snapshot, f) for f in DEFINITION_FIELDS)
+    if shared:
+        result = _fingerprints.get(snapshot)  # type: ignore
+        if result is not None:
+            return result
+    h = hashlib.sha256()
+    for m in r.macroDefs.values():
+        update(h, m.name, m.value)
+    for q in r.quoteDefs:
+        update(h, q.quote, q.openTag, q.closeTag, q.spans)
+    for p in r.replacementDefs:
+        update(h, p.match.pattern, p.match.flags, p.replacement, p.filter and p.filter.__qualname__)
+    for d in r.blockDefs:
+        update(h, d.name, d.openTag, d.closeTag, expandState(d.expand))
+    result = h.hexdigest()
+    if shared:
+        _fingerprints[snapshot] = result  # type: ignore
+    return result
+
+
+def expandState(expand: Any) -> tuple:
+    return (expand.macros, expand.container, expand.skip, expand.spans, expand.specials)
+
+
+def update(h: Any, *values: Any) -> None:
+    '''Add values to a hash (values are delimited by the reserved \\u0000 character).'''
+    h.update(('\u0000'.join(repr(value) for value in values) + '\u0001').encode())
+
+
+def key(source: str, state: str) -> str:
+    '''Return the cache key of source text rendered in a renderer state fingerprint.'''
+    h = hashlib.sha256(source.encode('utf-8', 'surrogatepass'))
+    h.update(state.encode())
+    return h.hexdigest()
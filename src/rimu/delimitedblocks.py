@@ -1,12 +1,20 @@
 import re
 from typing import Callable, List, Match, Optional, Pattern
 
-from rimu import blockattributes, document, io, macros, options, utils
+from rimu import (blockattributes, dispatch, document, expansion, io, linekinds, macros,
+                  options, renderer, utils)
 from rimu.expansion import Expand
 
 MATCH_INLINE_TAG: Pattern[str] = re.compile(
     r'^(a|abbr|acronym|address|b|bdi|bdo|big|blockquote|br|cite|code|del|dfn|em|i|img|ins|kbd|mark|q|s|samp|small|span|strike|strong|sub|sup|time|tt|u|var|wbr)$',
     re.IGNORECASE)
+# Multi-line macro definition name (with optional existential '?' suffix). $1 is name.
+MACRO_DEF_NAME = re.compile(r'^{([\w\-]+\??)}')
+# Macro definition line-continuations.
+LINE_CONTINUATION = re.compile(r"' *\\\n")
+ESCAPED_LINE_CONTINUATION = re.compile(r"(' *[\\]+)\\\n")
+# Delimited block definition value: <open-tag>|<close-tag> block-options
+BLOCK_DEFINITION = re.compile(r'^(?:(<[a-zA-Z].*>)\|(<[a-zA-Z/].*>))?(?:\s*)?([+-][ \w+-]+)?$')
 
 # Custom type defintions.
 Verify = Optional[Callable[[Match[str]], bool]]  # Additional match verification checks.
@@ -16,6 +24,8 @@ ContentFilter = Optional[Callable[[str, Match[str], Expand], str]]
 
 class Def:
     '''Multi-line block element definition.'''
+    __slots__ = ('openTag', 'closeTag', 'openMatch', 'closeMatch', 'verify', 'delimiterFilter', 'contentFilter',
+                 'expand', 'name', 'kind')
     openTag: str
     closeTag: str
     openMatch: Pattern[str]
@@ -25,6 +35,7 @@ class Def:
     contentFilter: ContentFilter
     expand: Expand
     name: str  # Unique identifier.
+    kind: int  # Opening delimiter line kind (see `linekinds`).
 
     def __init__(self,
                  openTag: str,
@@ -36,6 +47,7 @@ class Def:
                  contentFilter: Optional[ContentFilter] = None,
                  expand: Optional[Expand] = None,
                  name: str = '',
+                 kind: int = linekinds.OTHER,
                  ) -> None:
         self.openTag = openTag
         self.closeTag = closeTag
@@ -52,6 +64,7 @@ class Def:
         else:
             self.expand = Expand()
         self.name = name
+        self.kind = kind
 
     @classmethod
     def copyFrom(cls, d: 'Def') -> 'Def':
@@ -65,6 +78,7 @@ class Def:
             d.contentFilter,
             d.expand,
             d.name,
+            d.kind,
         )
 
 
@@ -97,11 +111,11 @@ def classInjectionFilter(match: Match[str], d: Def) -> str:
 
 def macroDefContentFilter(text: str, match: Match[str], expand: Expand) -> str:
     '''contentFilter for multi-line macro definitions.'''
-    m = re.search(r'^{([\w\-]+\??)}', match[0])  # Extract macro name from opening delimiter.
+    m = MACRO_DEF_NAME.search(match[0])  # Extract macro name from opening delimiter.
     assert m is not None
     name = m[1]
-    text = re.sub(r"' *\\\n", "'\n", text)  # Unescape line-continuations.
-    text = re.sub(r"(' *[\\]+)\\\n", lambda match: f'{match[1]}\n', text)  # Unescape escaped line-continuations.
+    text = LINE_CONTINUATION.sub("'\n", text)  # Unescape line-continuations.
+    text = ESCAPED_LINE_CONTINUATION.sub(lambda match: f'{match[1]}\n', text)  # Unescape escaped line-continuations.
     text = utils.replaceInline(text, expand)  # Expand macro invocations.
     macros.setValue(name, text)
     return ''
@@ -134,7 +148,7 @@ def quoteParagraphContentFilter(text: str, *_) -> str:
     return '\n'.join(result)
 
 
-defs: List[Def] = []  # Mutable definitions initialized by DEFAULT_DEFS.
+defs: List[Def]  # Mutable definitions initialized by DEFAULT_DEFS.
 
 DEFAULT_DEFS: List[Def] = [
     # Delimited blocks cannot be escaped with a backslash.
@@ -142,6 +156,7 @@ DEFAULT_DEFS: List[Def] = [
     # Multi-line macro literal value definition.
     Def(
         name="macro-definition",
+        kind=linekinds.MACRO,
         openMatch=macros.DEF_OPEN,  # $1 is first line of macro.
         closeMatch=macros.DEF_CLOSE,
         openTag='',
@@ -153,6 +168,7 @@ DEFAULT_DEFS: List[Def] = [
     # Comment block.
     Def(
         name='comment',
+        kind=linekinds.COMMENT,
         openMatch=re.compile(r'^\\?\/\*+$'),
         closeMatch=re.compile(r'^\*+\/$'),
         openTag='',
@@ -164,6 +180,7 @@ DEFAULT_DEFS: List[Def] = [
     # Division block.
     Def(
         name='division',
+        kind=linekinds.DELIMITER,
         openMatch=re.compile(
             r'^\\?(\.{2,})([\w\s-]*)$'),  # $1 is delimiter text, $2 is optional class names.
         openTag='<div>',
@@ -176,6 +193,7 @@ DEFAULT_DEFS: List[Def] = [
     # Quote block.
     Def(
         name='quote',
+        kind=linekinds.DELIMITER,
         openMatch=re.compile(
             r'^\\?("{2,}|>{2,})([\w\s-]*)$'),  # $1 is delimiter text, $2 is optional class names.
         openTag='<blockquote>',
@@ -188,6 +206,7 @@ DEFAULT_DEFS: List[Def] = [
     # Code block.
     Def(
         name='code',
+        kind=linekinds.DELIMITER,
         openMatch=re.compile(
             r'^\\?(-{2,}|`{2,})([\w\s-]*)$'),  # $1 is delimiter text, $2 is optional class names.
         openTag='<pre><code>',
@@ -201,6 +220,7 @@ DEFAULT_DEFS: List[Def] = [
     # HTML block.
     Def(
         name='html',
+        kind=linekinds.DELIMITER,
         # Block starts with HTML comment, DOCTYPE directive or block-level HTML start or end tag.
         # $1 is first line of block.
         # $2 is the alphanumeric tag name.
@@ -218,6 +238,7 @@ DEFAULT_DEFS: List[Def] = [
     # Indented paragraph.
     Def(
         name='indented',
+        kind=linekinds.DELIMITER,
         openMatch=re.compile(r'^\\?(\s+\S.*)$'),  # $1 is first line of block.
         closeMatch=re.compile(r'^$'),
         openTag='<pre><code>',
@@ -229,6 +250,7 @@ DEFAULT_DEFS: List[Def] = [
     # Quote paragraph.
     Def(
         name='quote-paragraph',
+        kind=linekinds.DELIMITER,
         openMatch=re.compile(r'^\\?(>.*)$'),  # $1 is first line of block.
         closeMatch=re.compile(r'^$'),
         openTag='<blockquote><p>',
@@ -262,9 +284,7 @@ DEFAULT_DEFS: List[Def] = [
 def init() -> None:
     '''Reset definitions to defaults.'''
     # Make shallow of DEFAULT_DEFS (list and list objects).
-    defs.clear()
-    for d in DEFAULT_DEFS:
-        defs.append(Def.copyFrom(d))
+    renderer.current().blockDefs = [Def.copyFrom(d) for d in DEFAULT_DEFS]
 
 
 # If the next element in the reader is a valid delimited block render it
@@ -274,9 +294,20 @@ def render(reader: io.Reader, writer: io.Writer, allowed: Optional[List[str]] =
         allowed = []
     if reader.eof():
         options.panic('premature eof')
-    for d in defs:
+    r = renderer.current()
+    blockDefs = r.blockDefs
+    # The table is cached by the opening delimiter patterns so it is rebuilt when they are redefined.
+    table = dispatch.table(tuple(d.openMatch for d in blockDefs))
+    i = -1
+    while True:
+        i = table.next(reader.cursor, i)
+        if i == -1:
+            break
+        d = blockDefs[i]
         if allowed and d.name not in allowed:
             continue
+        if d.kind and not d.kind & reader.kind:
+            continue  # The line is not of the definition's kind.
         match = d.openMatch.search(reader.cursor)
         if not match:
             continue
@@ -287,8 +318,17 @@ def render(reader: io.Reader, writer: io.Writer, allowed: Optional[List[str]] =
             continue
         if d.verify and not d.verify(match):
             continue
+        if r.profiler is not None:
+            r.profiler.matched(d.name)
+        start = len(writer.buffer)  # The start of the block's HTML.
         # Process opening delimiter.
-        delimiterText = d.delimiterFilter(match, d) if d.delimiterFilter else ''
+        # The filter is passed a private copy of the definition because definitions
+        # can be shared with snapshots (and the class injection filter sets closeMatch).
+        delimiterText = ''
+        delimiterFilter = d.delimiterFilter
+        if delimiterFilter:
+            d = Def.copyFrom(d)
+            delimiterText = delimiterFilter(match, d)
         # Read block content into lines.
         lines: List[str] = []
         if delimiterText:
@@ -302,8 +342,11 @@ def render(reader: io.Reader, writer: io.Writer, allowed: Optional[List[str]] =
         if content:
             lines.extend(content)
         # Calculate block expansion options.
-        expand = Expand.copyFrom(d.expand)
-        expand.merge(blockattributes.opts)
+        if blockattributes.opts == expansion.EMPTY:
+            expand = d.expand  # Nothing to merge (the content filters do not update expansion options).
+        else:
+            expand = Expand.copyFrom(d.expand)
+            expand.merge(blockattributes.opts)
         # Translate block.
         if expand.skip is not True:
             text = '\n'.join(lines)
@@ -331,14 +374,17 @@ def render(reader: io.Reader, writer: io.Writer, allowed: Optional[List[str]] =
                 # Add a trailing '\n' if we've written a non-blank line and there are more source lines left.
                 writer.write('\n')
         # Reset consumed Block Attributes expansion options.
-        blockattributes.opts = Expand()
+        if blockattributes.opts != expansion.EMPTY:
+            blockattributes.opts = Expand()
+        if r.recorder is not None:
+            r.recorder.block(d.name, reader, writer, start)
         return True
     return False  # No matching delimited block found.
 
 
 def getDefinition(name: str) -> Optional[Def]:
     '''Return block definition or null if not found.'''
-    for d in defs:
+    for d in renderer.current().blockDefs:
         if d.name == name:
             return d
     return None
@@ -347,11 +393,12 @@ def getDefinition(name: str) -> Optional[Def]:
 def setDefinition(name: str, value: str) -> None:
     '''Update existing named definition.
        Value syntax: <open-tag>|<close-tag> block-options'''
+    renderer.current().mutable('blockDefs', Def.copyFrom)
     d = getDefinition(name)
     if not d:
         options.errorCallback(f"illegal delimited block name: {name}: |{name}|='{value}'")
         return
-    match = re.search(r'^(?:(<[a-zA-Z].*>)\|(<[a-zA-Z/].*>))?(?:\s*)?([+-][ \w+-]+)?$', value.strip())
+    match = BLOCK_DEFINITION.search(value.strip())
     if not match:
         options.errorCallback(f"illegal delimited block definition: |{name}|='{value}'")
         return
@@ -361,3 +408,6 @@ def setDefinition(name: str, value: str) -> None:
         d.closeTag = match[2]
     if match[3] is not None:
         d.expand.parse(match[3])
+
+
+renderer.bindModuleState(__name__, {'defs': 'blockDefs'})
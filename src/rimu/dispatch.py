@@ -0,0 +1,208 @@
+'''
+ This module implements block definition dispatch tables.
+
+ Block definitions are matched against the line at the reader cursor in
+ definition order. A dispatch table indexes the definitions by the possible
+ first characters of their matches so that definitions that cannot match a
+ line are skipped without evaluating their regular expressions.
+
+ The possible first characters are derived from the parsed regular expression.
+ Patterns that are not anchored to the start of the line, patterns that can
+ match a blank line and patterns whose first character cannot be determined
+ can match any line.
+'''
+
+import bisect
+import functools
+import re
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Pattern, Tuple
+
+try:
+    from re import _constants as sre_constants  # type: ignore
+    from re import _parser as sre_parse  # type: ignore
+except ImportError:  # Python < 3.11
+    import sre_constants  # type: ignore
+    import sre_parse  # type: ignore
+
+# Parsed pattern opcodes and codes. The sre constants are created dynamically so
+# they are looked up by name (POSSESSIVE_REPEAT and ATOMIC_GROUP are None before
+# Python 3.11).
+LITERAL: Any = getattr(sre_constants, 'LITERAL', None)
+IN: Any = getattr(sre_constants, 'IN', None)
+RANGE: Any = getattr(sre_constants, 'RANGE', None)
+CATEGORY: Any = getattr(sre_constants, 'CATEGORY', None)
+AT: Any = getattr(sre_constants, 'AT', None)
+AT_BEGINNING: Any = getattr(sre_constants, 'AT_BEGINNING', None)
+ASSERT: Any = getattr(sre_constants, 'ASSERT', None)
+ASSERT_NOT: Any = getattr(sre_constants, 'ASSERT_NOT', None)
+SUBPATTERN: Any = getattr(sre_constants, 'SUBPATTERN', None)
+MAX_REPEAT: Any = getattr(sre_constants, 'MAX_REPEAT', None)
+MIN_REPEAT: Any = getattr(sre_constants, 'MIN_REPEAT', None)
+POSSESSIVE_REPEAT: Any = getattr(sre_constants, 'POSSESSIVE_REPEAT', None)
+BRANCH: Any = getattr(sre_constants, 'BRANCH', None)
+ATOMIC_GROUP: Any = getattr(sre_constants, 'ATOMIC_GROUP', None)
+CATEGORY_DIGIT: Any = getattr(sre_constants, 'CATEGORY_DIGIT', None)
+CATEGORY_NOT_DIGIT: Any = getattr(sre_constants, 'CATEGORY_NOT_DIGIT', None)
+CATEGORY_SPACE: Any = getattr(sre_constants, 'CATEGORY_SPACE', None)
+CATEGORY_NOT_SPACE: Any = getattr(sre_constants, 'CATEGORY_NOT_SPACE', None)
+CATEGORY_WORD: Any = getattr(sre_constants, 'CATEGORY_WORD', None)
+CATEGORY_NOT_WORD: Any = getattr(sre_constants, 'CATEGORY_NOT_WORD', None)
+
+# Character class categories and the corresponding (Unicode) character predicates.
+CATEGORIES: Dict[object, Callable[[str], bool]] = {
+    CATEGORY_DIGIT: str.isdecimal,
+    CATEGORY_NOT_DIGIT: lambda c: not c.isdecimal(),
+    CATEGORY_SPACE: str.isspace,
+    CATEGORY_NOT_SPACE: lambda c: not c.isspace(),
+    CATEGORY_WORD: lambda c: c.isalnum() or c == '_',
+    CATEGORY_NOT_WORD: lambda c: not (c.isalnum() or c == '_'),
+}
+# Regular expression escapes for the (narrow) character class categories.
+CATEGORY_ESCAPES: Dict[Callable[[str], bool], str] = {
+    CATEGORIES[CATEGORY_DIGIT]: r'\d',
+    CATEGORIES[CATEGORY_SPACE]: r'\s',
+    CATEGORIES[CATEGORY_WORD]: r'\w',
+}
+
+# Maximum character range expanded into a set of characters.
+MAX_RANGE = 256
+
+
+class FirstChars:
+    '''The characters a pattern match can start with.'''
+    chars: FrozenSet[str]
+    categories: Tuple[Callable[[str], bool], ...]
+
+    def __init__(self, chars: FrozenSet[str] = frozenset(), categories: Tuple[Callable[[str], bool], ...] = ()):
+        self.chars = chars
+        self.categories = categories
+
+    def union(self, other: 'FirstChars') -> 'FirstChars':
+        return FirstChars(self.chars | other.chars, self.categories + other.categories)
+
+    def contains(self, c: str) -> bool:
+        return c in self.chars or any(category(c) for category in self.categories)
+
+
+def firstChars(pattern: Pattern[str]) -> Optional[FirstChars]:
+    '''Return the characters a pattern match can start with or None if the
+       pattern can match any line.'''
+    if pattern.flags & (re.MULTILINE | re.ASCII):
+        return None
+    try:
+        items = list(sre_parse.parse(pattern.pattern, pattern.flags))
+    except Exception:
+        return None
+    if not items or items[0] != (AT, AT_BEGINNING):
+        return None
+    result = sequenceFirst(items[1:], bool(pattern.flags & re.IGNORECASE))
+    if result is None or result[1]:
+        return None  # Unknown or can match a blank line.
+    return result[0]
+
+
+def sequenceFirst(items: List, ignoreCase: bool) -> Optional[Tuple[FirstChars, bool]]:
+    '''Return the first characters of a sequence of parsed pattern items and True
+       if the sequence can match a blank string, return None if unknown.'''
+    result = FirstChars()
+    for item in items:
+        first = itemFirst(item, ignoreCase)
+        if first is None:
+            return None
+        result = result.union(first[0])
+        if not first[1]:
+            return result, False
+    return result, True
+
+
+def itemFirst(item: Tuple, ignoreCase: bool) -> Optional[Tuple[FirstChars, bool]]:
+    '''Return the first characters of a parsed pattern item and True if the item
+       can match a blank string, return None if unknown.'''
+    op, av = item
+    if op is LITERAL:
+        if ignoreCase and not caseless(av):
+            return None
+        return FirstChars(frozenset(chr(av))), False
+    if op is IN:
+        return setFirst(av, ignoreCase)
+    if op is AT or op is ASSERT or op is ASSERT_NOT:
+        # Zero-width assertions do not consume characters.
+        return FirstChars(), True
+    if op is SUBPATTERN:
+        _, addFlags, delFlags, p = av
+        if addFlags & (re.MULTILINE | re.ASCII):
+            return None
+        return sequenceFirst(list(p), (ignoreCase or bool(addFlags & re.IGNORECASE)) and not delFlags & re.IGNORECASE)
+    if op in (MAX_REPEAT, MIN_REPEAT) or op is POSSESSIVE_REPEAT:
+        low, _, p = av
+        first = sequenceFirst(list(p), ignoreCase)
+        if first is None:
+            return None
+        return first[0], first[1] or low == 0
+    if op is BRANCH:
+        result = FirstChars()
+        blank = False
+        for p in av[1]:
+            first = sequenceFirst(list(p), ignoreCase)
+            if first is None:
+                return None
+            result = result.union(first[0])
+            blank = blank or first[1]
+        return result, blank
+    if op is ATOMIC_GROUP:
+        return sequenceFirst(list(av), ignoreCase)
+    return None
+
+
+def setFirst(items: List, ignoreCase: bool) -> Optional[Tuple[FirstChars, bool]]:
+    '''Return the first characters of a parsed character set.'''
+    chars = set()
+    categories = []
+    for op, av in items:
+        if op is LITERAL:
+            if ignoreCase and not caseless(av):
+                return None
+            chars.add(chr(av))
+        elif op is RANGE:
+            low, high = av
+            if high - low >= MAX_RANGE or (ignoreCase and not all(caseless(c) for c in range(low, high + 1))):
+                return None
+            chars.update(chr(c) for c in range(low, high + 1))
+        elif op is CATEGORY and av in CATEGORIES:
+            categories.append(CATEGORIES[av])
+        else:
+            return None  # Negated sets and other categories.
+    return FirstChars(frozenset(chars), tuple(categories)), False
+
+
+def caseless(code: int) -> bool:
+    '''Return True if the character is not affected by case-insensitive matching.'''
+    return code < 128 and not chr(code).isalpha()
+
+
+class Table:
+    '''Dispatch table for a list of block definition patterns.'''
+    firsts: List[Optional[FirstChars]]  # First characters of each pattern.
+    candidates: Dict[str, Tuple[int, ...]]  # Indexes of patterns that can match lines starting with a character.
+
+    def __init__(self, patterns: Tuple[Pattern[str], ...]):
+        self.firsts = [firstChars(pattern) for pattern in patterns]
+        self.candidates = {}
+
+    def next(self, line: str, after: int) -> int:
+        '''Return the index of the next pattern following index `after` that can
+           match the line, return -1 if there are none.'''
+        c = line[:1]
+        candidates = self.candidates.get(c)
+        if candidates is None:
+            candidates = tuple(i for i, first in enumerate(self.firsts)
+                               if first is None or (c != '' and first.contains(c)))
+            self.candidates[c] = candidates
+        k = bisect.bisect_right(candidates, after)
+        return candidates[k] if k < len(candidates) else -1
+
+
+@functools.lru_cache(maxsize=32)
+def table(patterns: Tuple[Pattern[str], ...]) -> Table:
+    '''Return the (cached) dispatch table for block definition patterns.'''
+    return Table(patterns)
@@ -1,29 +1,63 @@
-from rimu import (blockattributes, delimitedblocks, io, lineblocks, lists,
-                  macros, options, quotes, replacements)
+from typing import Iterator, Optional
+
+from rimu import (blockattributes, delimitedblocks, io, linekinds, lineblocks,
+                  lists, macros, options, quotes, renderer, replacements)
+
+_defaults: Optional['renderer.Snapshot'] = None
 
 
 def init() -> None:
     blockattributes.init()
     options.init()
-    delimitedblocks.init()
-    macros.init()
-    quotes.init()
-    replacements.init()
+    renderer.current().restore(defaults())
+
+
+def defaults() -> 'renderer.Snapshot':
+    '''Return a snapshot of the default definitions (created on first use).'''
+    global _defaults
+    if _defaults is None:
+        r = renderer.Renderer()
+        with r.activate():
+            delimitedblocks.init()
+            macros.init()
+            quotes.init()
+            replacements.init()
+        _defaults = renderer.Snapshot(r)
+    return _defaults
+
+
+def lineClassifier() -> linekinds.Classifier:
+    '''Return the line classifier for the current block definitions.'''
+    return linekinds.classifier(
+        tuple((d.match, d.kind) for d in lineblocks.defs)
+        + tuple((d.match, linekinds.LIST_ITEM) for d in lists.defs)
+        + tuple((d.openMatch, d.kind) for d in renderer.current().blockDefs))
 
 
 def render(source: str) -> str:
-    reader = io.Reader(source)
+    return ''.join(renderIter(source))
+
+
+def renderIter(source: io.Source) -> Iterator[str]:
+    '''Render source text (or a text stream or memory-mapped file) yielding the HTML of each block as it is rendered.'''
+    classifier = lineClassifier() if renderer.current().classifyLines else None
+    for html in renderBlocks(io.Reader(source, classifier)):
+        if html:
+            yield html
+
+
+def renderBlocks(reader: io.Reader) -> Iterator[str]:
+    '''Render top-level blocks yielding the HTML of each block (blank if the block
+       generates no HTML e.g. a macro definition).'''
     writer = io.Writer()
-    while not reader.eof():
+    while True:
         reader.skipBlankLines()
         if reader.eof():
             break
-        if lineblocks.render(reader, writer):
-            continue
-        if lists.render(reader, writer):
-            continue
-        if delimitedblocks.render(reader, writer):
-            continue
-        # This code should never be executed (normal paragraphs should match anything).
-        options.panic('no matching delimited block found')
-    return writer.toString()
+        if not (lineblocks.render(reader, writer)
+                or lists.render(reader, writer)
+                or delimitedblocks.render(reader, writer)):
+            # This code should never be executed (normal paragraphs should match anything).
+            options.panic('no matching delimited block found')
+        yield writer.toString()
+        writer.buffer.clear()
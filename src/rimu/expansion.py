@@ -3,12 +3,17 @@ from typing import Any, Optional
 
 from rimu import options
 
+# Matches block option names.
+MATCH_OPTION = re.compile(r'^[+-](macros|spans|specials|container|skip)$')
+WHITESPACE = re.compile(r'\s+')
+
 
 class Expand:
     '''Processing priority(highest to lowest): container, skip, spans and specials.
        If spans is true then both spans and specials are processed.
        They are assumed false if they are not explicitly defined.
        If a custom filter is specified their use depends on the filter.'''
+    __slots__ = ('macros', 'container', 'skip', 'spans', 'specials')
     macros: Optional[bool]
     container: Optional[bool]
     skip: Optional[bool]
@@ -64,11 +69,11 @@ class Expand:
     def parse(self, opts: str) -> None:
         '''Parse block-options string into blockOptions.'''
         if opts != '':
-            for opt in re.split(r'\s+', opts.strip()):
+            for opt in WHITESPACE.split(opts.strip()):
                 if options.isSafeModeNz() and opt == '-specials':
                     options.errorCallback('-specials block option not valid in safeMode')
                     continue
-                if re.match(r'^[+-](macros|spans|specials|container|skip)$', opt) is not None:
+                if MATCH_OPTION.match(opt) is not None:
                     value = opt[0] == '+'
                     if opt[1:] == 'macros':
                         self.macros = value
@@ -82,3 +87,31 @@ class Expand:
                         self.skip = value
                 else:
                     options.errorCallback('illegal block option: ' + opt)
+
+
+class Constant(Expand):
+    '''Immutable expansion options. Constants are shared so they cannot be updated,
+       use `Expand.copyFrom()` to get an updatable copy.'''
+    __slots__ = ()
+
+    def __init__(self,
+                 macros: Optional[bool] = None,
+                 container: Optional[bool] = None,
+                 skip: Optional[bool] = None,
+                 spans: Optional[bool] = None,
+                 specials: Optional[bool] = None,
+                 ):
+        for name, value in zip(Expand.__slots__, (macros, container, skip, spans, specials)):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError('expansion constants are immutable')
+
+    def __reduce__(self) -> tuple:
+        return (Constant, (self.macros, self.container, self.skip, self.spans, self.specials))
+
+
+# Shared expansion options constants.
+EMPTY = Constant()
+MACROS = Constant(macros=True)
+MACROS_SPANS = Constant(macros=True, spans=True)
@@ -0,0 +1,61 @@
+'''
+ This module implements the registry of allocated HTML ids.
+
+ Allocated ids are kept in a dictionary (an insertion ordered set) so lookups
+ take constant time. `unique()` remembers the next unallocated numeric suffix
+ of each slug so documents that repeat a header title many times (e.g.
+ generated API references with `--header-ids`) do not search the suffixes
+ that are already allocated.
+'''
+
+from typing import Dict, Iterable, Iterator
+
+
+class Ids:
+    '''Allocated HTML ids (iterated in allocation order).'''
+    __slots__ = ('_ids', '_suffixes')
+
+    def __init__(self, ids: Iterable[str] = ()):
+        self._ids: Dict[str, None] = dict.fromkeys(ids)
+        self._suffixes: Dict[str, int] = {}  # The lowest suffix of each slug that may be unallocated.
+
+    def __contains__(self, id: object) -> bool:
+        return id in self._ids
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._ids)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Ids):
+            return NotImplemented
+        return self._ids.keys() == other._ids.keys()
+
+    __hash__ = None  # type: ignore
+
+    def __repr__(self) -> str:
+        return f'Ids({list(self._ids)!r})'
+
+    def add(self, id: str) -> None:
+        self._ids[id] = None
+
+    def clear(self) -> None:
+        self._ids.clear()
+        self._suffixes.clear()
+
+    def copy(self) -> 'Ids':
+        result = Ids()
+        result._ids = self._ids.copy()
+        result._suffixes = self._suffixes.copy()
+        return result
+
+    def unique(self, slug: str) -> str:
+        '''Return the slug with the lowest numeric suffix (starting from 2) that
+           is not allocated.'''
+        i = self._suffixes.get(slug, 2)
+        while f'{slug}-{i}' in self._ids:
+            i += 1
+        self._suffixes[slug] = i  # Allocated ids are never removed (except by `clear()`).
+        return f'{slug}-{i}'
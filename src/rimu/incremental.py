@@ -0,0 +1,174 @@
+'''
+ This module implements incremental rendering.
+
+ An incremental renderer renders successive versions of a document (e.g. the
+ source in an editor's live preview). The source is rendered top-level block by
+ top-level block (in the same way as `document.render()`) and the HTML and
+ renderer state following each block are remembered. When the source is
+ rendered again only the blocks following the first changed line are rendered:
+ blocks preceding the change are reused and rendering stops as soon as it
+ reaches an unchanged block in the same renderer state as before (the
+ remaining blocks are reused).
+
+ A block is reused only if none of the lines it read (including look ahead
+ lines) have changed. Messages are only reported for rendered blocks.
+
+ Block states are compact: the definitions are shared snapshots and the
+ allocated HTML ids are a count of the entries in an append-only id log that
+ is shared by the states of successive blocks.
+'''
+
+import operator
+from typing import Any, Dict, List, Optional, Tuple
+
+from rimu import cache, document, io, options, renderer
+from rimu.expansion import Expand
+from rimu.ids import Ids
+
+
+class LoggedIds(Ids):
+    '''Allocated HTML ids that are also appended to an id log.'''
+    __slots__ = ('log',)
+
+    def __init__(self, log: List[str], count: int):
+        super().__init__(log[:count])
+        if len(log) != count:
+            log = log[:count]  # The entries following `count` belong to other states.
+        self.log = log
+
+    def add(self, id: str) -> None:
+        if id not in self:
+            self.log.append(id)
+        super().add(id)
+
+    def clear(self) -> None:
+        super().clear()
+        self.log = []
+
+
+class State:
+    '''Renderer state following a block.'''
+    snapshot: renderer.Snapshot  # Definitions.
+    options: Tuple[Any, ...]  # API option and Block Attributes field values (see `renderer.OPTION_FIELDS`).
+    opts: Expand  # Block Attributes expansion options.
+    log: List[str]  # Id log.
+    count: int  # Number of allocated ids (the leading entries of the id log).
+
+    def __init__(self, r: renderer.Renderer):
+        self.snapshot = r.snapshot()
+        self.options = tuple(getattr(r, field) for field in renderer.OPTION_FIELDS)
+        self.opts = Expand.copyFrom(r.opts)
+        self.log = r.ids.log if isinstance(r.ids, LoggedIds) else list(r.ids)
+        self.count = len(r.ids)
+
+    def renderer(self) -> renderer.Renderer:
+        '''Return a new renderer in this state.'''
+        r = renderer.Renderer(self.snapshot)
+        for field, value in zip(renderer.OPTION_FIELDS, self.options):
+            setattr(r, field, value)
+        r.opts = Expand.copyFrom(self.opts)
+        r.ids = LoggedIds(self.log, self.count)
+        return r
+
+
+class Block:
+    '''A rendered top-level block.'''
+    html: str
+    end: Optional[int]  # Index of the source line following the block, None if rendering cannot resume there.
+    extent: int  # Number of source lines read by the block (including look ahead lines).
+    state: State  # Renderer state following the block.
+
+    def __init__(self, html: str, end: Optional[int], extent: int, state: State):
+        self.html = html
+        self.end = end
+        self.extent = extent
+        self.state = state
+        self._fingerprint: Optional[str] = None
+
+    def fingerprint(self) -> str:
+        '''Return the fingerprint of the state following the block.'''
+        if self._fingerprint is None:
+            self._fingerprint = cache.fingerprint(self.state.renderer())
+        return self._fingerprint
+
+    def shift(self, delta: int) -> 'Block':
+        '''Return the block moved `delta` lines.'''
+        end = None if self.end is None else self.end + delta
+        block = Block(self.html, end, self.extent + delta, self.state)
+        block._fingerprint = self._fingerprint
+        return block
+
+
+class IncrementalRenderer:
+    '''Incremental renderer for successive versions of a document. The render
+       options are applied before each version is rendered.'''
+    rendered: int  # Number of blocks rendered by the last render.
+    reused: int  # Number of blocks reused by the last render.
+
+    def __init__(self, opts: Optional[options.RenderOptions] = None):
+        initial = renderer.Renderer()
+        initial.render('', opts)
+        self.initial = State(initial)
+        self.lines: List[str] = []
+        self.blocks: List[Block] = []
+        self.rendered = 0
+        self.reused = 0
+
+    def render(self, source: str) -> str:
+        '''Render Rimu markup source to HTML reusing the unchanged blocks of the
+           previous render.'''
+        lines = io.NEWLINE.split(io.normalize(source))
+        old = self.lines
+        # Count the unchanged leading and trailing lines.
+        prefix = 0
+        limit = min(len(old), len(lines))
+        while prefix < limit and old[prefix] == lines[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and old[-1 - suffix] == lines[-1 - suffix]:
+            suffix += 1
+        # Reuse the leading blocks that did not read changed lines.
+        reused = 0
+        while reused < len(self.blocks) and self.blocks[reused].extent <= prefix:
+            reused += 1
+        while reused > 0 and self.blocks[reused - 1].end is None:
+            reused -= 1
+        blocks = self.blocks[:reused]
+        start = blocks[-1].end if blocks else 0
+        assert start is not None
+        # Old blocks that rendering can stop at: unchanged trailing lines follow them.
+        delta = len(lines) - len(old)
+        stops: Dict[int, int] = {}
+        for i in range(reused, len(self.blocks)):
+            end = self.blocks[i].end
+            if end is not None and end >= len(old) - suffix:
+                stops[end + delta] = i
+        self.rendered = 0
+        state = blocks[-1].state if blocks else self.initial
+        work = state.renderer()
+        remaining = lines[start:]
+        reader = io.Reader(remaining)
+        with work.activate():
+            for html in document.renderBlocks(reader):
+                self.rendered += 1
+                if reader.source is None:
+                    end = None
+                    extent = len(lines) + 1  # The block read to the end of the source.
+                else:
+                    extent = start + len(remaining) - operator.length_hint(reader.source)
+                    end = extent - len(reader.lines)
+                    if list(reader.lines) != lines[end:extent]:
+                        end = None  # Read ahead lines have been updated.
+                block = Block(html, end, extent, State(work))
+                blocks.append(block)
+                if end is not None and end in stops:
+                    i = stops[end]
+                    if self.blocks[i].fingerprint() == block.fingerprint():
+                        # Converged: the remaining blocks are unchanged.
+                        blocks.extend(b.shift(delta) for b in self.blocks[i + 1:])
+                        reused += len(self.blocks) - i - 1
+                        break
+        self.lines = lines
+        self.blocks = blocks
+        self.reused = reused
+        return ''.join(b.html for b in blocks)
@@ -1,43 +1,156 @@
+import collections
+import itertools
+import mmap
 import re
-from typing import List, Match, Optional, Pattern
+from typing import Deque, Iterator, List, Match, Optional, Pattern, TextIO, Union
+
+from rimu import linekinds
+
+# Matches line terminators.
+NEWLINE = re.compile(r'\r\n|\r|\n')
+NEWLINE_BYTES = re.compile(rb'\r\n|\r|\n')
+# Number of characters read at a time from text streams.
+CHUNK_SIZE = 65536
+# Number of lines read and classified at a time by classifying readers.
+CLASSIFY_BATCH = 4096
+
+# Reader source types.
+Source = Union[str, TextIO, mmap.mmap]
+
+
+def normalize(text: str) -> str:
+    '''Replace characters reserved for internal use with spaces.'''
+    # Used internally by spans package.
+    text = text.replace('\u0000', ' ')
+    # Used internally by spans package.
+    text = text.replace('\u0001', ' ')
+    # Used internally by macros package.
+    text = text.replace('\u0002', ' ')
+    return text
+
+
+def splitLines(text: str) -> Iterator[str]:
+    '''Lazily split a text string on newline boundaries.'''
+    # Splits 'X\n\nX' into three lines and 'X\n' into two lines.
+    start = 0
+    for match in NEWLINE.finditer(text):
+        yield normalize(text[start:match.start()])
+        start = match.end()
+    yield normalize(text[start:])
+
+
+def mapLines(buffer: mmap.mmap) -> Iterator[str]:
+    '''Lazily split a memory-mapped UTF-8 file on newline boundaries.'''
+    start = 0
+    for match in NEWLINE_BYTES.finditer(buffer):
+        yield normalize(buffer[start:match.start()].decode())
+        start = match.end()
+    yield normalize(buffer[start:].decode())
+
+
+def readLines(stream: TextIO) -> Iterator[str]:
+    '''Lazily read lines from a text stream. Lines are split on newline boundaries
+       in the same way as text strings.'''
+    partial = ''  # Incomplete last line.
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        text = partial + normalize(chunk)
+        held = ''
+        if text.endswith('\r'):
+            # Could be the first half of a '\r\n' line terminator.
+            text = text[:-1]
+            held = '\r'
+        lines = NEWLINE.split(text)
+        partial = lines.pop() + held
+        yield from lines
+    yield from NEWLINE.split(partial)
 
 
 class Reader:
-    '''Rimu line oriented string reader.'''
-    lines: List[str]
-    pos: int    # Line index of current line.
-
-    def __init__(self, text: str):
-        # Used internally by spans package.
-        text = text.replace('\u0000', ' ')
-        # Used internally by spans package.
-        text = text.replace('\u0001', ' ')
-        # Used internally by macros package.
-        text = text.replace('\u0002', ' ')
-        # Split self.lines on newline boundaries.
-        # http:#stackoverflow.com/questions/1155678/javascript-string-newline-character
-        # Split is broken on IE8 e.g. 'X\n\nX'.split(/\n/g).length) returns 2 but should return 3.
-        self.lines = re.split(r'\r\n|\r|\n', text)
-        self.pos = 0
+    '''Rimu line oriented reader.
+       The source is a text string, a text stream, a memory-mapped UTF-8 file or
+       a list of normalized lines (see `splitLines()`).
+       Source lines are read as they are needed so memory use and the cost per line
+       are independent of the source length.
+       If a line `classifier` is specified lines are read in batches and each batch
+       is classified in a single pass (see `linekinds`).'''
+    lines: Deque[str]  # The cursor line followed by inserted (see `insert()`) and read ahead lines.
+    kinds: Optional[Deque[int]]  # The kinds of the lines, None if lines are not classified.
+
+    def __init__(self, source: Union[Source, List[str]], classifier: Optional[linekinds.Classifier] = None):
+        self.source: Optional[Iterator[str]]  # Unread source lines, None when exhausted.
+        if isinstance(source, str):
+            self.source = splitLines(source)
+        elif isinstance(source, mmap.mmap):
+            self.source = mapLines(source)
+        elif isinstance(source, list):
+            self.source = iter(source)
+        else:
+            self.source = readLines(source)
+        self.lines = collections.deque()
+        self.classifier = classifier
+        self.kinds = collections.deque() if classifier is not None else None
 
     @property
     def cursor(self) -> str:
         assert not self.eof()
-        return self.lines[self.pos]
+        return self.lines[0]
 
     @cursor.setter
     def cursor(self, value: str) -> None:
         assert not self.eof()
-        self.lines[self.pos] = value
+        self.lines[0] = value
+        if self.kinds is not None:
+            self.kinds[0] = linekinds.UNKNOWN
+
+    @property
+    def kind(self) -> int:
+        '''Return the kind of the cursor line (`linekinds.UNKNOWN` if lines are not classified).'''
+        assert not self.eof()
+        return self.kinds[0] if self.kinds is not None else linekinds.UNKNOWN
 
     def eof(self) -> bool:
-        '''Return true if the cursor has advanced over all input self.lines.'''
-        return self.pos >= len(self.lines)
+        '''Return true if the cursor has advanced over all input lines.'''
+        if not self.lines and self.source is not None:
+            if self.classifier is not None:
+                self.readBatch(self.classifier)
+            else:
+                line = next(self.source, None)
+                if line is None:
+                    self.source = None
+                else:
+                    self.lines.append(line)
+        return not self.lines
+
+    def readBatch(self, classifier: linekinds.Classifier) -> None:
+        '''Read and classify the next batch of source lines.'''
+        assert self.source is not None and self.kinds is not None
+        lines = list(itertools.islice(self.source, CLASSIFY_BATCH))
+        if len(lines) < CLASSIFY_BATCH:
+            self.source = None
+        if lines:
+            self.lines.extend(lines)
+            self.kinds.extend(classifier.classify('\n'.join(lines)))
 
     def next(self) -> None:
         '''Move cursor to next input line.'''
         if (not self.eof()):
-            self.pos += 1
+            self.lines.popleft()
+            if self.kinds is not None:
+                self.kinds.popleft()
+
+    def insert(self, lines: List[str]) -> None:
+        '''Insert lines just ahead of the cursor.'''
+        assert not self.eof()
+        cursor = self.lines.popleft()
+        self.lines.extendleft(reversed(lines))
+        self.lines.appendleft(cursor)
+        if self.kinds is not None:
+            kind = self.kinds.popleft()
+            self.kinds.extendleft([linekinds.UNKNOWN] * len(lines))
+            self.kinds.appendleft(kind)
 
     def readTo(self, regexp: Pattern[str]) -> List[str]:
         '''Read to the first line matching the regexp.
@@ -0,0 +1,339 @@
+'''
+ This module implements the Rimu intermediate representation (IR).
+
+ `parse()` renders a document and returns its block and inline element tree.
+ The tree contains the rendered HTML with the raw HTML (inline tags and HTML
+ blocks) kept in separate nodes, so `render()` emits the HTML for other
+ safeMode and htmlReplacement option values without reparsing the document.
+
+ The tree is recorded during a normal render: the block and inline renderers
+ bracket the HTML of each element with marker tokens (see `Recorder`) and the
+ tree is built from the marked up HTML. The tree is JSON serializable, nodes
+ are:
+
+    text                                 Literal HTML.
+    ['block', name, newline, *children]  Block element, newline is 1 if the
+                                         block HTML is followed by a newline.
+    ['quote', quote, *children]          Quoted text element.
+    ['replacement', *children]           Replacement element.
+    ['html', raw]                        Raw HTML.
+    ['safeMode', classes, *children]     Children rendered with safeMode
+                                         values of the classes.
+    ['fixed', html, replacements]        Rendered HTML by raw HTML filter
+                                         (safeMode & 0x3), see below.
+
+ Apart from the raw HTML filter, safeMode values differ in whether macro
+ definitions, Block Attributes and API options are processed. The safeMode
+ values are partitioned into classes that make the same decisions (see
+ `safeModeClass()`). The recorder notes the decisions a render makes and the
+ document is rendered again for each class that would decide differently; if
+ the trees differ the IR contains a `safeMode` node for each distinct tree.
+
+ If a document's HTML depends on the raw HTML filter in ways the tree cannot
+ represent (Block Attributes injected into raw HTML, macros expanded in HTML
+ blocks or a safeMode changed by the document) the class is rendered with each
+ raw HTML filter to a `fixed` node. `replacements` maps the filters whose HTML
+ contains the htmlReplacement to the htmlReplacement value: a fixed node only
+ renders with that htmlReplacement.
+'''
+
+import copy
+import re
+from typing import Any, Callable, Dict, List, Optional, Pattern, Set, Tuple
+
+from rimu import document, io, options, renderer
+from rimu.expansion import Expand
+
+FORMAT = 1  # Incremented when the IR format changes.
+
+IR = Dict[str, Any]
+Node = Any  # A text string or a node list.
+
+# safeMode class representatives.
+CLASSES = (0, 1, 5, 9, 13)
+# safeMode dependent decisions and their outcome for a safeMode.
+DECISIONS: Dict[str, Callable[[int], bool]] = {
+    'safeMode': lambda safeMode: safeMode != 0,  # See `options.isSafeModeNz()`.
+    'blockAttributes': lambda safeMode: safeMode & 0x4 != 0,  # See `options.skipBlockAttributes()`.
+    'macroDefinitions': lambda safeMode: safeMode != 0 and safeMode & 0x8 == 0,  # See `options.skipMacroDefs()`.
+}
+
+
+def safeModeClass(safeMode: int) -> int:
+    '''Return the representative of the safeMode class: safeMode values
+       that make the same decisions.'''
+    return 0 if safeMode == 0 else 1 | (safeMode & 0xC)
+
+
+class Recorder:
+    '''Marks the start and end of rendered elements with tokens:
+       `<marker>&<code><index><marker>`. The `&` ensures tokens are mangled
+       (and the tree rejected) if they are escaped as text.'''
+    marker: str  # A private use character that does not occur in the source.
+    safeMode: int  # The safeMode the document is rendered with.
+    labels: List[str]  # Block names and quotes.
+    raw: List[str]  # Raw HTML.
+    fixed: bool  # True if the document changed the safeMode.
+    filtered: bool  # True if the HTML depends on the raw HTML filter.
+    decisions: Set[str]  # The safeMode dependent decisions made (see `DECISIONS`).
+    tokens: Pattern[str]  # Matches tokens, $1 is the code, $2 is the index.
+
+    def __init__(self, marker: str, safeMode: int):
+        self.marker = marker
+        self.safeMode = safeMode
+        self.labels = []
+        self.raw = []
+        self.fixed = False
+        self.filtered = False
+        self.decisions = set()
+        marker = re.escape(marker)
+        self.tokens = re.compile(f'{marker}&([bqrhen])(\\d*){marker}')
+
+    def decide(self, *names: str) -> None:
+        '''Called when the render makes safeMode dependent decisions.'''
+        self.decisions.update(names)
+
+    def agrees(self, safeMode: int) -> bool:
+        '''Return True if a render with `safeMode` makes the same decisions.'''
+        return all(DECISIONS[name](safeMode) == DECISIONS[name](self.safeMode) for name in self.decisions)
+
+    def token(self, code: str, index: Optional[int] = None) -> str:
+        return f'{self.marker}&{code}{"" if index is None else index}{self.marker}'
+
+    def label(self, code: str, label: str) -> str:
+        self.labels.append(label)
+        return self.token(code, len(self.labels) - 1)
+
+    def html(self, html: str, safeMode: int) -> str:
+        '''Record raw HTML (see `options.htmlSafeModeFilter()`).'''
+        if safeMode != self.safeMode:
+            self.fixed = True  # The safeMode has been changed by the document.
+        self.raw.append(html)
+        return self.token('h', len(self.raw) - 1) + html + self.token('e')
+
+    def replacement(self, text: str) -> str:
+        '''Return replacement text bracketed with tokens.'''
+        return self.token('r') + text + self.token('e')
+
+    def quote(self, quote: str, openTag: str, closeTag: str) -> Tuple[str, str]:
+        '''Return quote tags bracketed with tokens.'''
+        return self.label('q', quote) + openTag, closeTag + self.token('e')
+
+    def block(self, name: str, reader: io.Reader, writer: io.Writer, start: int) -> None:
+        '''Bracket the block HTML written from writer buffer index `start`
+           with tokens.'''
+        buffer = writer.buffer
+        if not ''.join(buffer[start:]):
+            return  # The block generated no HTML.
+        newline = buffer[-1] == '\n' and not reader.eof()
+        if newline:
+            buffer.pop()
+        if name == 'html' and '{' in ''.join(buffer[start:]):
+            # Macro invocations are expanded after the HTML is filtered.
+            self.filtered = True
+        buffer.insert(start, self.label('b', name))
+        buffer.append(self.token('n' if newline else 'e'))
+
+    def inject(self, tag: str) -> None:
+        '''Called before Block Attributes are injected into `tag`.'''
+        if self.marker + '&h' in tag:
+            self.filtered = True  # The attributes would be injected into the filtered HTML.
+
+    def tree(self, html: str) -> Optional[List[Node]]:
+        '''Build the tree from the recorded HTML, return None if the tokens are
+           malformed.'''
+        parts = self.tokens.split(html)
+        root: List[Node] = []
+        stack = [root]
+        for i in range(0, len(parts), 3):
+            text = parts[i]
+            if self.marker in text:
+                return None  # Mangled token.
+            if text:
+                stack[-1].append(text)
+            if i + 1 == len(parts):
+                break
+            code, index = parts[i + 1], parts[i + 2]
+            node = stack[-1]
+            if len(stack) > 1 and node[0] == 'html' and code not in 'en':
+                return None  # Elements cannot be nested in raw HTML.
+            if code in 'en':
+                if len(stack) == 1 or (code == 'n' and node[0] != 'block'):
+                    return None
+                stack.pop()
+                if node[0] == 'html':
+                    raw = ''.join(node[2:])
+                    if raw != self.raw[node[1]]:
+                        self.filtered = True  # The raw HTML has been modified.
+                    node[1:] = [raw]
+                elif code == 'n':
+                    node[2] = 1
+                stack[-1].append(node)
+                continue
+            if not index.isdigit() and code != 'r':
+                return None
+            if code == 'b':
+                node = ['block', self.labels[int(index)], 0]
+            elif code == 'q':
+                node = ['quote', self.labels[int(index)]]
+            elif code == 'r':
+                node = ['replacement']
+            else:
+                node = ['html', int(index)]
+            stack.append(node)
+        if len(stack) != 1:
+            return None
+        return root
+
+
+def chooseMarker(r: renderer.Renderer, source: str) -> str:
+    '''Return a private use character that does not occur in the source, the
+       htmlReplacement option or the renderer definitions.'''
+    text = ''.join([source, r.htmlReplacement]
+                   + [m.value for m in r.macroDefs.values()]
+                   + [d.quote + d.openTag + d.closeTag for d in r.quoteDefs]
+                   + [d.match.pattern + d.replacement for d in r.replacementDefs]
+                   + [d.openTag + d.closeTag for d in r.blockDefs])
+    for c in range(0xE000, 0xF900):
+        if chr(c) not in text:
+            return chr(c)
+    return ''  # The tree builder will reject forged tokens.
+
+
+def parse(r: renderer.Renderer, source: str, opts: Optional[options.RenderOptions] = None) -> IR:
+    '''Parse Rimu markup source with renderer `r` and return the IR. The
+       renderer state is updated and messages are reported as if the source
+       had been rendered.'''
+    if opts is None:
+        opts = options.RenderOptions()
+    p = r.copy()
+    messages: List[options.CallbackMessage] = []
+    parseOpts = copy.copy(opts)
+    parseOpts.callback = messages.append
+    parseOpts.profiler = None
+    p.render('', parseOpts)  # Apply the options.
+    initial = p.copy()
+    initial.callback = None
+    marker = chooseMarker(p, source)
+    recorder, tree = record(p, source, marker)
+    if tree is None or recorder.fixed or recorder.filtered:
+        # The recorded render (which keeps the raw HTML) differs from a render.
+        r.render(source, opts)
+    else:
+        # Update the renderer state from the parse renderer.
+        r.restore(p.snapshot())
+        for field in renderer.OPTION_FIELDS:
+            setattr(r, field, getattr(p, field))
+        r.opts = Expand.copyFrom(p.opts)
+        r.ids = p.ids
+        r.callback = opts.callback
+        r.profiler = opts.profiler
+        if opts.callback is not None:
+            for message in messages:
+                message.text = recorder.tokens.sub('', message.text)
+                opts.callback(message)
+    # Record the document for each safeMode class (renders that make the same decisions are reused).
+    recordings = [(recorder, tree)]
+    variants: List[Tuple[List[int], List[Node]]] = []
+    for c in CLASSES:
+        recording = next((rec for rec in recordings if rec[0].agrees(c)), None)
+        if recording is None:
+            v = initial.copy()
+            v.safeMode = c
+            recording = record(v, source, marker)
+            recordings.append(recording)
+        nodes = variant(initial, source, c, *recording)
+        for classes, other in variants:
+            if other == nodes:
+                classes.append(c)
+                break
+        else:
+            variants.append(([c], nodes))
+    blocks = variants[0][1] if len(variants) == 1 else [['safeMode', classes] + nodes for classes, nodes in variants]
+    return {'format': FORMAT, 'safeMode': initial.safeMode, 'htmlReplacement': initial.htmlReplacement,
+            'blocks': blocks}
+
+
+def record(r: renderer.Renderer, source: str, marker: str) -> Tuple[Recorder, Optional[List[Node]]]:
+    '''Render the source with renderer `r` and return the recorder and the
+       tree (None if the tree could not be built).'''
+    recorder = Recorder(marker, r.safeMode)
+    r.recorder = recorder
+    try:
+        with r.activate():
+            html = document.render(source)
+    finally:
+        r.recorder = None
+    tree = recorder.tree(html)
+    return recorder, tree
+
+
+def variant(initial: renderer.Renderer, source: str, c: int,
+            recorder: Recorder, tree: Optional[List[Node]]) -> List[Node]:
+    '''Return the nodes for safeMode class `c` from a recording that makes
+       the class's decisions. If the tree cannot represent the class the source
+       is rendered from the `initial` renderer state with each raw HTML filter.'''
+    if tree is not None and not recorder.fixed and not recorder.filtered:
+        return tree
+    html: Dict[str, str] = {}
+    replacements: Dict[str, str] = {}
+    for mode in range(4):
+        safeMode = (c & 0xC) | mode
+        if safeModeClass(safeMode) != c:
+            continue
+        v = initial.copy()
+        v.safeMode = safeMode
+        html[str(mode)] = v.render(source)
+        if mode == 2 or recorder.fixed:
+            replacements[str(mode)] = initial.htmlReplacement
+    return [['fixed', html, replacements]]
+
+
+def render(ir: IR, safeMode: Optional[int] = None, htmlReplacement: Optional[str] = None) -> str:
+    '''Render the IR to HTML, safeMode and htmlReplacement default to the
+       values the IR was parsed with. Raise ValueError if the IR cannot be
+       rendered with the htmlReplacement.'''
+    if not isinstance(ir, dict) or ir.get('format') != FORMAT:
+        raise ValueError('unsupported IR format')
+    if safeMode is None:
+        safeMode = ir['safeMode']
+    if htmlReplacement is None:
+        htmlReplacement = ir['htmlReplacement']
+    if not isinstance(safeMode, int) or not 0 <= safeMode <= 15:
+        raise ValueError(f'illegal safeMode value: {safeMode}')
+    return emit(ir['blocks'], safeMode, htmlReplacement, False)
+
+
+def emit(nodes: List[Node], safeMode: int, htmlReplacement: str, htmlBlock: bool) -> str:
+    '''Return the HTML of the nodes.'''
+    result: List[str] = []
+    for node in nodes:
+        if isinstance(node, str):
+            result.append(node)
+            continue
+        kind = node[0]
+        if kind == 'block':
+            html = emit(node[3:], safeMode, htmlReplacement, node[1] == 'html')
+            result.append(html)
+            if html and node[2]:
+                result.append('\n')
+        elif kind == 'quote':
+            result.append(emit(node[2:], safeMode, htmlReplacement, False))
+        elif kind == 'replacement':
+            result.append(emit(node[1:], safeMode, htmlReplacement, False))
+        elif kind == 'html':
+            if htmlBlock and safeMode & 0x3 == 2 and '{' in htmlReplacement:
+                # Macros are expanded in HTML blocks after the HTML is replaced.
+                raise ValueError('htmlReplacement containing macro invocations cannot replace HTML blocks')
+            result.append(options.filterHtml(node[1], safeMode, htmlReplacement))
+        elif kind == 'safeMode':
+            if safeModeClass(safeMode) in node[1]:
+                result.append(emit(node[2:], safeMode, htmlReplacement, False))
+        elif kind == 'fixed':
+            mode = str(safeMode & 0x3)
+            if node[2].get(mode, htmlReplacement) != htmlReplacement:
+                raise ValueError(f'IR cannot be rendered with htmlReplacement: {htmlReplacement}')
+            result.append(node[1][mode])
+        else:
+            raise ValueError(f'illegal IR node: {kind}')
+    return ''.join(result)
@@ -1,9 +1,11 @@
+import functools
+import operator
 import re
 from typing import Callable, List, Match, Optional, Pattern
 
-from rimu import (blockattributes, delimitedblocks, expansion, io, macros,
-                  options, quotes, replacements, utils)
-from rimu.expansion import Expand
+from rimu import (blockattributes, delimitedblocks, dispatch, expansion, io,
+                  linekinds, macros, options, quotes, renderer, replacements,
+                  utils)
 
 # Custom types.
 Verify = Optional[Callable[[Match[str], io.Reader], bool]]   # Additional match verification checks.
@@ -11,11 +13,13 @@ Filter = Optional[Callable[[Match[str], io.Reader, 'Def'], str]]
 
 
 class Def:
+    __slots__ = ('match', 'replacement', 'name', 'verify', 'filter', 'kind')
     match: Pattern[str]
     replacement: str
     name: str  # Optional unique identifier.
     verify: Verify
     filter: Filter
+    kind: int  # Line kind (see `linekinds`).
 
     def __init__(self,
                  match: Pattern[str],
@@ -23,12 +27,14 @@ class Def:
                  name: str = '',
                  verify: Optional[Verify] = None,
                  filter: Optional[Filter] = None,
+                 kind: int = linekinds.OTHER,
                  ) -> None:
         self.match = match
         self.replacement = replacement
         self.name = name
         self.verify = verify
         self.filter = filter
+        self.kind = kind
 
 
 def verifyMacroLine(match: Match[str], reader: io.Reader) -> bool:
@@ -42,15 +48,14 @@ def verifyMacroLine(match: Match[str], reader: io.Reader) -> bool:
         # This stops infinite recursion.
         return False
     # Insert the macro value into the reader just ahead of the cursor.
-    pos = reader.pos+1
-    reader.lines[pos:pos] = value.split('\n')
+    reader.insert(value.split('\n'))
     return True
 
 
 def blockDefFilter(match: Match[str], *_) -> str:
     if options.isSafeModeNz():
         return ''  # Skip if a safe mode is set.
-    value = utils.replaceInline(match[2], Expand(macros=True))
+    value = utils.replaceInline(match[2], expansion.MACROS)
     delimitedblocks.setDefinition(match[1], value)
     return ''
 
@@ -60,8 +65,8 @@ def quoteDefFilter(match: Match[str], *_) -> str:
         return ''  # Skip if a safe mode is set.
     quotes.setDefinition(quotes.Def(
         quote=match[1],
-        openTag=utils.replaceInline(match[2], Expand(macros=True)),
-        closeTag=utils.replaceInline(match[4], Expand(macros=True)),
+        openTag=utils.replaceInline(match[2], expansion.MACROS),
+        closeTag=utils.replaceInline(match[4], expansion.MACROS),
         spans=match[3] == '|')
     )
     return ''
@@ -73,7 +78,7 @@ def replacementDefFilter(match: Match[str], *_) -> str:
     pattern = match[1]
     flags = match[2]
     replacement = match[3]
-    replacement = utils.replaceInline(replacement, Expand(macros=True))
+    replacement = utils.replaceInline(replacement, expansion.MACROS)
     replacements.setDefinition(pattern, flags, replacement)
     return ''
 
@@ -81,7 +86,7 @@ def replacementDefFilter(match: Match[str], *_) -> str:
 def macroDefFilter(match: Match[str], *_) -> str:
     name = match[1]
     value = match[2]
-    value = utils.replaceInline(value, Expand(macros=True))
+    value = utils.replaceInline(value, expansion.MACROS)
     macros.setValue(name, value)
     return ''
 
@@ -89,7 +94,7 @@ def macroDefFilter(match: Match[str], *_) -> str:
 def headerFilter(match: Match[str], _, d: Def) -> str:
     if macros.getValue('--header-ids') and blockattributes.id == '':
         blockattributes.id = blockattributes.slugify(match[2])
-    result = utils.replaceMatch(match, d.replacement, Expand(macros=True))
+    result = utils.replaceMatch(match, d.replacement, expansion.MACROS)
     # Replace $1 with header number e.g. "<h###>" -> "<h3>"
     result = result.replace(match[1] + '>', str(len(match[1])) + '>')
     return result
@@ -100,12 +105,12 @@ def anchorFilter(match: Match[str], _, d: Def) -> str:
         return ''
     else:
         # Default(non-filter) replacement processing.
-        return utils.replaceMatch(match, d.replacement, Expand(macros=True))
+        return utils.replaceMatch(match, d.replacement, expansion.MACROS)
 
 
 def apiOptionFilter(match: Match[str], *_) -> str:
     if not options.isSafeModeNz():
-        value = utils.replaceInline(match[2], Expand(macros=True))
+        value = utils.replaceInline(match[2], expansion.MACROS)
         options.setOption(match[1], value)
     return ''
 
@@ -114,6 +119,7 @@ defs: List[Def] = [
     # Comment line.
     Def(
         match=re.compile(r'^\\?\/{2}(.*)$'),
+        kind=linekinds.COMMENT,
     ),
     # Expand lines prefixed with a macro invocation prior to all other processing.
     # macro name = $1, macro value = $2
@@ -121,49 +127,60 @@ defs: List[Def] = [
         match=macros.MATCH_LINE,
         verify=verifyMacroLine,
         filter=lambda *_:'',     # Already processed in the `verify` function.
+        kind=linekinds.MACRO,
     ),
     # Delimited Block definition.
     # name = $1, definition = $2
     Def(
         match=re.compile(r"^\\?\|([\w\-]+)\|\s*=\s*'(.*)'$"),
         filter=blockDefFilter,
+        kind=linekinds.LINE_BLOCK,
     ),
     # Quote definition.
     # quote = $1, openTag = $2, separator = $3, closeTag = $4
     Def(
         match=re.compile(r"^(\S{1,2})\s*=\s*'([^|]*)(\|{1,2})(.*)'$"),
         filter=quoteDefFilter,
+        kind=linekinds.LINE_BLOCK,
     ),
     # Replacement definition.
     # pattern = $1, flags = $2, replacement = $3
     Def(
         match=re.compile(r"^\\?\/(.+)\/([igm]*)\s*=\s*'(.*)'$"),
         filter=replacementDefFilter,
+        kind=linekinds.LINE_BLOCK,
     ),
     # Macro definition.
     # name = $1, value = $2
     Def(
         match=macros.LINE_DEF,
         filter=macroDefFilter,
+        kind=linekinds.MACRO,
     ),
     # Headers.
     # $1 is ID, $2 is header text.
     Def(
         match=re.compile(r'^\\?([#=]{1,6})\s+(.+?)(?:\s+\1)?$'),
         replacement=r'<h$1>$$2</h$1>',
+        name='header',
         filter=headerFilter,
+        kind=linekinds.HEADER,
     ),
     # Block image: < image: src | alt >
     # src = $1, alt = $2
     Def(
         match=re.compile(r'^\\?<image:([^\s|]+)\|(.+?)>$'),
         replacement=r'<img src="$1" alt="$2">',
+        name='image-alt',
+        kind=linekinds.LINE_BLOCK,
     ),
     # Block image: < image: src >
     # src = $1, alt = $1
     Def(
         match=re.compile(r'^\\?<image:([^\s|]+?)>$'),
         replacement=r'<img src="$1" alt="$1">',
+        name='image',
+        kind=linekinds.LINE_BLOCK,
     ),
     # DEPRECATED as of 3.4.0.
     # Block anchor: <<  # id>>
@@ -171,7 +188,9 @@ defs: List[Def] = [
     Def(
         match=re.compile(r'^\\?<<#([a-zA-Z][\w\-]*)>>$'),
         replacement=r'<div id="$1"></div>',
+        name='anchor',
         filter=anchorFilter,
+        kind=linekinds.LINE_BLOCK,
     ),
     # Block Attributes.
     # Syntax: .class-names  # id [html-attributes] block-options
@@ -179,16 +198,23 @@ defs: List[Def] = [
         name='attributes',
         # A loose match because Block Attributes can contain macro references.
         match=re.compile(r'^\\?\.[a-zA-Z#"\[+-].*$'),
-        verify=lambda match, _: blockattributes.parse(match[0])
+        verify=lambda match, _: blockattributes.parse(match[0]),
+        kind=linekinds.ATTRIBUTES,
     ),
     # API Option.
     # name = $1, value = $2
     Def(
         match=re.compile(r"^\\?\.(\w+)\s*=\s*'(.*)'$"),
         filter=apiOptionFilter,
+        kind=linekinds.ATTRIBUTES,
     ),
 ]
 
+# Skips definitions that cannot match the first character of the line.
+TABLE = dispatch.Table(tuple(d.match for d in defs))
+# The line kinds of all definitions.
+KINDS = functools.reduce(operator.or_, (d.kind or linekinds.UNKNOWN for d in defs))
+
 
 def render(reader: io.Reader, writer: io.Writer, allowed: Optional[List[str]] = None) -> bool:
     '''If the next element in the reader is a valid line block render it
@@ -197,9 +223,18 @@ def render(reader: io.Reader, writer: io.Writer, allowed: Optional[List[str]] =
         allowed = []
     if reader.eof():
         options.panic('premature eof')
-    for d in defs:
+    if not reader.kind & KINDS:
+        return False
+    i = -1
+    while True:
+        i = TABLE.next(reader.cursor, i)
+        if i == -1:
+            break
+        d = defs[i]
         if allowed and d.name not in allowed:
             continue
+        if d.kind and not d.kind & reader.kind:
+            continue  # The line is not of the definition's kind.
         match = d.match.search(reader.cursor)
         if match is not None:
             if match[0][0] == '\\':
@@ -208,17 +243,23 @@ def render(reader: io.Reader, writer: io.Writer, allowed: Optional[List[str]] =
                 continue
             if d.verify and not d.verify(match, reader):
                 continue
+            r = renderer.current()
+            if r.profiler is not None:
+                r.profiler.matched(d.name or d.match.pattern)
             text: str
             if d.filter:
                 text = d.filter(match, reader, d)
             else:
-                text = utils.replaceMatch(match, d.replacement, Expand(macros=True)) if d.replacement else ''
+                text = utils.replaceMatch(match, d.replacement, expansion.MACROS) if d.replacement else ''
             if text:
                 text = blockattributes.injectHtmlAttributes(text)
+                start = len(writer.buffer)
                 writer.write(text)
                 reader.next()
                 if not reader.eof():
                     writer.write('\n')  # Add a trailing '\n' if there are more lines.
+                if r.recorder is not None:
+                    r.recorder.block(d.name or 'line', reader, writer, start)
             else:
                 reader.next()
             return True
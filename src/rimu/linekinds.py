@@ -0,0 +1,93 @@
+'''
+ This module implements source line classification.
+
+ The optional line classification pass (see the `classifyLines` API option)
+ classifies source lines by sweeping a multiline scanner for each line kind
+ over the text of a batch of lines. Each line is assigned a kind: a set of bit flags naming
+ the block elements the line could open. Block renderers skip definitions whose
+ kind the line does not have without evaluating their regular expressions.
+
+ Classification is conservative: a line may be given kinds it does not match
+ (the scanner can match across line boundaries) but it is never missing the
+ kind of a definition that matches it. A line with no kinds (`OTHER`) can only
+ be paragraph text.
+'''
+
+import functools
+import re
+from typing import Dict, List, Pattern, Set, Tuple
+
+from rimu import dispatch
+
+# Line kinds.
+OTHER = 0x00  # Paragraph text.
+BLANK = 0x01  # Blank line.
+COMMENT = 0x02  # Comment line or comment block delimiter.
+HEADER = 0x04  # Header line.
+LIST_ITEM = 0x08  # List item.
+DELIMITER = 0x10  # Delimited block opening delimiter.
+ATTRIBUTES = 0x20  # Block Attributes or API option line.
+MACRO = 0x40  # Macro invocation line or macro definition.
+LINE_BLOCK = 0x80  # Other line blocks: definitions, images and anchors.
+UNKNOWN = 0xFF  # Unclassified line (could be any kind).
+
+# Matches blank lines.
+BLANK_LINE = r'[^\S\n]*$'
+# Numbered backreferences (and other escapes) in regular expression source.
+BACKREF = re.compile(r'\\([1-9][0-9]?)|\\.', re.DOTALL)
+
+
+class Classifier:
+    '''Line classifier for a tuple of (pattern, kind) definitions.'''
+    scanners: List[Tuple[Pattern[str], int]]  # Multiline scanners and the kind of the lines they match.
+
+    def __init__(self, definitions: Tuple[Tuple[Pattern[str], int], ...]):
+        alternatives: Dict[int, List[str]] = {BLANK: [BLANK_LINE]}  # Scanner alternatives for each kind.
+        chars: Dict[int, Set[str]] = {}  # First characters (and class escapes) for each kind.
+        for pattern, kind in definitions:
+            if not kind:
+                continue
+            alternatives.setdefault(kind, [])
+            first = dispatch.firstChars(pattern)
+            if first is not None and all(c in dispatch.CATEGORY_ESCAPES for c in first.categories):
+                # Testing the first character is cheaper than matching the pattern.
+                chars.setdefault(kind, set()).update(
+                    [re.escape(c) for c in first.chars] + [dispatch.CATEGORY_ESCAPES[c] for c in first.categories])
+            elif pattern.flags & ~(re.UNICODE | re.IGNORECASE) or pattern.groupindex:
+                alternatives[kind].append('')  # Matches any line.
+            else:
+                source = renumber(pattern.pattern, sum(re.compile(a).groups for a in alternatives[kind]))
+                if pattern.flags & re.IGNORECASE:
+                    source = '(?i:' + source + ')'
+                alternatives[kind].append(source)
+        for kind, cs in chars.items():
+            alternatives[kind].append(r'(?!\n)[' + ''.join(sorted(cs)) + ']')
+        # Each scanner matches the newline preceding the lines of its kind (searching
+        # for the newline is much faster than testing every position for a line start).
+        self.scanners = [(re.compile('\n(?=' + '|'.join(alts) + ')', re.MULTILINE), kind)
+                         for kind, alts in sorted(alternatives.items())]
+
+    def classify(self, text: str) -> bytearray:
+        '''Return the kinds of the newline separated lines in `text`.'''
+        text = '\n' + text
+        result = bytearray(text.count('\n'))
+        for scanner, kind in self.scanners:
+            lineno = 0
+            last = 0
+            for match in scanner.finditer(text):
+                start = match.start()
+                lineno += text.count('\n', last, start)
+                last = start
+                result[lineno] |= kind
+        return result
+
+
+def renumber(pattern: str, offset: int) -> str:
+    '''Offset the numbered backreferences in regular expression source.'''
+    return BACKREF.sub(lambda m: m[0] if m[1] is None else '\\' + str(int(m[1]) + offset), pattern)
+
+
+@functools.lru_cache(maxsize=32)
+def classifier(definitions: Tuple[Tuple[Pattern[str], int], ...]) -> Classifier:
+    '''Return the (cached) line classifier for (pattern, kind) definitions.'''
+    return Classifier(definitions)
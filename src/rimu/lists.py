@@ -1,12 +1,12 @@
 import re
 from typing import List, Match, Optional, Pattern
 
-from rimu import (blockattributes, delimitedblocks, expansion, io, lineblocks,
-                  options, utils)
-from rimu.expansion import Expand
+from rimu import (blockattributes, delimitedblocks, dispatch, expansion, io,
+                  linekinds, lineblocks, options, renderer, utils)
 
 
 class Def:
+    __slots__ = ('match', 'listOpenTag', 'listCloseTag', 'itemOpenTag', 'itemCloseTag', 'termOpenTag', 'termCloseTag')
     match: Pattern[str]
     listOpenTag: str
     listCloseTag: str
@@ -35,6 +35,7 @@ class Def:
 
 # Information about a matched list item element.
 class ItemInfo:
+    __slots__ = ('match', 'listdef', 'id')
     match: Match[str]
     listdef: 'Def'
     id: str  # List ID.
@@ -71,27 +72,35 @@ defs: List[Def] = [
         termCloseTag='</dt>'),
 ]
 
-ids: List[str] = []  # Stack of open list IDs.
+# Skips definitions that cannot match the first character of the line.
+TABLE = dispatch.Table(tuple(d.match for d in defs))
+
+ids: List[str]  # Stack of open list IDs (bound to the current renderer).
 
 
 def render(reader: io.Reader, writer: io.Writer) -> bool:
-    global ids
     if reader.eof():
         options.panic('premature eof')
     startItem: Optional[ItemInfo]
     startItem = matchItem(reader)
     if startItem is None:
         return False
-    ids = []
+    r = renderer.current()
+    if r.profiler is not None:
+        r.profiler.matched(startItem.listdef.match.pattern)
+    r.listIds = []
+    start = len(writer.buffer)
     renderList(startItem, reader, writer)
+    if r.recorder is not None:
+        r.recorder.block('list', reader, writer, start)
     # ids should now be empty.
-    if ids:
+    if r.listIds:
         options.panic('list stack failure')
     return True
 
 
 def renderList(item: ItemInfo, reader: io.Reader, writer: io.Writer) -> Optional[ItemInfo]:
-    ids.append(item.id)
+    renderer.current().listIds.append(item.id)
     writer.write(blockattributes.injectHtmlAttributes(item.listdef.listOpenTag))
     nextItem: Optional[ItemInfo]
     while True:
@@ -99,21 +108,21 @@ def renderList(item: ItemInfo, reader: io.Reader, writer: io.Writer) -> Optional
         if nextItem is None or nextItem.id != item.id:
             # End of list or next item belongs to parent list.
             writer.write(item.listdef.listCloseTag)
-            ids.pop()
+            renderer.current().listIds.pop()
             return nextItem
         item = nextItem
 
 
 def renderListItem(item: ItemInfo, reader: io.Reader, writer: io.Writer) -> Optional[ItemInfo]:
     '''Render the current list item, return the next list item or null if there are no more items.'''
-    global ids
+    r = renderer.current()
     d = item.listdef
     match = item.match
     text: str
     if d.termOpenTag:  # => definition list.
         writer.write(blockattributes.injectHtmlAttributes(d.termOpenTag, consume=False))
         blockattributes.id=''
-        text = utils.replaceInline(match[1], Expand(macros=True, spans=True))
+        text = utils.replaceInline(match[1], expansion.MACROS_SPANS)
         writer.write(text)
         writer.write(d.termCloseTag)
     writer.write(blockattributes.injectHtmlAttributes(d.itemOpenTag))
@@ -135,7 +144,7 @@ def renderListItem(item: ItemInfo, reader: io.Reader, writer: io.Writer) -> Opti
             break
         nextItem = matchItem(reader)
         if nextItem:
-            if nextItem.id in ids:
+            if nextItem.id in r.listIds:
                 # Next item belongs to current list or a parent list.
                 pass
             else:
@@ -145,8 +154,8 @@ def renderListItem(item: ItemInfo, reader: io.Reader, writer: io.Writer) -> Opti
         if attachedDone:
             break  # Multiple attached blocks are not permitted.
         if blankLines == 0:
-            savedIds = ids
-            ids = []
+            savedIds = r.listIds
+            r.listIds = []
             if delimitedblocks.render(reader, attachedLines,
                                       allowed=['comment', 'code', 'division', 'html', 'quote']):
                 attachedDone = True
@@ -154,7 +163,7 @@ def renderListItem(item: ItemInfo, reader: io.Reader, writer: io.Writer) -> Opti
                 # Item body line.
                 itemLines.write(reader.cursor + '\n')
                 reader.next()
-            ids = savedIds
+            r.listIds = savedIds
         elif blankLines == 1:
             if delimitedblocks.render(reader, attachedLines, ['indented', 'quote-paragraph']):
                 attachedDone = True
@@ -162,7 +171,7 @@ def renderListItem(item: ItemInfo, reader: io.Reader, writer: io.Writer) -> Opti
                 break
     # Write item text.
     text = itemLines.toString().strip()
-    text = utils.replaceInline(text, Expand(macros=True, spans=True))
+    text = utils.replaceInline(text, expansion.MACROS_SPANS)
     writer.write(text)
     # Write attachment and child list.
     writer.buffer.extend(attachedLines.buffer)
@@ -194,9 +203,16 @@ def matchItem(reader: io.Reader) -> Optional[ItemInfo]:
     # Check if the line matches a List definition.
     if reader.eof():
         return None
+    if not reader.kind & linekinds.LIST_ITEM:
+        return None
     item = ItemInfo()  # ItemInfo factory.
     # Check if the line matches a list item.
-    for d in defs:
+    i = -1
+    while True:
+        i = TABLE.next(reader.cursor, i)
+        if i == -1:
+            break
+        d = defs[i]
         match = d.match.search(reader.cursor)
         if match is not None:
             if match[0][0] == '\\':
@@ -208,3 +224,6 @@ def matchItem(reader: io.Reader) -> Optional[ItemInfo]:
             item.id = match[match.re.groups - 1]
             return item
     return None
+
+
+renderer.bindModuleState(__name__, {'ids': 'listIds'})
@@ -1,7 +1,8 @@
+import functools
 import re
-from typing import Any, List, Optional, Type
+from typing import Callable, Dict, List, Optional, Pattern
 
-from rimu import options, spans
+from rimu import options, renderer, spans
 
 # Matches a line starting with a macro invocation. $1 = macro invocation.
 MATCH_LINE = re.compile(r'^({(?:[\w\-]+)(?:[!=|?](?:|.*?[^\\]))?}).*$')
@@ -10,9 +11,25 @@ LINE_DEF = re.compile(r"^\\?{([\w\-]+\??)}\s*=\s*'(.*)'$")
 # Match multi-line macro definition literal value open delimiter. $1 is first line of macro.
 DEF_OPEN = re.compile(r"^\\?{[\w\-]+\??}\s*=\s*'(.*)$")
 DEF_CLOSE = re.compile(r"^(.*)'$")
+# Parametrized, Inclusion and Exclusion invocations.
+MATCH_COMPLEX = re.compile(r'\\?{([\w\-]+)([!=|?](?:|.*?[^\\]))}', re.DOTALL)
+# Simple macro invocation.
+MATCH_SIMPLE = re.compile(r'\\?{([\w\-]+)()}')
+# Simple, Parametrized, Inclusion and Exclusion invocations: $1 = name, $2 = params (None if Simple).
+MATCH_MACRO = re.compile(r'\\?{([\w\-]+)(?:}|([!=|?](?:|.*?[^\\]))})', re.DOTALL)
+# Matches macro definition formal parameters[$]$< param-number > [[\]: < default-param-value >$]
+# 1st group: [$]$
+# 2nd group: < param-number > (1, 2..)
+# 3rd group: [\]: < default-param-value >$
+# 4th group: < default-param-value >
+PARAM_RE = re.compile(r'\\?(\$\$?)(\d+)(\\?:(|.*?[^\\])\$)?', re.DOTALL)
+
+# Maximum number of compiled Inclusion/Exclusion macro patterns.
+PATTERN_CACHE_SIZE = 256
 
 
 class Macro:
+    __slots__ = ('name', 'value')
     name: str
     value: str
 
@@ -20,24 +37,25 @@ class Macro:
         self.name = name
         self.value = value
 
+    @classmethod
+    def copyFrom(cls, m: 'Macro') -> 'Macro':
+        return Macro(m.name, m.value)
 
-defs: List[Macro] = []
+
+# Macro definitions keyed by name (in definition order).
+defs: Dict[str, Macro]  # Bound to the current renderer, see `renderer.bindModuleState()`.
 
 
 def init() -> None:
     '''Reset definitions to defaults.'''
     # Initialize predefined macros.
-    defs.clear()
-    defs.append(Macro('--'))
-    defs.append(Macro('--header-ids'))
+    renderer.current().macroDefs = {'--': Macro('--'), '--header-ids': Macro('--header-ids')}
 
 
 def getValue(name: str) -> Optional[str]:
     '''Return named macro value or null if it doesn't exist.'''
-    for mdef in defs:
-        if mdef.name == name:
-            return mdef.value
-    return None
+    mdef = renderer.current().macroDefs.get(name)
+    return None if mdef is None else mdef.value
 
 
 def setValue(name: str, value: str) -> None:
@@ -53,93 +71,146 @@ def setValue(name: str, value: str) -> None:
     if name == '--' and value != '':
         options.errorCallback('the predefined blank \'--\' macro cannot be redefined')
         return
-    for mdef in defs:
-        if mdef.name == name:
-            if not existential:
-                mdef.value = value
-            return
-    defs.append(Macro(name, value))
+    defs = renderer.current().mutable('macroDefs', Macro.copyFrom)
+    mdef = defs.get(name)
+    if mdef is None:
+        defs[name] = Macro(name, value)
+    elif not existential:
+        mdef.value = value
+
+
+def setValues(values: Dict[str, str]) -> None:
+    '''Set or add macro values from a dictionary of macro names and values (see `setValue()`).'''
+    for name, value in values.items():
+        setValue(name, value)
 
 
 def render(text: str, silent: bool = False) -> str:
     '''Render macro invocations in text string.
         Render Simple invocations first, followed by Parametized, Inclusion and Exclusion invocations.'''
-    MATCH_COMPLEX = re.compile(r'\\?{([\w\-]+)([!=|?](?:|.*?[^\\]))}',
-                               re.DOTALL)  # Parametrized, Inclusion and Exclusion invocations.
-    MATCH_SIMPLE = re.compile(r'\\?{([\w\-]+)()}')  # Simple macro invocation.
-    result = text
-    for find in [MATCH_SIMPLE, MATCH_COMPLEX]:
-        def repl(match: Any) -> str:
-            if match[0].startswith('\\'):
-                return match[0][1:]
-            params = match[2]
-            if params.startswith('?'):
-                # DEPRECATED: Existential macro invocation.
-                if not silent:
-                    options.errorCallback(f'existential macro invocations are deprecated: {match[0]}')
-                return match[0]
-            name = match[1]
-            value = getValue(name)  # Macro value is null if macro is undefined.
-            if value is None:
-                if not silent:
-                    options.errorCallback(f'undefined macro: {match[0]}: {text}')
-                return match[0]
-            if find is MATCH_SIMPLE:
-                return value
-            params = params.replace(r'\}', '}')  # Unescape escaped} characters.
-            if params[0] in '|':
-                paramsList = params[1:].split('|')
-                # Substitute macro parameters.
-                # Matches macro definition formal parameters[$]$< param-number > [[\]: < default-param-value >$]
-                # 1st group: [$]$
-                # 2nd group: < param-number > (1, 2..)
-                # 3rd group: [\]: < default-param-value >$
-                # 4th group: < default-param-value >
-                PARAM_RE = re.compile(r'\\?(\$\$?)(\d+)(\\?:(|.*?[^\\])\$)?', re.DOTALL)
-
-                def repl(mr):
-                    if mr[0].startswith('\\'):
-                        # Unescape escaped macro parameters.
-                        return mr[0][1:]
-                    p1 = mr[1]
-                    p2 = int(mr[2])
-                    p3 = mr[3] or ''
-                    p4 = mr[4] or ''
-                    if p2 == 0:
-                        return mr[0]  # $0 is not a valid parameter name.
-                    # Unassigned parameters are replaced with a blank string.
-                    param = '' if len(paramsList) < p2 else paramsList[p2 - 1]
-                    if p3 != '':
-                        if p3.startswith('\\'):
-                            # Unescape escaped default parameter.
-                            param += p3[1:]
-                        elif param == '':
-                            # Assign default parameter value.
-                            param = p4
-                            # Unescape escaped $ characters in the default value.
-                            param = param.replace(r'\$', r'$')
-                    if p1 == r'$$':
-                        param = spans.render(param)
-                    return param
-                value = PARAM_RE.sub(repl, value)
-                return value
-            elif params[0] in '!=':  # Exclusion and inclusion macros.
-                pattern = params[1:]
-                skip: bool
-                try:
-                    skip = re.match(f'^{pattern}$', value) is None
-                except:
-                    if not silent:
-                        options.errorCallback(f'illegal macro regular expression: {pattern}: {text}')
-                    return match[0]
-                if params[0] == '!':
-                    skip = not skip
-                return '\u0002' if skip else ''  # Flag line for deletion.
-            else:
-                options.errorCallback(f'illegal macro syntax: {match[0]}')
-                return ''
-        result = find.sub(repl, result)
+    if '{' not in text:
+        result = text  # No macro invocations.
+    else:
+        rendered = renderSinglePass(text, silent)
+        if rendered is not None:
+            result = rendered
+        else:
+            result = text
+            for find in [MATCH_SIMPLE, MATCH_COMPLEX]:
+                result = find.sub(lambda match: expand(match[0], match[1], match[2], text, silent, options.errorCallback), result)
     if '\u0002' in result:
         # Delete lines flagged by Inclusion/Exclusion macros.
         result = '\n'.join(filter(lambda line: '\u0002' not in line, result.split('\n')))
     return result
+
+
+def renderSinglePass(text: str, silent: bool) -> Optional[str]:
+    '''Render Simple, Parametized, Inclusion and Exclusion invocations in a single pass.
+       Return None if the result could differ from rendering Simple invocations first:
+       Simple invocations inside other invocations, Simple invocations preceded by an
+       unmatched '{' (the expansion could complete an invocation), Simple invocation
+       values containing macro invocations (or ending with an escape) and invocations
+       that report errors (so errors are reported in the same order).'''
+    errors: List[str] = []
+    result: List[str] = []
+    pos = 0
+    unmatched = False  # True if an unmatched '{' precedes the match.
+    for match in MATCH_MACRO.finditer(text):
+        before = text[pos:match.start()]
+        unmatched = unmatched or '{' in before
+        params = match[2]
+        if params is None:
+            # Simple invocation.
+            params = ''
+            if match[0].startswith('\\'):
+                if unmatched:
+                    return None
+            else:
+                value = getValue(match[1])
+                if value is not None and (unmatched or '{' in value or value.endswith('\\')):
+                    return None
+        elif '{' in params:
+            return None
+        result.append(before)
+        result.append(expand(match[0], match[1], params, text, silent, errors.append))
+        if errors:
+            return None
+        pos = match.end()
+    result.append(text[pos:])
+    return ''.join(result)
+
+
+def expand(invocation: str, name: str, params: str, text: str, silent: bool, error: Callable[[str], None]) -> str:
+    '''Return the expansion of a macro invocation, `params` is blank for Simple invocations.
+       Errors are reported with the `error` function.'''
+    if invocation.startswith('\\'):
+        return invocation[1:]
+    if params.startswith('?'):
+        # DEPRECATED: Existential macro invocation.
+        if not silent:
+            error(f'existential macro invocations are deprecated: {invocation}')
+        return invocation
+    value = getValue(name)  # Macro value is null if macro is undefined.
+    if value is None:
+        if not silent:
+            error(f'undefined macro: {invocation}: {text}')
+        return invocation
+    if params == '':
+        return value
+    params = params.replace(r'\}', '}')  # Unescape escaped} characters.
+    if params[0] in '|':
+        paramsList = params[1:].split('|')
+        # Substitute macro parameters.
+
+        def repl(mr):
+            if mr[0].startswith('\\'):
+                # Unescape escaped macro parameters.
+                return mr[0][1:]
+            p1 = mr[1]
+            p2 = int(mr[2])
+            p3 = mr[3] or ''
+            p4 = mr[4] or ''
+            if p2 == 0:
+                return mr[0]  # $0 is not a valid parameter name.
+            # Unassigned parameters are replaced with a blank string.
+            param = '' if len(paramsList) < p2 else paramsList[p2 - 1]
+            if p3 != '':
+                if p3.startswith('\\'):
+                    # Unescape escaped default parameter.
+                    param += p3[1:]
+                elif param == '':
+                    # Assign default parameter value.
+                    param = p4
+                    # Unescape escaped $ characters in the default value.
+                    param = param.replace(r'\$', r'$')
+            if p1 == r'$$':
+                param = spans.render(param)
+            return param
+        value = PARAM_RE.sub(repl, value)
+        return value
+    elif params[0] in '!=':  # Exclusion and inclusion macros.
+        pattern = params[1:]
+        skip: bool
+        try:
+            skip = compilePattern(pattern).match(value) is None
+        except:
+            if not silent:
+                error(f'illegal macro regular expression: {pattern}: {text}')
+            return invocation
+        if params[0] == '!':
+            skip = not skip
+        return '\u0002' if skip else ''  # Flag line for deletion.
+    else:
+        error(f'illegal macro syntax: {invocation}')
+        return ''
+
+
+@functools.lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def compilePattern(pattern: str) -> Pattern[str]:
+    '''Return the compiled Inclusion/Exclusion macro pattern, raises `re.error` if
+       the pattern is illegal. Compiled patterns are held in a bounded LRU cache,
+       use `compilePattern.cache_info()` to get the cache hit and miss counts.'''
+    return re.compile(f'^{pattern}$')
+
+
+renderer.bindModuleState(__name__, {'defs': 'macroDefs'})
@@ -1,33 +1,47 @@
-from typing import Any, Callable, Optional
+from typing import TYPE_CHECKING, Any, Callable, Optional
 
-from rimu import document, utils
+from rimu import document, renderer, replacements, utils
+
+if TYPE_CHECKING:
+    from rimu.profiler import Profiler
 
 Callback = Optional[Callable[['CallbackMessage'], None]]
 
 
-# Global option values.
-safeMode: int = -1  # Trigger API initialization.
+# Option values (bound to the current renderer, see `renderer.bindModuleState()`).
+safeMode: int
 htmlReplacement: str
-callback: Callback = None
+replacementsEngine: str
+classifyLines: bool
+callback: Callback
 
 
 class RenderOptions:
     '''Rimu render API options.'''
     safeMode: Optional[int]
     htmlReplacement: Optional[str]
-    reset: Optional[bool]
+    reset: Optional[bool]  # Restores the default definitions (not the definitions a renderer was created with).
     callback: Callback
+    replacementsEngine: Optional[str]
+    classifyLines: Optional[bool]
+    profiler: Optional['Profiler']
 
     def __init__(self,
                  safeMode: Optional[int] = None,
                  htmlReplacement: Optional[str] = None,
                  reset: Optional[Any] = None,
                  callback: Optional[Callback] = None,
+                 replacementsEngine: Optional[str] = None,
+                 classifyLines: Optional[Any] = None,
+                 profiler: Optional['Profiler'] = None,
                  ):
         self.safeMode = safeMode
         self.htmlReplacement = htmlReplacement
         self.reset = reset
         self.callback = callback
+        self.replacementsEngine = replacementsEngine
+        self.classifyLines = classifyLines
+        self.profiler = profiler
 
 
 class CallbackMessage:
@@ -41,50 +55,71 @@ class CallbackMessage:
 
 def init() -> None:
     '''Initialize API render options.'''
-    global safeMode, htmlReplacement, callback
-    safeMode = 0
-    htmlReplacement = '<mark>replaced HTML</mark>'
-    callback = None
+    r = renderer.current()
+    r.safeMode = 0
+    r.htmlReplacement = '<mark>replaced HTML</mark>'
+    r.replacementsEngine = 'sequential'
+    r.classifyLines = False
+    r.callback = None
+    r.profiler = None
 
 
 def isSafeModeNz() -> bool:
     '''Return true if safeMode is non-zero.'''
-    return safeMode != 0
+    r = renderer.current()
+    if r.recorder is not None:
+        r.recorder.decide('safeMode')
+    return r.safeMode != 0
 
 
 def getSafeMode() -> int:
-    return safeMode
+    r = renderer.current()
+    if r.recorder is not None:
+        r.recorder.decide('safeMode', 'blockAttributes', 'macroDefinitions')
+    return r.safeMode
 
 
 def skipMacroDefs() -> bool:
     '''Return true if Macro Definitions are ignored.'''
-    return safeMode != 0 and (safeMode & 0x8) == 0
+    r = renderer.current()
+    if r.recorder is not None:
+        r.recorder.decide('macroDefinitions')
+    return r.safeMode != 0 and (r.safeMode & 0x8) == 0
 
 
 def skipBlockAttributes() -> bool:
     '''Return true if Block Attribute elements are ignored.'''
-    return (safeMode & 0x4) != 0
+    r = renderer.current()
+    if r.recorder is not None:
+        r.recorder.decide('blockAttributes')
+    return (r.safeMode & 0x4) != 0
 
 
 def updateFrom(options: RenderOptions) -> None:
     ''' Update specified (non-null) options.'''
-    global callback # pylint: disable=global-variable-not-assigned
+    r = renderer.current()
     # Install callback first to ensure option errors are logged.
-    if callback is not None:
-        callback = options.callback
+    if r.callback is not None:
+        r.callback = options.callback
     setOption('reset', options.reset)  # Reset takes priority.
     # Install callback again in case it has been reset.
     if options.callback is not None:
-        callback = options.callback
+        r.callback = options.callback
     if options.safeMode is not None:
         setOption('safeMode', str(options.safeMode))
     if options.htmlReplacement is not None:
         setOption('htmlReplacement', options.htmlReplacement)
+    if options.replacementsEngine is not None:
+        setOption('replacementsEngine', options.replacementsEngine)
+    if options.classifyLines is not None:
+        setOption('classifyLines', options.classifyLines)
+    # Renders are only profiled if a profiler is specified.
+    r.profiler = options.profiler
 
 
 def setOption(name: str, value: Any) -> None:
     '''Set named option value.'''
-    global safeMode, htmlReplacement, callback  # pylint: disable=global-variable-not-assigned
+    r = renderer.current()
     if name == 'safeMode':
         n = 0
         try:
@@ -94,7 +129,7 @@ def setOption(name: str, value: Any) -> None:
         if n < 0 or n > 15:
             errorCallback('illegal safeMode API option value: ' + str(value))
         else:
-            safeMode = n
+            r.safeMode = n
     elif name == 'reset':
         if value is None or value == False or value == 'false':
             return
@@ -103,13 +138,33 @@ def setOption(name: str, value: Any) -> None:
         else:
             errorCallback('illegal reset API option value: ' + str(value))
     elif name == 'htmlReplacement':
-        htmlReplacement = str(value)
+        r.htmlReplacement = str(value)
+    elif name == 'replacementsEngine':
+        if value in replacements.ENGINES:
+            r.replacementsEngine = value
+        else:
+            errorCallback('illegal replacementsEngine API option value: ' + str(value))
+    elif name == 'classifyLines':
+        if value == True or value == 'true':
+            r.classifyLines = True
+        elif value == False or value == 'false':
+            r.classifyLines = False
+        else:
+            errorCallback('illegal classifyLines API option value: ' + str(value))
     else:
         errorCallback('illegal API option name: ' + name)
 
 
 def htmlSafeModeFilter(html: str) -> str:
     '''Filter HTML based on current safeMode.'''
+    r = renderer.current()
+    if r.recorder is not None:
+        return r.recorder.html(html, r.safeMode)
+    return filterHtml(html, r.safeMode, r.htmlReplacement)
+
+
+def filterHtml(html: str, safeMode: int, htmlReplacement: str) -> str:
+    '''Filter HTML based on the safeMode and htmlReplacement option values.'''
     n = safeMode & 0x3
     if n == 0:    # Raw HTML (default behavior).
         return html
@@ -124,6 +179,7 @@ def htmlSafeModeFilter(html: str) -> str:
 
 
 def errorCallback(message: str) -> None:
+    callback = renderer.current().callback
     if callback is not None:
         callback(CallbackMessage('error', message))
 
@@ -133,3 +189,12 @@ def panic(message: str) -> None:
     msg = 'panic: ' + message
     print(msg)
     errorCallback(msg)
+
+
+renderer.bindModuleState(__name__, {
+    'safeMode': 'safeMode',
+    'htmlReplacement': 'htmlReplacement',
+    'replacementsEngine': 'replacementsEngine',
+    'classifyLines': 'classifyLines',
+    'callback': 'callback',
+})
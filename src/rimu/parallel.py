@@ -0,0 +1,182 @@
+'''
+ This module implements block-parallel rendering of large documents.
+
+ A document is rendered in four steps:
+
+ 1. A scan renders the whole document with inline text (quotes and
+    replacements) left unrendered. Rendering inline text does not change the
+    renderer state so the scan processes definitions (macro, quote,
+    replacement and delimited block definitions and API options), Block
+    Attributes and header ids in the same way as a full render, at a fraction
+    of the cost. The scan splits the document into chunks at top-level block
+    boundaries and saves the renderer state (see `state.dump()`) at the start
+    of each chunk.
+ 2. The chunks are rendered by a pool of worker processes, each chunk starting
+    in the renderer state saved by the scan.
+ 3. The chunks are reconciled with the scan: a chunk must end at the scanned
+    block boundary in the renderer state (including the allocated HTML ids)
+    that the scan saved for the start of the next chunk. The remainder of the
+    document is rendered sequentially from the first chunk that does not.
+ 4. The chunks' HTML is joined and their messages are reported in document
+    order.
+
+ The HTML, the messages and the renderer state left by the render are the same
+ as a sequential render.
+'''
+
+import operator
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple, Optional, Tuple
+
+from rimu import cache, document, io, options, renderer, state
+
+# Minimum number of source lines in a chunk.
+MIN_CHUNK_LINES = 2000
+# Number of chunks per worker process (smaller chunks balance the load).
+CHUNKS_PER_JOB = 4
+
+
+class Boundary(NamedTuple):
+    '''Renderer state at a chunk boundary (or at the end of the document).'''
+    start: int  # Index of the first source line of the chunk.
+    extent: int  # Number of source lines read by the preceding block (including look ahead lines).
+    state: state.State
+    fingerprint: str  # See `cache.fingerprint()`.
+    callback: bool  # True if a messages callback is installed.
+
+
+class Chunk(NamedTuple):
+    '''A rendered chunk.'''
+    html: str
+    ended: bool  # True if the last block ended at the chunk's end line.
+    fingerprint: str  # Fingerprint of the renderer state following the chunk.
+    callback: bool  # True if a messages callback is installed.
+    messages: List[options.CallbackMessage]
+
+
+def unrendered(text: str) -> str:
+    '''The scan's inline renderer: inline text is not rendered.'''
+    return text
+
+
+def render(r: renderer.Renderer, source: str, opts: Optional[options.RenderOptions] = None,
+           jobs: Optional[int] = None, chunkLines: Optional[int] = None) -> str:
+    '''Render Rimu markup source to HTML with renderer `r` using a pool of `jobs`
+       worker processes (defaults to the number of CPUs). Chunks contain at least
+       `chunkLines` source lines. Documents that are too small to split and
+       profiled renders are rendered sequentially.'''
+    if opts is None:
+        opts = options.RenderOptions()
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    lines = io.NEWLINE.split(io.normalize(source))
+    if chunkLines is None:
+        chunkLines = max(MIN_CHUNK_LINES, len(lines) // (jobs * CHUNKS_PER_JOB))
+    if jobs < 2 or len(lines) < 2 * chunkLines or opts.profiler is not None:
+        return r.render(source, opts)
+    initial = r.copy()
+    initial.render('', opts)  # Apply the options.
+    try:
+        data = state.dump(initial)
+    except ValueError:
+        return r.render(source, opts)  # The state cannot be passed to the worker processes.
+    callback = initial.callback
+    classify = initial.classifyLines
+    boundaries = [Boundary(0, 0, data, cache.fingerprint(initial), callback is not None)]
+    result: List[str] = []
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        boundaries += executor.submit(scan, source, boundaries[0], classify, chunkLines).result()
+        futures = []
+        for first, following in zip(boundaries, boundaries[1:]):
+            end = following.start - first.start
+            # Include the line following the scanned block's look ahead lines.
+            text = '\n'.join(lines[first.start:following.extent + 1])
+            futures.append(executor.submit(renderChunk, text, first, end, classify))
+        for i, future in enumerate(futures):
+            chunk = future.result()
+            following = boundaries[i + 1]
+            if not chunk.ended or (chunk.fingerprint, chunk.callback) != (following.fingerprint, following.callback):
+                # The chunk does not reconcile with the scan.
+                for pending in futures[i + 1:]:
+                    pending.cancel()
+                restore(r, boundaries[i], callback)
+                with r.activate():
+                    classifier = document.lineClassifier() if classify else None
+                    result.extend(document.renderBlocks(io.Reader(lines[boundaries[i].start:], classifier)))
+                return ''.join(result)
+            if callback is not None:
+                for message in chunk.messages:
+                    callback(message)
+            result.append(chunk.html)
+    restore(r, boundaries[-1], callback)
+    return ''.join(result)
+
+
+def restore(r: renderer.Renderer, boundary: Boundary, callback: options.Callback) -> None:
+    '''Restore the renderer state at a boundary.'''
+    state.load(boundary.state, r)
+    r.callback = callback if boundary.callback else None
+
+
+def scan(source: str, start: Boundary, classify: bool, chunkLines: int) -> List[Boundary]:
+    '''Worker process task: scan the source and return the chunk boundaries
+       followed by the end of the document boundary. The source is split into
+       chunks of at least `chunkLines` lines.'''
+    lines = io.NEWLINE.split(io.normalize(source))
+    r = state.load(start.state)
+    if start.callback:
+        r.callback = lambda message: None
+    r.inlineRenderer = unrendered
+    result: List[Boundary] = []
+    with r.activate():
+        classifier = document.lineClassifier() if classify else None
+        reader = io.Reader(lines, classifier)
+        for _ in document.renderBlocks(reader):
+            end, extent = position(reader, lines)
+            if end is None or end - (result[-1].start if result else 0) < chunkLines or end >= len(lines):
+                continue
+            result.append(Boundary(end, extent, state.dump(r), cache.fingerprint(r), r.callback is not None))
+        # The chunk following the last boundary extends to the end of the document.
+        result.append(Boundary(len(lines), len(lines), state.dump(r), cache.fingerprint(r),
+                               r.callback is not None))
+    return result
+
+
+def renderChunk(text: str, start: Boundary, end: int, classify: bool) -> Chunk:
+    '''Worker process task: render the top-level blocks of a chunk of source
+       lines starting in the renderer state at the `start` boundary. Rendering
+       stops when a block ends at, or after, line `end`.'''
+    lines = text.split('\n')
+    r = state.load(start.state)
+    messages: List[options.CallbackMessage] = []
+    if start.callback:
+        r.callback = messages.append
+    html = []
+    ended = False
+    with r.activate():
+        classifier = document.lineClassifier() if classify else None
+        reader = io.Reader(lines, classifier)
+        for block in document.renderBlocks(reader):
+            html.append(block)
+            if end < len(lines):
+                cursor, _ = position(reader, lines)
+                if cursor is not None and cursor >= end:
+                    # The reader must not reach the end of the chunk's lines: blocks that read
+                    # past the look ahead lines could render differently in the whole document.
+                    ended = cursor == end and not reader.eof()
+                    break
+        else:
+            ended = end == len(lines)  # The last chunk.
+    return Chunk(''.join(html), ended, cache.fingerprint(r), r.callback is not None, messages)
+
+
+def position(reader: io.Reader, lines: List[str]) -> Tuple[Optional[int], int]:
+    '''Return the index of the reader's cursor line (None if rendering cannot
+       resume there) and the number of source lines read by the reader.'''
+    unread = 0 if reader.source is None else operator.length_hint(reader.source)
+    extent = len(lines) - unread
+    end = extent - len(reader.lines)
+    if list(reader.lines) != lines[end:extent]:
+        return None, extent  # Read ahead lines have been updated.
+    return end, extent
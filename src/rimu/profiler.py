@@ -0,0 +1,172 @@
+'''
+ This module implements the render profiler.
+
+ A profiler accumulates the time spent in, and the number of calls to, each
+ render phase along with the time spent rendering each block definition,
+ expanding each macro and searching for each replacement. Profiling is enabled
+ by the `profiler` API option.
+
+ Phases are timed by wrappers that replace the phase functions' module
+ attributes. The wrappers are only installed while a profiled render is in
+ progress so profiling costs nothing when it is disabled. The module attributes
+ are process-wide: while they are installed unprofiled renders in other threads
+ also call the wrappers, which call the phase functions directly if the current
+ renderer has no profiler (a small per call overhead, the statistics are not
+ affected).
+'''
+
+import functools
+import importlib
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from rimu import renderer
+
+# Render phases and the module functions they time.
+PHASES: Dict[str, List[Tuple[str, str]]] = {
+    'lineblocks': [('lineblocks', 'render')],
+    'lists': [('lists', 'render')],
+    'delimitedblocks': [('delimitedblocks', 'render')],
+    'blockattributes': [('blockattributes', 'parse'), ('blockattributes', 'injectHtmlAttributes')],
+    'macros.render': [('macros', 'render')],
+    'spans.fragQuotes': [('spans', 'fragQuotes')],
+    'spans.fragReplacements': [('spans', 'fragReplacements')],
+}
+# Phases, the module functions that time their definitions and a function that
+# returns the definition name (or pattern) from the function arguments.
+DEFINITIONS: Dict[str, Tuple[str, str, Callable[[Tuple], str]]] = {
+    'macros.render': ('macros', 'expand', lambda args: args[1]),  # expand(invocation, name, ...)
+    'spans.fragReplacements': ('spans', 'fragReplacement', lambda args: args[1].match.pattern),  # (fragment, rdef)
+}
+
+
+class Stats:
+    '''Profile statistics.'''
+    calls: int
+    time: float  # Cumulative time in seconds (including nested phases).
+    selfTime: float  # Cumulative time in seconds excluding nested phases.
+
+    def __init__(self):
+        self.calls = 0
+        self.time = 0.0
+        self.selfTime = 0.0
+
+
+class Frame:
+    '''A phase (or definition) call in progress.'''
+
+    def __init__(self, phase: str, definition: str, start: float):
+        self.phase = phase
+        self.definition = definition  # Blank if the definition is not known (yet).
+        self.start = start
+        self.nested = 0.0  # Time spent in nested phases.
+        self.isPhase = not definition
+
+
+class Profiler:
+    '''Render profiler (see the `profiler` API option). A profiler should only be
+       used by one renderer at a time.'''
+    phases: Dict[str, Stats]  # Statistics by phase name.
+    definitions: Dict[str, Dict[str, Stats]]  # Statistics by phase and definition.
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        '''Clear the statistics.'''
+        self.phases = {}
+        self.definitions = {}
+        self.stack: List[Frame] = []
+
+    def enter(self, phase: str, definition: str = '') -> None:
+        '''Start timing a phase call (or a definition if `definition` is specified).'''
+        self.stack.append(Frame(phase, definition, time.perf_counter()))
+
+    def exit(self) -> None:
+        '''Finish timing the most recently entered phase call.'''
+        frame = self.stack.pop()
+        elapsed = time.perf_counter() - frame.start
+        recursive = False
+        if frame.isPhase:
+            recursive = any(f.isPhase and f.phase == frame.phase for f in self.stack)
+            self.update(self.phases.setdefault(frame.phase, Stats()), elapsed, frame.nested, recursive)
+        if frame.definition:
+            recursive = any(f.phase == frame.phase and f.definition == frame.definition for f in self.stack)
+            stats = self.definitions.setdefault(frame.phase, {}).setdefault(frame.definition, Stats())
+            self.update(stats, elapsed, frame.nested, recursive)
+        if self.stack:
+            # Definition calls are part of the calling phase, their nested phases are not.
+            self.stack[-1].nested += elapsed if frame.isPhase else frame.nested
+
+    def update(self, stats: Stats, elapsed: float, nested: float, recursive: bool) -> None:
+        stats.calls += 1
+        if not recursive:
+            stats.time += elapsed  # Recursive calls are included in the outermost call.
+        stats.selfTime += elapsed - nested
+
+    def matched(self, definition: str) -> None:
+        '''Attribute the current phase call to a definition (called by block renderers).'''
+        if self.stack:
+            self.stack[-1].definition = definition
+
+    def report(self) -> str:
+        '''Return the statistics as text, phases and definitions are sorted by time.'''
+        lines = [f'{"phase":40} {"calls":>8} {"time ms":>10} {"self ms":>10}']
+        for name, stats in sorted(self.phases.items(), key=lambda item: -item[1].time):
+            lines.append(f'{name:40} {stats.calls:8} {stats.time * 1000:10.3f} {stats.selfTime * 1000:10.3f}')
+            lines.extend(self.reportDefinitions(name))
+        return '\n'.join(lines)
+
+    def reportDefinitions(self, phase: str) -> List[str]:
+        lines = []
+        for name, stats in sorted(self.definitions.get(phase, {}).items(), key=lambda item: -item[1].time):
+            name = name if len(name) <= 36 else name[:33] + '...'
+            lines.append(f'  {name:38} {stats.calls:8} {stats.time * 1000:10.3f} {stats.selfTime * 1000:10.3f}')
+        return lines
+
+
+_lock = threading.Lock()
+_installs = 0  # Number of profiled renders in progress.
+_originals: Dict[Tuple[str, str], Any] = {}  # Wrapped module functions.
+
+
+def timed(func: Callable, phase: str, definition: Optional[Callable[[Tuple], str]] = None) -> Callable:
+    '''Return a wrapper that times calls to a phase (or definition) function.'''
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profiler = renderer.current().profiler
+        if profiler is None:
+            return func(*args, **kwargs)  # Rendering in another thread is not being profiled.
+        profiler.enter(phase, definition(args) if definition else '')
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.exit()
+    return wrapper
+
+
+@contextmanager
+def installed() -> Iterator[None]:
+    '''Install the timing wrappers for the duration of a with statement.'''
+    global _installs
+    with _lock:
+        if _installs == 0:
+            wrappers: List[Tuple[str, str, str, Optional[Callable[[Tuple], str]]]]
+            wrappers = [(module, name, phase, None) for phase, funcs in PHASES.items() for module, name in funcs]
+            wrappers += [(module, name, phase, key) for phase, (module, name, key) in DEFINITIONS.items()]
+            for module, name, phase, key in wrappers:
+                m = importlib.import_module('rimu.' + module)
+                _originals[(module, name)] = getattr(m, name)
+                setattr(m, name, timed(getattr(m, name), phase, key))
+        _installs += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _installs -= 1
+            if _installs == 0:
+                for (module, name), func in _originals.items():
+                    setattr(importlib.import_module('rimu.' + module), name, func)
+                _originals.clear()
@@ -1,10 +1,13 @@
 import re
 from typing import List, Optional, Pattern
 
+from rimu import renderer
+
 
 class Def:
+    __slots__ = ('quote', 'openTag', 'closeTag', 'spans')
     quote: str
-    opentTag: str
+    openTag: str
     closeTag: str
     spans: bool
 
@@ -24,7 +27,7 @@ class Def:
         return Def(d.quote, d.openTag, d.closeTag, d.spans)
 
 
-defs: List[Def] = []  # Mutable definitions initialized by DEFAULT_DEFS.
+defs: List[Def]  # Mutable definitions initialized by DEFAULT_DEFS.
 
 DEFAULT_DEFS: List[Def] = [
     Def(quote='**', openTag='<strong>', closeTag='</strong>', spans=True),
@@ -43,28 +46,27 @@ unescapeRe: Pattern[str]    # Searches for escaped quotes.
 def init() -> None:
     '''Reset definitions to defaults.'''
     # Make shallow copy of DEFAULT_DEFS (list and list objects).
-    defs.clear()
-    defs.extend(map(lambda d: Def.copyFrom(d), DEFAULT_DEFS))
+    renderer.current().quoteDefs = list(map(lambda d: Def.copyFrom(d), DEFAULT_DEFS))
     initializeRegExps()
 
 
 def initializeRegExps() -> None:
     '''Synthesise re's to find and unescape quotes.'''
-    global quotesRe, unescapeRe
-    quotes = list(map(lambda d: re.escape(d.quote), defs))
+    r = renderer.current()
+    quotes = list(map(lambda d: re.escape(d.quote), r.quoteDefs))
     # $1 is quote character(s), $2 is quoted text.
     # Quoted text cannot begin or end with whitespace.
     # Quoted can span multiple lines.
     # Quoted text cannot end with a backslash.
-    quotesRe = re.compile(
+    r.quotesRe = re.compile(
         r'\\?(' + '|'.join(quotes) + r')([^\s\\]|\S[\s\S]*?[^\s\\])\1')
     # $1 is quote character(s).
-    unescapeRe = re.compile(r'\\(' + '|'.join(quotes) + ')')
+    r.unescapeRe = re.compile(r'\\(' + '|'.join(quotes) + ')')
 
 
 def getDefinition(quote: str) -> Optional[Def]:
     '''Return the quote definition corresponding to 'quote' character, return null if not found.'''
-    for d in defs:
+    for d in renderer.current().quoteDefs:
         if d.quote == quote:
             return d
     return None
@@ -72,6 +74,7 @@ def getDefinition(quote: str) -> Optional[Def]:
 
 def setDefinition(qdef: Def) -> None:
     '''Update existing or add new quote definition.'''
+    defs = renderer.current().mutable('quoteDefs', Def.copyFrom)
     d = getDefinition(qdef.quote)
     if d is not None:
         # Update existing definition.
@@ -90,4 +93,11 @@ def setDefinition(qdef: Def) -> None:
 
 def unescape(s: str) -> str:
     '''Strip backslashes from quote characters.'''
-    return unescapeRe.sub(lambda m: m[1], s)
+    return renderer.current().unescapeRe.sub(lambda m: m[1], s)
+
+
+renderer.bindModuleState(__name__, {
+    'defs': 'quoteDefs',
+    'quotesRe': 'quotesRe',
+    'unescapeRe': 'unescapeRe',
+})
@@ -0,0 +1,298 @@
+'''
+ This module implements the Rimu Renderer.
+
+ A Renderer owns all the mutable state used while rendering: API options,
+ pending Block Attributes, allocated HTML ids and the macro, quote, replacement
+ and delimited block definitions. Renderers share no mutable state so separate
+ renderers can be used concurrently from separate threads.
+
+ The module-level render functions (`document.render()`, `macros.getValue()`
+ etc.) operate on the current renderer: the renderer that is active in the
+ current thread (or asynchronous context), or the default renderer if no
+ renderer is active.
+'''
+
+import contextvars
+import sys
+import threading
+import types
+from contextlib import contextmanager
+from typing import (TYPE_CHECKING, Any, Callable, Dict, Iterator, List,
+                    Optional, Pattern, TypeVar)
+
+from rimu import document, options
+from rimu.ids import Ids
+
+if TYPE_CHECKING:
+    from rimu import (cache, delimitedblocks, io, ir, macros, quotes,
+                      replacements, spans)
+    from rimu.expansion import Expand
+    from rimu.profiler import Profiler
+
+T = TypeVar('T')
+
+# Renderer fields captured by definition snapshots.
+DEFINITION_FIELDS = ('macroDefs', 'quoteDefs', 'quotesRe', 'unescapeRe', 'replacementDefs', 'blockDefs')
+# Renderer API option and Block Attributes fields (immutable values).
+OPTION_FIELDS = ('safeMode', 'htmlReplacement', 'replacementsEngine', 'classifyLines', 'callback',
+                 'profiler', 'classes', 'id', 'css', 'attributes')
+
+
+class Renderer:
+    '''Rimu renderer. If a `snapshot` is specified the renderer starts with the
+       snapshot definitions instead of the default definitions. The `reset` API
+       option always restores the default definitions, discarding the snapshot
+       definitions (renderers returned by `copy()` included).'''
+    # API options.
+    safeMode: int
+    htmlReplacement: str
+    replacementsEngine: str
+    classifyLines: bool
+    callback: 'options.Callback'
+    profiler: Optional['Profiler']
+    # Block Attributes.
+    classes: str  # Space separated HTML class names.
+    id: str  # HTML element id.
+    css: str  # HTML CSS styles.
+    attributes: str  # Other HTML element attributes.
+    opts: 'Expand'
+    ids: Ids  # Allocated HTML ids.
+    # Definitions.
+    macroDefs: Dict[str, 'macros.Macro']
+    quoteDefs: List['quotes.Def']
+    quotesRe: Pattern[str]  # Searches for quoted text.
+    unescapeRe: Pattern[str]  # Searches for escaped quotes.
+    replacementDefs: List['replacements.Def']
+    blockDefs: List['delimitedblocks.Def']
+    # Transient render state.
+    listIds: List[str]  # Stack of open list IDs.
+    savedReplacements: List['spans.Fragment']
+    recorder: Optional['ir.Recorder']  # Records the document tree (see `ir.parse()`).
+    inlineRenderer: Optional[Callable[[str], str]]  # Replaces `spans.render()` in replaced text (see `parallel.scan()`).
+
+    def __init__(self, snapshot: Optional['Snapshot'] = None) -> None:
+        self.safeMode = -1  # Trigger initialization on first render.
+        self.callback = None
+        self.profiler = None
+        self.ids = Ids()
+        self.macroDefs = {}
+        self.quoteDefs = []
+        self.replacementDefs = []
+        self.blockDefs = []
+        self.listIds = []
+        self.savedReplacements = []
+        self.recorder = None
+        self.inlineRenderer = None
+        self._lock = threading.RLock()
+        self._snapshot: Optional[Snapshot] = None  # Most recently taken or restored snapshot.
+        if snapshot is not None:
+            with self.activate():
+                document.init()
+            self.restore(snapshot)
+
+    @contextmanager
+    def activate(self) -> Iterator['Renderer']:
+        '''Make this the current renderer for the duration of a with statement.
+           A renderer is only active in one thread at a time.'''
+        with self._lock:
+            token = _current.set(self)
+            try:
+                yield self
+            finally:
+                _current.reset(token)
+
+    def render(self, source: str, opts: Optional['options.RenderOptions'] = None,
+               cache: Optional['cache.RenderCache'] = None) -> str:
+        '''Render Rimu markup source to HTML. If a `cache` is specified the HTML
+           is looked up in (or added to) the cache.'''
+        if opts is None:
+            opts = options.RenderOptions()
+        with self.activate():
+            self._initialize()
+            options.updateFrom(opts)
+            if self.profiler is not None:
+                return self._renderProfiled(source, cache)
+            if cache is not None:
+                return self._renderCached(source, cache)
+            return document.render(source)
+
+    def _renderProfiled(self, source: str, cache: Optional['cache.RenderCache']) -> str:
+        '''Render the source with the profiler timing wrappers installed.'''
+        from rimu import profiler  # Deferred to avoid a circular import.
+        assert self.profiler is not None
+        with profiler.installed():
+            self.profiler.enter('render')
+            try:
+                if cache is not None:
+                    return self._renderCached(source, cache)
+                return document.render(source)
+            finally:
+                self.profiler.exit()
+
+    def _renderCached(self, source: str, cache: 'cache.RenderCache') -> str:
+        '''Render the source if it is not cached. Renders that change the renderer
+           state or report messages are not added to the cache.'''
+        from rimu import cache as rendercache  # Deferred to avoid a circular import.
+        state = rendercache.fingerprint(self)
+        key = rendercache.key(source, state)
+        html = cache.get(key)
+        if html is not None:
+            return html
+        callback = self.callback
+        reported = False
+
+        def reporter(message: 'options.CallbackMessage') -> None:
+            nonlocal reported
+            reported = True
+            if callback is not None:
+                callback(message)
+        self.callback = reporter
+        try:
+            html = document.render(source)
+        finally:
+            if self.callback is reporter:
+                self.callback = callback
+            else:
+                reported = True  # The callback was changed by the source.
+        if not reported and rendercache.fingerprint(self) == state:
+            cache.put(key, html)
+        return html
+
+    def render_iter(self, source: 'io.Source', opts: Optional['options.RenderOptions'] = None) -> Iterator[str]:
+        '''Render Rimu markup source text, text stream or memory-mapped file to
+           HTML, yielding the HTML of each block as it is rendered. The source is
+           read as it is needed. The blocks are rendered by a private copy of the
+           renderer and the renderer state is updated when the iteration is
+           finished, so the renderer can be used for other renders during the
+           iteration (an abandoned iteration does not update the renderer).'''
+        if opts is None:
+            opts = options.RenderOptions()
+        r = self.copy()
+        with r.activate():
+            options.updateFrom(opts)
+            chunks = document.renderIter(source)
+        if r.profiler is None:
+            while True:
+                with r.activate():
+                    chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                yield chunk
+        else:
+            from rimu import profiler  # Deferred to avoid a circular import.
+            with profiler.installed():
+                while True:
+                    with r.activate():
+                        r.profiler.enter('render')
+                        try:
+                            chunk = next(chunks, None)
+                        finally:
+                            r.profiler.exit()
+                    if chunk is None:
+                        break
+                    yield chunk
+        self._update(r)
+
+    def setMacros(self, values: Dict[str, str]) -> None:
+        '''Set or add macro definitions from a dictionary of macro names and values.'''
+        from rimu import macros  # Deferred to avoid a circular import.
+        with self.activate():
+            self._initialize()
+            macros.setValues(values)
+
+    def snapshot(self) -> 'Snapshot':
+        '''Return a snapshot of the renderer's current definitions (the most
+           recent snapshot is returned if the definitions have not been updated).'''
+        with self.activate():
+            self._initialize()
+        if self._snapshot is not None and all(getattr(self, f) is getattr(self._snapshot, f) for f in DEFINITION_FIELDS):
+            return self._snapshot
+        self._snapshot = Snapshot(self)
+        return self._snapshot
+
+    def copy(self) -> 'Renderer':
+        '''Return a new renderer with a copy of this renderer's state: options,
+           pending Block Attributes, allocated HTML ids and definitions. The
+           definitions are shared by the renderers until they are updated.'''
+        from rimu.expansion import Expand  # Deferred to avoid a circular import.
+        r = Renderer(self.snapshot())
+        for field in OPTION_FIELDS:
+            setattr(r, field, getattr(self, field))
+        r.opts = Expand.copyFrom(self.opts)
+        r.ids = self.ids.copy()
+        return r
+
+    def _update(self, r: 'Renderer') -> None:
+        '''Update this renderer's state from renderer `r` (a copy of this
+           renderer that is no longer used).'''
+        with self.activate():
+            self.restore(r.snapshot())
+            for field in OPTION_FIELDS:
+                setattr(self, field, getattr(r, field))
+            self.opts = r.opts
+            self.ids = r.ids
+
+    def _initialize(self) -> None:
+        '''Implicit first-use initialisation of the active renderer.'''
+        if self.safeMode == -1:
+            document.init()
+
+    def restore(self, snapshot: 'Snapshot') -> None:
+        '''Restore definitions from a snapshot. The snapshot definitions are shared
+           with the renderer until they are updated (copy-on-write).'''
+        for field in DEFINITION_FIELDS:
+            setattr(self, field, getattr(snapshot, field))
+        self._snapshot = snapshot
+
+    def mutable(self, field: str, copy: Callable[[T], T]) -> Any:
+        '''Return the named definitions list (or dictionary) for updating. If it is
+           shared with a snapshot then it (and its items) are copied first.'''
+        defs = getattr(self, field)
+        if self._snapshot is not None and defs is getattr(self._snapshot, field):
+            if isinstance(defs, dict):
+                defs = {key: copy(d) for key, d in defs.items()}
+            else:
+                defs = [copy(d) for d in defs]
+            setattr(self, field, defs)
+        return defs
+
+
+class Snapshot:
+    '''Immutable snapshot of renderer definitions: macros, quotes, replacements
+       and delimited blocks along with their compiled regular expressions.'''
+    macroDefs: Dict[str, 'macros.Macro']
+    quoteDefs: List['quotes.Def']
+    quotesRe: Pattern[str]
+    unescapeRe: Pattern[str]
+    replacementDefs: List['replacements.Def']
+    blockDefs: List['delimitedblocks.Def']
+
+    def __init__(self, r: Renderer):
+        for field in DEFINITION_FIELDS:
+            object.__setattr__(self, field, getattr(r, field))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError('snapshots are immutable')
+
+
+default = Renderer()  # Used by the rimu.render() API and when no renderer is active.
+
+_current: 'contextvars.ContextVar[Renderer]' = contextvars.ContextVar('rimu.renderer', default=default)
+
+
+def current() -> Renderer:
+    '''Return the active renderer.'''
+    return _current.get()
+
+
+def bindModuleState(moduleName: str, fields: Dict[str, str]) -> None:
+    '''Redirect module attributes to fields of the current renderer.
+       `fields` maps module attribute names to Renderer field names.
+       This preserves the module-level state API e.g. `options.safeMode = 1`.'''
+    def field_property(field: str) -> property:
+        return property(
+            lambda _: getattr(current(), field),
+            lambda _, value: setattr(current(), field, value))
+    module = sys.modules[moduleName]
+    props = {attr: field_property(field) for attr, field in fields.items()}
+    module.__class__ = type(f'{moduleName}.module', (types.ModuleType,), props)
@@ -1,12 +1,14 @@
+import functools
 import re
-from typing import Callable, List, Match, Optional, Pattern
+from typing import Callable, List, Match, Optional, Pattern, Tuple
 
-from rimu import options, utils
+from rimu import options, renderer, utils
 
 Filter = Optional[Callable[[Match[str], 'Def'], str]]
 
 
 class Def:
+    __slots__ = ('match', 'replacement', 'filter')
     match: Pattern[str]
     replacement: str
     filter: Filter
@@ -25,7 +27,7 @@ class Def:
         return Def(d.match, d.replacement, d.filter)
 
 
-defs: List[Def] = []  # Mutable definitions initialized by DEFAULT_DEFS.
+defs: List[Def]  # Mutable definitions initialized by DEFAULT_DEFS.
 
 DEFAULT_DEFS: List[Def] = [
     # Begin match with \\? to allow the replacement to be escaped.
@@ -139,14 +141,12 @@ DEFAULT_DEFS: List[Def] = [
 def init() -> None:
     '''Reset definitions to defaults.'''
     # Make shallow copy of DEFAULT_DEFS (list and list objects).
-    defs.clear()
-    for d in DEFAULT_DEFS:
-        defs.append(Def.copyFrom(d))
+    renderer.current().replacementDefs = [Def.copyFrom(d) for d in DEFAULT_DEFS]
 
 
 def getDefinition(pattern: str) -> Optional[Def]:
     '''Return the replacment definition matching the regular expresssion pattern, return null if not found.'''
-    for d in defs:
+    for d in renderer.current().replacementDefs:
         if d.match.pattern == pattern:
             return d
     return None
@@ -161,6 +161,7 @@ def setDefinition(pattern: str, flags: str, replacement: str) -> None:
     if 'm' in flags:
         flgs |= re.MULTILINE
     regexp = re.compile(pattern, flgs)
+    defs = renderer.current().mutable('replacementDefs', Def.copyFrom)
     d = getDefinition(pattern)
     if d is not None:
         # Update existing definition.
@@ -169,3 +170,50 @@ def setDefinition(pattern: str, flags: str, replacement: str) -> None:
     else:
         # Append new definition to end of defs list(custom definitons have lower precedence).
         defs.append(Def(match=regexp, replacement=replacement))
+
+
+# Replacements engines (see the `replacementsEngine` API option):
+# 'sequential' applies each definition in turn to the text (the default).
+# 'single-pass' finds the matches for all definitions in a single left to right scan of the text.
+ENGINES = ['sequential', 'single-pass']
+
+# Assertions that depend on the text preceding a fragment (a single scan cannot reproduce them).
+START_SENSITIVE_RE = re.compile(r'(?<![\[\\])\^|\\[AbBG]|\(\?<[=!]')
+# Assertions that can match at the end of a fragment but not in the full text.
+END_SENSITIVE_RE = re.compile(r'(?<!\\)\$|\\Z|\(\?!')
+# Lookahead assertions can examine text beyond the end of the match.
+LOOKAHEAD_RE = re.compile(r'\(\?[=!]')
+
+
+class SinglePass:
+    '''Definition pattern properties used by the single-pass replacements engine.'''
+    endSensitive: List[bool]  # True if a following definition has end of fragment assertions.
+    lookahead: List[bool]  # True if the definition has lookahead assertions.
+
+    def __init__(self, endSensitive: List[bool], lookahead: List[bool]):
+        self.endSensitive = [any(endSensitive[i + 1:]) for i in range(len(endSensitive))]
+        self.lookahead = lookahead
+
+
+def singlePass(defs: List[Def]) -> Optional[SinglePass]:
+    '''Return the single-pass engine properties for the definitions or None if the
+       definitions cannot be processed in a single pass.'''
+    return compileSinglePass(tuple(d.match.pattern for d in defs))
+
+
+@functools.lru_cache(maxsize=32)
+def compileSinglePass(patterns: Tuple[str, ...]) -> Optional[SinglePass]:
+    if any(isStartSensitive(pattern) for pattern in patterns):
+        return None
+    return SinglePass(
+        [END_SENSITIVE_RE.search(pattern) is not None for pattern in patterns],
+        [LOOKAHEAD_RE.search(pattern) is not None for pattern in patterns])
+
+
+@functools.lru_cache(maxsize=256)
+def isStartSensitive(pattern: str) -> bool:
+    '''Return True if the pattern has assertions that depend on the text preceding a fragment.'''
+    return START_SENSITIVE_RE.search(pattern) is not None
+
+
+renderer.bindModuleState(__name__, {'defs': 'replacementDefs'})
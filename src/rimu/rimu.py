@@ -1,14 +1,35 @@
-from rimu import document, options
+from rimu import io, ir, parallel, renderer
+from rimu.cache import RenderCache
 from rimu.options import RenderOptions
-from typing import Optional
-
-
-def render(source: str, opts: Optional[RenderOptions] = None) -> str:
-    '''Exported render() API.'''
-    if opts is None:
-        opts = RenderOptions()
-    # Implicit first-call API initialisation.
-    if options.safeMode == -1:
-        document.init()
-    options.updateFrom(opts)
-    return document.render(source)
+from typing import Iterator, Optional
+
+
+def render(source: str, opts: Optional[RenderOptions] = None, cache: Optional[RenderCache] = None) -> str:
+    '''Exported render() API (renders with the default renderer). If a `cache`
+       is specified the HTML is looked up in (or added to) the cache.'''
+    return renderer.default.render(source, opts, cache)
+
+
+def render_iter(source: io.Source, opts: Optional[RenderOptions] = None) -> Iterator[str]:
+    '''Exported render_iter() API: render source text, text stream or memory-mapped
+       file yielding HTML block by block (renders with the default renderer).'''
+    return renderer.default.render_iter(source, opts)
+
+
+def render_parallel(source: str, opts: Optional[RenderOptions] = None, jobs: Optional[int] = None) -> str:
+    '''Exported render_parallel() API: render a large document using a pool of
+       `jobs` worker processes (defaults to the number of CPUs). The HTML is
+       identical to render() (renders with the default renderer).'''
+    return parallel.render(renderer.default, source, opts, jobs)
+
+
+def parse(source: str, opts: Optional[RenderOptions] = None) -> ir.IR:
+    '''Exported parse() API: render source to a JSON serializable intermediate
+       representation (IR) that render_ir() renders with other safeMode and
+       htmlReplacement values (parses with the default renderer).'''
+    return ir.parse(renderer.default, source, opts)
+
+
+def render_ir(tree: ir.IR, safeMode: Optional[int] = None, htmlReplacement: Optional[str] = None) -> str:
+    '''Exported render_ir() API: render an IR returned by parse() to HTML.'''
+    return ir.render(tree, safeMode, htmlReplacement)
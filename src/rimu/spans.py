@@ -13,12 +13,13 @@
 '''
 
 import re
-from typing import List, Match, Optional
+from typing import List, Match, Optional, Tuple, Union, cast
 
-from rimu import quotes, replacements, utils
+from rimu import quotes, renderer, replacements, utils
 
 
 class Fragment:
+    __slots__ = ('text', 'done', 'verbatim')
     text: str
     done: bool
     verbatim: str  # Replacements text rendered verbatim.
@@ -33,6 +34,10 @@ class Fragment:
         self.verbatim = verbatim
 
 
+# Matches replacement placeholders (see `preReplacements()`).
+PLACEHOLDERS_RE = re.compile(r'[\u0000\u0001]')
+
+
 def render(source: str) -> str:
     result = preReplacements(source)
     fragments = [Fragment(text=result, done=False)]
@@ -44,10 +49,7 @@ def render(source: str) -> str:
 
 def defrag(fragments: List[Fragment]) -> str:
     '''Converts fragments to a string.'''
-    result = ''
-    for fragment in fragments:
-        result += fragment.text
-    return result
+    return ''.join([fragment.text for fragment in fragments])
 
 
 def fragQuotes(fragments: List[Fragment]) -> List[Fragment]:
@@ -63,90 +65,130 @@ def fragQuotes(fragments: List[Fragment]) -> List[Fragment]:
 
 
 def fragQuote(fragment: Fragment) -> List[Fragment]:
-    '''Fragment quotes in a single fragment and return resulting fragments array.'''
+    '''Fragment quotes in a single fragment and return resulting fragments array.
+
+       Quoted text is processed iteratively using an explicit stack of pending work
+       (fragments to output and text to search) so large paragraphs and deeply nested
+       quotes do not exhaust the Python stack. The text following a quote is searched
+       in place from the quote end position instead of being copied.'''
     if fragment.done:
         return [fragment]
-    # Find first matched quote in fragment text.
-    quote: str
-    match: Optional[Match[str]]
-    startIndex: int = 0
-    nextIndex: int = 0
-    while True:
-        match = quotes.quotesRe.search(fragment.text, nextIndex)
+    r = renderer.current()
+    quotesRe = r.quotesRe
+    result: List[Fragment] = []
+    # Pending work, popped last in first out: a Fragment is output, a (text, position)
+    # tuple searches text for quotes starting at position.
+    stack: List[Union[Fragment, Tuple[str, int]]] = [(fragment.text, 0)]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, Fragment):
+            result.append(item)
+            continue
+        text, offset = item
+        # Find first matched quote in text following offset.
+        quote: str
+        match: Optional[Match[str]]
+        startIndex: int = 0
+        nextIndex: int = 0  # Relative to offset.
+        while True:
+            match = quotesRe.search(text, offset + nextIndex)
+            if match is None:
+                break
+            quote = match[1]
+            # Check if quote is escaped.
+            if match[0].startswith('\\'):
+                # Restart search after escaped opening quote.
+                nextIndex += match.start() - offset + len(quote) + 1
+                continue
+            startIndex = match.start()
+            nextIndex = match.end()
+            break
         if match is None:
-            return [fragment]
-        quote = match[1]
-        # Check if quote is escaped.
-        if match[0].startswith('\\'):
-            # Restart search after escaped opening quote.
-            nextIndex += match.start() + len(quote) + 1
+            if offset == 0 and text is fragment.text:
+                result.append(fragment)  # No quotes in fragment.
+            else:
+                result.append(Fragment(text=text[offset:], done=False))
             continue
-        startIndex = match.start()
-        nextIndex = match.end()
-        break
-    result: List[Fragment] = []
-    # Arrive here if we have a matched quote.
-    # The quote splits the input fragment into 5 or more output fragments:
-    # Text before the quote, left quote tag, quoted text, right quote tag and text after the quote.
-    qdef = quotes.getDefinition(match[1])
-    assert qdef is not None
-    # Check for same closing quote one character further to the right.
-    quoted = match[2]
-    while nextIndex < len(fragment.text) and fragment.text[nextIndex] == quote[0]:
-        # Move to closing quote one character to right.
-        quoted += quote[0]
-        nextIndex += 1
-    before = fragment.text[:startIndex]
-    after = fragment.text[nextIndex:]
-    result.append(Fragment(text=before, done=False))
-    result.append(Fragment(text=qdef.openTag, done=True))
-    if not qdef.spans:
-        # Spans are disabled so render the quoted text verbatim.
-        quoted = utils.replaceSpecialChars(quoted)
-        quoted = quoted.replace('\u0000', '\u0001')  # Substitute verbatim replacement placeholder.
-        result.append(Fragment(text=quoted, done=True))
-    else:
-        # Recursively process the quoted text.
-        result.extend(fragQuote(Fragment(text=quoted, done=False)))
-    result.append(Fragment(text=qdef.closeTag, done=True))
-    # Recursively process the following text.
-    result.extend(fragQuote(Fragment(text=after, done=False)))
+        # Arrive here if we have a matched quote.
+        # The quote splits the input text into 5 or more output fragments:
+        # Text before the quote, left quote tag, quoted text, right quote tag and text after the quote.
+        qdef = quotes.getDefinition(match[1])
+        assert qdef is not None
+        # Check for same closing quote one or more characters further to the right.
+        closeIndex = cast(Match[str], re.compile(re.escape(quote[0]) + '*').match(text, nextIndex)).end()
+        quoted = match[2] + text[nextIndex:closeIndex]
+        nextIndex = closeIndex
+        openTag, closeTag = qdef.openTag, qdef.closeTag
+        if r.recorder is not None:
+            openTag, closeTag = r.recorder.quote(quote, openTag, closeTag)
+        result.append(Fragment(text=text[offset:startIndex], done=False))
+        result.append(Fragment(text=openTag, done=True))
+        # Push the remaining work in reverse order.
+        stack.append((text, nextIndex))  # The following text.
+        stack.append(Fragment(text=closeTag, done=True))
+        if not qdef.spans:
+            # Spans are disabled so render the quoted text verbatim.
+            quoted = utils.replaceSpecialChars(quoted)
+            quoted = quoted.replace('\u0000', '\u0001')  # Substitute verbatim replacement placeholder.
+            stack.append(Fragment(text=quoted, done=True))
+        else:
+            stack.append((quoted, 0))  # The quoted text.
     return result
 
 
 # Stores placeholder replacement fragments saved by `preReplacements()` and restored by `postReplacements()`.
-savedReplacements: List[Fragment] = []
+savedReplacements: List[Fragment]  # Bound to the current renderer.
 
 
 def preReplacements(text: str) -> str:
     '''Return text with replacements replaced with a placeholder character (see `postReplacements()`):
        '\u0000' is placeholder for expanded replacement text.
        '\u0001' is placeholder for unexpanded replacement text (replacements that occur within quotes are rendered verbatim).'''
+    r = renderer.current()
+    savedReplacements = r.savedReplacements
     savedReplacements.clear()
     fragments = fragReplacements([Fragment(text=text, done=False)])
     # Reassemble text with replacement placeholders.
-    result = ''
+    result: List[str] = []
     for fragment in fragments:
         if fragment.done:
+            if r.recorder is not None:
+                fragment.text = r.recorder.replacement(fragment.text)
             savedReplacements.append(fragment)  # Save replaced text.
-            result += '\u0000'  # Placeholder for replaced text.
+            result.append('\u0000')  # Placeholder for replaced text.
         else:
-            result += fragment.text
-    return result
+            result.append(fragment.text)
+    return ''.join(result)
 
 
 def postReplacements(text: str) -> str:
     '''Replace replacements placeholders with replacements text from savedReplacements[].'''
+    savedReplacements = renderer.current().savedReplacements
+    saved = iter(savedReplacements)  # Placeholders are replaced in order.
+
     def func(match):
-        fragment = savedReplacements.pop(0)
+        fragment = next(saved)
         return fragment.text if match[0] == '\u0000'else utils.replaceSpecialChars(fragment.verbatim)
-    return re.sub(r'[\u0000\u0001]', func, text)
+    result = PLACEHOLDERS_RE.sub(func, text)
+    savedReplacements.clear()
+    return result
 
 
 def fragReplacements(fragments: List[Fragment]) -> List[Fragment]:
     '''Fragment replacements in all fragments and return resulting fragments array.'''
+    r = renderer.current()
+    if r.replacementsEngine == 'single-pass':
+        plan = replacements.singlePass(r.replacementDefs)
+        if plan is not None:
+            result: List[Fragment] = []
+            for fragment in fragments:
+                if fragment.done:
+                    result.append(fragment)
+                else:
+                    result.extend(scanReplacements(fragment.text, 0, r.replacementDefs, plan))
+            return result
     result = list(fragments)
-    for rdef in replacements.defs:
+    for rdef in r.replacementDefs:
         tmp: List[Fragment] = []
         for fragment in result:
             tmp.extend(fragReplacement(fragment, rdef))
@@ -156,19 +198,43 @@ def fragReplacements(fragments: List[Fragment]) -> List[Fragment]:
 
 def fragReplacement(fragment: Fragment,  rdef: replacements.Def) -> List[Fragment]:
     '''Fragment replacements in a single fragment for a single replacement definition.
-       Return resulting fragments array.'''
+       Return resulting fragments array.
+
+       The text following each replacement is searched in place from the end of the
+       replacement unless the pattern has assertions that depend on the preceding text
+       (e.g. `^` or `\\b`), these are searched in a copy of the following text.
+       Empty matches are ignored.'''
     if fragment.done:
         return [fragment]
-    match = rdef.match.search(fragment.text)
-    if match is None:
-        return [fragment]
-    # Arrive here if we have a matched replacement.
-    # The replacement splits the input fragment into 3 output fragments:
-    # Text before the replacement, replaced text and text after the replacement.
-    before = fragment.text[:match.start()]
-    after = fragment.text[match.end():]
+    text = fragment.text
+    copyRemainder = replacements.isStartSensitive(rdef.match.pattern)
     result: List[Fragment] = []
-    result.append(Fragment(text=before, done=False))
+    start = 0  # Start of text not yet added to the result.
+    pos = 0  # Search position.
+    while pos <= len(text):
+        match = rdef.match.search(text, pos)
+        if match is None:
+            break
+        if match.end() == match.start():
+            pos = match.start() + 1
+            continue
+        # Arrive here if we have a matched replacement.
+        # The replacement splits the text into 3 output fragments:
+        # Text before the replacement, replaced text and text after the replacement.
+        result.append(Fragment(text=text[start:match.start()], done=False))
+        result.append(replacementFragment(match, rdef))
+        start = pos = match.end()
+        if copyRemainder:
+            text = text[start:]
+            start = pos = 0
+    if not result:
+        return [fragment]
+    result.append(Fragment(text=text[start:], done=False))
+    return result
+
+
+def replacementFragment(match: Match[str], rdef: replacements.Def) -> Fragment:
+    '''Return the done fragment for a matched replacement.'''
     replacement: str
     if match[0].startswith('\\'):
         # Remove leading backslash.
@@ -178,9 +244,87 @@ def fragReplacement(fragment: Fragment,  rdef: replacements.Def) -> List[Fragmen
             replacement = utils.replaceMatch(match, rdef.replacement)
         else:
             replacement = rdef.filter(match, rdef)
-    result.append(Fragment(text=replacement, done=True, verbatim=match[0]))
-    # Recursively process the remaining text.
-    result.extend(fragReplacement(Fragment(text=after, done=False), rdef))
+    return Fragment(text=replacement, done=True, verbatim=match[0])
+
+
+def scanReplacements(text: str, first: int, defs: List[replacements.Def],
+                     plan: replacements.SinglePass) -> List[Fragment]:
+    '''Fragment replacements for definitions defs[first:] in a single left to right scan
+       of the text and return resulting fragments array.
+
+       The next match of each definition is cached, the leftmost match is processed next
+       (earlier definitions take precedence at the same position). The sequential engine
+       applies each definition to the fragments left by the preceding definitions, the
+       scan reproduces this:
+       - A match is discarded if a preceding definition matches inside it (or inside
+         the text examined by its lookahead assertions), the text up to the preceding
+         definition match is rescanned as a separate fragment.
+       - The text before a match is rescanned if a following definition can match at
+         the end of a fragment (e.g. the line-break `$` assertion).
+       Empty matches are ignored.'''
+    result: List[Fragment] = []
+    count = len(defs)
+    nomatch = len(text) + 1  # Start position of missing matches.
+    matches: List[Optional[Match[str]]] = [None] * count
+    starts = [-1] * count  # Start position of next match, -1 if not yet searched.
+
+    def search(k: int, pos: int) -> int:
+        '''Return the start of the next defs[k] match at or after pos.'''
+        if starts[k] < pos:
+            m = defs[k].match.search(text, pos)
+            while m is not None and m.end() == m.start():
+                m = defs[k].match.search(text, m.start() + 1) if m.start() < len(text) else None
+            matches[k] = m
+            starts[k] = nomatch if m is None else m.start()
+        return starts[k]
+
+    def leftmost(lo: int, hi: int, pos: int) -> int:
+        '''Return the index of the leftmost defs[lo:hi] match at or after pos, -1 if there are none.'''
+        result = -1
+        leftStart = nomatch
+        for k in range(lo, hi):
+            if search(k, pos) < leftStart:
+                result = k
+                leftStart = starts[k]
+        return result
+
+    start = 0  # Start of text not yet added to the result.
+    pos = 0  # Search position.
+    while True:
+        i = leftmost(first, count, pos)
+        if i == -1:
+            break
+        match = matches[i]
+        assert match is not None
+        # A preceding definition match that starts inside the match takes precedence
+        # (unless it too contains a preceding definition match).
+        w = i
+        following = -1  # The first preceding definition match after the match.
+        while w > first:
+            k = leftmost(first, w, starts[w] + 1)
+            if k == -1:
+                break
+            if starts[k] >= cast(Match[str], matches[w]).end():
+                if w == i:
+                    following = k
+                break
+            w = k
+        if w == i and following != -1 and plan.lookahead[i]:
+            # Lookaheads must not examine text beyond the following preceding definition match.
+            m = defs[i].match.match(text, match.start(), starts[following])
+            if m is None or m.end() != match.end():
+                w = following
+        if w != i:
+            result.extend(scanReplacements(text[start:starts[w]], w + 1, defs, plan))
+            start = pos = starts[w]
+            continue
+        if plan.endSensitive[i] and start < match.start():
+            result.extend(scanReplacements(text[start:match.start()], i + 1, defs, plan))
+        else:
+            result.append(Fragment(text=text[start:match.start()], done=False))
+        result.append(replacementFragment(match, defs[i]))
+        start = pos = match.end()
+    result.append(Fragment(text=text[start:], done=False))
     return result
 
 
@@ -188,3 +332,6 @@ def fragSpecials(fragments: List[Fragment]) -> None:
     '''Replace special characters in all non-done fragments.'''
     for fragment in filter(lambda fragment: not fragment.done, fragments):
         fragment.text = utils.replaceSpecialChars(fragment.text)
+
+
+renderer.bindModuleState(__name__, {'savedReplacements': 'savedReplacements'})
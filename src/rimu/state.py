@@ -0,0 +1,129 @@
+'''
+ This module implements renderer state serialization.
+
+ `dump()` converts the renderer state (API options, pending Block Attributes,
+ allocated HTML ids and the macro, quote, replacement and delimited block
+ definitions) to JSON compatible data and `load()` restores it, so the state
+ left by rendering a prelude (e.g. a file of macro definitions) can be saved
+ and restored without rendering the prelude again. The `callback` and
+ `profiler` API options are not saved.
+
+ Definitions that are unchanged from the defaults are restored by sharing the
+ default definitions (their regular expressions are not compiled again).
+'''
+
+import re
+from typing import Any, Dict, List, Optional, Union
+
+from rimu import (delimitedblocks, document, macros, quotes, renderer,
+                  replacements)
+from rimu.expansion import Expand
+from rimu.ids import Ids
+
+# Serialized state format version.
+FORMAT = 1
+
+State = Dict[str, Any]
+Definitions = Union[renderer.Renderer, renderer.Snapshot]
+
+
+def dump(r: renderer.Renderer) -> State:
+    '''Return the renderer state as JSON compatible data.'''
+    with r.activate():
+        r._initialize()
+    return {
+        'format': FORMAT,
+        'options': [r.safeMode, r.htmlReplacement, r.replacementsEngine, r.classifyLines],
+        'blockAttributes': [r.classes, r.id, r.css, r.attributes, dumpExpand(r.opts)],
+        'ids': list(r.ids),
+        'macroDefs': dumpMacros(r),
+        'quoteDefs': dumpQuotes(r),
+        'replacementDefs': dumpReplacements(r),
+        'blockDefs': dumpBlocks(r),
+    }
+
+
+def load(data: State, r: Optional[renderer.Renderer] = None) -> renderer.Renderer:
+    '''Restore the renderer state from data returned by `dump()` and return the
+       renderer (a new renderer is returned if `r` is not specified). Raises
+       `ValueError` if the data is not a valid renderer state.'''
+    if not isinstance(data, dict) or data.get('format') != FORMAT:
+        raise ValueError('unsupported renderer state format')
+    if r is None:
+        r = renderer.Renderer()
+    try:
+        with r.activate():
+            document.init()
+            defaults = document.defaults()
+            r.safeMode, r.htmlReplacement, r.replacementsEngine, r.classifyLines = data['options']
+            r.classes, r.id, r.css, r.attributes, opts = data['blockAttributes']
+            r.opts = Expand(*opts)
+            r.ids = Ids(str(id) for id in data['ids'])
+            if data['macroDefs'] != dumpMacros(defaults):
+                r.macroDefs = {name: macros.Macro(name, value) for name, value in data['macroDefs']}
+            if data['quoteDefs'] != dumpQuotes(defaults):
+                r.quoteDefs = [quotes.Def(quote, openTag, closeTag, spans)
+                               for quote, openTag, closeTag, spans in data['quoteDefs']]
+                quotes.initializeRegExps()
+            if data['replacementDefs'] != dumpReplacements(defaults):
+                r.replacementDefs = [loadReplacement(*d) for d in data['replacementDefs']]
+            if data['blockDefs'] != dumpBlocks(defaults):
+                r.blockDefs = [loadBlock(*d) for d in data['blockDefs']]
+    except (KeyError, TypeError, ValueError, IndexError) as e:
+        with r.activate():
+            document.init()
+        raise ValueError(f'invalid renderer state: {e}') from e
+    return r
+
+
+def dumpExpand(expand: Expand) -> List[Optional[bool]]:
+    return [expand.macros, expand.container, expand.skip, expand.spans, expand.specials]
+
+
+def dumpMacros(r: Definitions) -> List[List[str]]:
+    return [[m.name, m.value] for m in r.macroDefs.values()]
+
+
+def dumpQuotes(r: Definitions) -> List[List[Any]]:
+    return [[d.quote, d.openTag, d.closeTag, d.spans] for d in r.quoteDefs]
+
+
+def dumpReplacements(r: Definitions) -> List[List[Any]]:
+    '''Replacement definitions with filters are identified by the index of the
+       default definition that defines the filter.'''
+    result = []
+    for d in r.replacementDefs:
+        index = None
+        if d.filter is not None:
+            index = next((i for i, p in enumerate(replacements.DEFAULT_DEFS) if p.filter is d.filter), None)
+            if index is None:
+                raise ValueError(f'replacement definition filter cannot be saved: {d.match.pattern}')
+        result.append([d.match.pattern, d.match.flags, d.replacement, index])
+    return result
+
+
+def loadReplacement(pattern: str, flags: int, replacement: str, index: Optional[int]) -> replacements.Def:
+    # Reuse the compiled regular expression of a default definition.
+    match = next((d.match for d in replacements.DEFAULT_DEFS
+                  if d.match.pattern == pattern and d.match.flags == flags), None)
+    if match is None:
+        match = re.compile(pattern, flags)
+    filter = replacements.DEFAULT_DEFS[index].filter if index is not None else None
+    return replacements.Def(match=match, replacement=replacement, filter=filter)
+
+
+def dumpBlocks(r: Definitions) -> List[List[Any]]:
+    '''Delimited block definitions are identified by their names (only the tags
+       and expansion options of a definition can be updated).'''
+    return [[d.name, d.openTag, d.closeTag, dumpExpand(d.expand)] for d in r.blockDefs]
+
+
+def loadBlock(name: str, openTag: str, closeTag: str, expand: List[Optional[bool]]) -> delimitedblocks.Def:
+    for default in delimitedblocks.DEFAULT_DEFS:
+        if default.name == name:
+            d = delimitedblocks.Def.copyFrom(default)
+            d.openTag = openTag
+            d.closeTag = closeTag
+            d.expand = Expand(*expand)
+            return d
+    raise ValueError(f'illegal delimited block name: {name}')
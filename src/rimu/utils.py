@@ -1,9 +1,12 @@
 import re
 from typing import Optional, Match
 
-from rimu import macros, options, spans
+from rimu import macros, options, renderer, spans
 from rimu.expansion import Expand
 
+# Matches replacement group patterns '$1' or '$$1', '$2' or '$$2'...
+MATCH_GROUP = re.compile(r'(\${1,2})(\d)')
+
 
 def replaceSpecialChars(s: str) -> str:
     return s.replace('&', '&amp;').replace('>', '&gt;').replace('<', '&lt;')
@@ -13,8 +16,8 @@ def replaceMatch(match: Match, replacement: str, expand: Optional[Expand] = None
     '''Replace pattern '$1' or '$$1', '$2' or '$$2'... in `replacement` with corresponding match groups
        from `match`. If pattern starts with one '$' character add specials to `expand`,
        if it starts with two '$' characters add spans to `expand`.'''
-    if expand is None:
-        expand = Expand()
+    # The expansion options are updated so a copy is used (they may be shared constants).
+    expand = Expand() if expand is None else Expand.copyFrom(expand)
 
     def repl(m):
         assert expand is not None
@@ -31,7 +34,7 @@ def replaceMatch(match: Match, replacement: str, expand: Optional[Expand] = None
         result = match[i]
         # match group text.
         return replaceInline(result, expand)
-    return re.sub(r'(\${1,2})(\d)', repl, replacement)
+    return MATCH_GROUP.sub(repl, replacement)
 
 
 def replaceInline(text: str, expand: Expand) -> str:
@@ -41,7 +44,8 @@ def replaceInline(text: str, expand: Expand) -> str:
         result = macros.render(result)
     # Spans also expand special characters.
     if expand.spans:
-        result = spans.render(result)
+        inline = renderer.current().inlineRenderer
+        result = spans.render(result) if inline is None else inline(result)
     elif expand.specials:
         result = replaceSpecialChars(result)
     return result
@@ -1,2 +1,12 @@
-from rimuc.rimuc import main, readResource
+from typing import Any
+
 from rimuc.resources import resources
+
+
+def __getattr__(name: str) -> Any:
+    # The command (and the renderer) are imported on first use so the thin
+    # server client (`python -m rimuc.client`) does not import them.
+    if name in ['main', 'readResource']:
+        from rimuc import rimuc
+        return getattr(rimuc, name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,85 @@
+'''
+ rimuc server client.
+
+ The client sends the rimuc command-line arguments, working directory and
+ standard input to a rimuc server (see `rimuc --server`) and writes the
+ server's output and messages to standard output and standard error. Run it
+ with `rimuc --client SOCKET [OPTIONS...] [FILES...]` or, to skip importing
+ the renderer, with `python -m rimuc.client SOCKET [OPTIONS...] [FILES...]`.
+
+ Requests and responses are JSON objects (one per connection):
+
+   request:  {"args": [...], "cwd": "...", "stdin": "..."}
+   response: {"status": 0, "stdout": "...", "stderr": "..."}
+
+ This module only uses the Python standard library.
+'''
+
+import json
+import os
+import socket
+import sys
+from typing import Any, Dict, List, Optional
+
+# rimuc options that are followed by a value.
+VALUE_OPTIONS = ['--output', '-o', '--out-dir', '--jobs', '-j', '--cache-dir', '--prepend', '-p', '--prepend-file',
+                 '--safe-mode', '--safeMode', '--html-replacement', '--htmlReplacement', '--lang', '--title',
+                 '--theme', '--layout', '--styled-name', '--server', '--client']
+
+
+def readsStdin(args: List[str]) -> bool:
+    '''Return True if the rimuc command-line reads standard input.'''
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in ['--help', '-h', '--version']:
+            return False
+        if arg in VALUE_OPTIONS:
+            i += 2
+        elif arg.startswith('-') and arg != '-':
+            i += 1
+        else:
+            break
+    files = args[i:]
+    return len(files) == 0 or '-' in files
+
+
+def request(address: str, args: List[str], cwd: Optional[str] = None, stdin: str = '') -> Dict[str, Any]:
+    '''Send a rimuc command-line to the server listening on Unix domain socket
+       `address` and return the response.'''
+    data = json.dumps({'args': args, 'cwd': cwd or os.getcwd(), 'stdin': stdin}).encode()
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.connect(address)
+        s.sendall(data)
+        s.shutdown(socket.SHUT_WR)
+        chunks = []
+        while True:
+            chunk = s.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return json.loads(b''.join(chunks))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    '''Process the client command-line (the socket address followed by rimuc
+       arguments) and return the rimuc exit status.'''
+    args = sys.argv[1:] if argv is None else argv
+    if len(args) == 0:
+        sys.stderr.write('missing server socket\n')
+        return 1
+    address, args = args[0], args[1:]
+    stdin = sys.stdin.read() if readsStdin(args) else ''
+    try:
+        response = request(address, args, stdin=stdin)
+    except OSError as e:
+        sys.stderr.write(f'rimuc server {address}: {e.strerror or e}\n')
+        return 1
+    sys.stdout.write(response['stdout'])
+    sys.stdout.flush()
+    sys.stderr.write(response['stderr'])
+    return response['status']
+
+
+if __name__ == '__main__':
+    sys.exit(main())
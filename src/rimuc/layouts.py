@@ -0,0 +1,153 @@
+'''
+ Rendered layout header and footer cache.
+
+ Layout headers and footers are large (embedded CSS and JavaScript) and, for
+ a given set of styling macro values (--theme, --title, --no-toc...), render
+ the same HTML. Rendered headers and footers are cached in memory (so batch
+ mode and server worker processes render them once) and, if a cache directory
+ is specified, in JSON files in the directory (so they are shared by rimuc
+ commands).
+
+ An entry is keyed by the layout resource, the values of the macros referenced
+ by the resource, the non-macro definitions, the render options and the pending
+ Block Attributes. An entry contains the HTML and the macros defined by the
+ resource. Renders that report messages, allocate HTML ids or update
+ non-macro definitions are not cached.
+'''
+
+import collections
+import copy
+import hashlib
+import json
+import os
+import re
+import tempfile
+from typing import Any, Dict, List, Optional
+
+import rimu
+from rimu import state
+from rimu.expansion import Expand
+
+FILE_PREFIX = 'layout-'
+# Maximum number of in-memory entries.
+MAX_ENTRIES = 64
+# Matches macro names in macro invocations and definitions.
+MACRO_NAME = re.compile(r'\{([\w\-]+)')
+
+# In-memory entries (shared by layout caches).
+_entries: 'collections.OrderedDict[str, Dict[str, Any]]' = collections.OrderedDict()
+
+
+class LayoutCache:
+    '''Layout header and footer cache, entries are also stored in `directory`
+       (if it is specified).'''
+    hits: int
+    misses: int
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, r: rimu.Renderer, name: str, source: str, options: rimu.RenderOptions) -> str:
+        '''Render layout resource `name` with renderer `r`.'''
+        r.render('', options)  # Apply the options before computing the key.
+        key = self.key(r, name, source)
+        entry = self.get(key)
+        if entry is not None:
+            self.hits += 1
+            r.setMacros(entry['macros'])
+            r.classes, r.id, r.css, r.attributes, opts = entry['blockAttributes']
+            r.opts = Expand(*opts)
+            return entry['html']
+        self.misses += 1
+        before = {m.name: m.value for m in r.macroDefs.values()}
+        definitions = dumpDefinitions(r)
+        ids = r.ids.copy()
+        reported = False
+        callback = options.callback
+
+        def reporter(message: rimu.CallbackMessage) -> None:
+            nonlocal reported
+            reported = True
+            if callback is not None:
+                callback(message)
+        options = copy.copy(options)
+        options.callback = reporter
+        html = r.render(source, options)
+        if not reported and r.ids == ids and dumpDefinitions(r) == definitions:
+            self.put(key, {
+                'html': html,
+                'macros': {m.name: m.value for m in r.macroDefs.values() if before.get(m.name) != m.value},
+                'blockAttributes': [r.classes, r.id, r.css, r.attributes, state.dumpExpand(r.opts)],
+            })
+        return html
+
+    def key(self, r: rimu.Renderer, name: str, source: str) -> str:
+        '''Return the cache key of a layout resource rendered in the renderer's current state.'''
+        # The referenced macros (including macros referenced by their values).
+        names = {'--header-ids'}
+        pending = [source]
+        while pending:
+            for macro in MACRO_NAME.findall(pending.pop()):
+                if macro not in names:
+                    names.add(macro)
+                    value = r.macroDefs.get(macro)
+                    if value is not None:
+                        pending.append(value.value)
+        from rimuc.rimuc import VERSION  # Deferred to avoid a circular import.
+        values = sorted((macro, r.macroDefs[macro].value if macro in r.macroDefs else None) for macro in names)
+        data = [
+            VERSION,
+            name,
+            hashlib.sha256(source.encode()).hexdigest(),
+            values,
+            dumpDefinitions(r),
+            [r.safeMode, r.htmlReplacement, r.replacementsEngine, r.classifyLines],
+            [r.classes, r.id, r.css, r.attributes, state.dumpExpand(r.opts)],
+        ]
+        return hashlib.sha256(json.dumps(data).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = _entries.get(key)
+        if entry is not None:
+            _entries.move_to_end(key)
+            return entry
+        if self.directory is None:
+            return None
+        try:
+            with open(os.path.join(self.directory, FILE_PREFIX + key + '.json')) as f:
+                entry = json.load(f)
+            if not isinstance(entry, dict) or not isinstance(entry.get('html'), str):
+                return None
+        except (OSError, ValueError):
+            return None
+        store(key, entry)
+        return entry
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        store(key, entry)
+        if self.directory is None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        # Write to a temporary file first so concurrent commands never read a partial file.
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=FILE_PREFIX, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entry, f)
+            os.replace(tmp, os.path.join(self.directory, FILE_PREFIX + key + '.json'))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+def store(key: str, entry: Dict[str, Any]) -> None:
+    '''Add an in-memory entry, evicting the least recently used entry if the cache is full.'''
+    _entries[key] = entry
+    while len(_entries) > MAX_ENTRIES:
+        _entries.popitem(last=False)
+
+
+def dumpDefinitions(r: rimu.Renderer) -> List[Any]:
+    '''Return the non-macro definitions.'''
+    return [state.dumpQuotes(r), state.dumpReplacements(r), state.dumpBlocks(r)]
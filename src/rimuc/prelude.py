@@ -0,0 +1,90 @@
+'''
+ Compiled prelude cache (see the rimuc `--cache-dir` option).
+
+ The prelude is the Rimu source that is processed before the converted files:
+ the .rimurc file, --prepend-file files and --prepend options (and, in batch
+ mode, the layout header). A prelude only renders definitions (and, usually,
+ no HTML) so the renderer state it leaves and its HTML are saved to a JSON file
+ in the cache directory and later runs load them instead of rendering the
+ prelude again.
+
+ Prelude files are keyed by the prelude sources' names, modification times and
+ contents, the rimuc version and the options that affect the prelude.
+
+ rimuc server worker processes also keep the most recently used preludes in
+ memory (see `remember()` and `recall()`), so a request only renders its
+ prelude if the worker has not rendered the same prelude before.
+'''
+
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+from rimu import renderer, state
+
+FILE_PREFIX = 'prelude-'
+MEMORY_SIZE = 16  # Maximum number of preludes kept in memory.
+
+_memory: Dict[str, Tuple[state.State, List[str]]] = {}  # Renderer state and HTML by prelude key.
+
+
+def key(sources: List[Tuple[str, str]], version: str, *options: Any) -> str:
+    '''Return the cache key of the prelude sources (names and contents).'''
+    h = hashlib.sha256(repr((version, state.FORMAT, options)).encode())
+    for name, text in sources:
+        mtime = os.stat(name).st_mtime_ns if os.path.isfile(name) else None
+        h.update(repr((os.path.abspath(name), mtime, hashlib.sha256(text.encode()).hexdigest())).encode())
+    return h.hexdigest()
+
+
+def load(directory: str, key: str, r: renderer.Renderer) -> Optional[List[str]]:
+    '''Load the cached prelude renderer state into `r` and return the HTML of
+       each prelude source, return None if the prelude is not cached.'''
+    try:
+        with open(os.path.join(directory, FILE_PREFIX + key + '.json')) as f:
+            data = json.load(f)
+        state.load(data['state'], r)
+        html = data['html']
+        if not isinstance(html, list) or not all(isinstance(chunk, str) for chunk in html):
+            raise ValueError('invalid prelude HTML')
+        return html
+    except (OSError, ValueError, KeyError, TypeError):
+        return None  # Missing or invalid cache file.
+
+
+def save(directory: str, key: str, r: renderer.Renderer, html: List[str]) -> None:
+    '''Save the renderer state following the prelude and the prelude HTML.'''
+    data = {'state': state.dump(r), 'html': html}
+    os.makedirs(directory, exist_ok=True)
+    # Write to a temporary file first so concurrent runs never read a partial file.
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=FILE_PREFIX, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp, os.path.join(directory, FILE_PREFIX + key + '.json'))
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def remember(key: str, r: renderer.Renderer, html: List[str]) -> None:
+    '''Keep the renderer state following the prelude and the prelude HTML in
+       memory (the least recently used prelude is discarded).'''
+    _memory.pop(key, None)
+    if len(_memory) >= MEMORY_SIZE:
+        del _memory[next(iter(_memory))]
+    _memory[key] = (state.dump(r), html)
+
+
+def recall(key: str, r: renderer.Renderer) -> Optional[List[str]]:
+    '''Restore the prelude renderer state kept in memory into `r` and return
+       the HTML of each prelude source, return None if the prelude is not in
+       memory.'''
+    entry = _memory.pop(key, None)
+    if entry is None:
+        return None
+    _memory[key] = entry  # Most recently used.
+    state.load(entry[0], r)
+    return entry[1]
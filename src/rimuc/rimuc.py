@@ -2,16 +2,20 @@ import io
 import os
 import re
 import sys
-from typing import List, Optional
+from typing import List, Optional, TextIO, Tuple, Union
 
 import rimu
 import rimuc
+from rimuc import layouts
+from rimuc import prelude as preludecache
 
 VERSION = '11.4.2'    # Version number conforms to Python PEP 440.
 NAME = 'rimupy'
 HOME_DIR = os.path.expanduser('~')
 RIMURC = os.path.join(HOME_DIR, '.rimurc')
 
+serving = False  # True in rimuc server worker processes.
+
 
 def die(message: str = '') -> None:
     if message != '':
@@ -25,6 +29,11 @@ def readResource(name: str) -> str:
     return rimuc.resources[name]
 
 
+def readFile(name: str) -> str:
+    with open(name) as f:
+        return f.read()
+
+
 def main() -> None:
     '''Process sys.argv command-line.'''
     RESOURCE_TAG = 'resource:'  # Placeholder tag for resource files.
@@ -38,6 +47,10 @@ def main() -> None:
     no_rimurc: bool = False
     prepend_files: List[str] = []
     pass_through: bool = False
+    jobs: int = 1
+    out_dir: str = ''
+    cache_dir: str = ''
+    server: str = ''
 
     def popArg(arg: str) -> str:
         if len(args) == 0:
@@ -62,6 +75,24 @@ def main() -> None:
             pass
         elif arg in ['--output', '-o']:
             outfile = popArg(arg)
+        elif arg in ['--out-dir']:
+            out_dir = popArg(arg)
+        elif arg in ['--jobs', '-j']:
+            value = popArg(arg)
+            if not value.isdigit() or int(value) < 1:
+                die(f'illegal --jobs option value: {value}')
+            jobs = int(value)
+        elif arg in ['--cache-dir']:
+            cache_dir = popArg(arg)
+        elif arg in ['--server']:
+            server = popArg(arg)
+        elif arg in ['--client']:
+            from rimuc import client
+            address = popArg(arg)
+            # Forward the command-line (less the --client option) to the server.
+            argv = sys.argv[1:]
+            i = argv.index(arg)
+            raise SystemExit(client.main([address] + argv[:i] + argv[i + 2:]))
         elif arg in ['--pass']:
             pass_through = True
         elif arg in ['--prepend', '-p']:
@@ -106,9 +137,20 @@ def main() -> None:
         else:
             args.insert(0, arg)  # Contains source file names.
             break
+    if server:
+        from rimuc import server as rimucserver
+        rimucserver.serve(server, jobs)
+        return
     # process.argv contains the list of source files.
     files = list(args)
-    if len(files) == 0:
+    if jobs > 1 and not out_dir:
+        die('--jobs requires the --out-dir option')
+    if out_dir:
+        if outfile:
+            die('--output cannot be used with the --out-dir option')
+        if len(files) == 0 or STDIN in files:
+            die('--out-dir requires source files (stdin cannot be converted)')
+    elif len(files) == 0:
         files.append(STDIN)
     elif len(files) == 1 and layout != '' and files[0] != STDIN and len(outfile) == 0:
         # Use the source file name with .html extension for the output file.
@@ -123,57 +165,274 @@ def main() -> None:
     if prepend:
         prepend_files.append(PREPEND_TAG)
     files = prepend_files + files
+    # Check source files before writing any output.
+    for infile in files:
+        if infile.startswith(RESOURCE_TAG):
+            readResource(infile[len(RESOURCE_TAG):])
+        elif infile not in [STDIN, PREPEND_TAG]:
+            if not os.path.isfile(infile):
+                die('source file does not exist: ' + infile)
+            if not os.access(infile, os.R_OK):
+                die('source file permission denied: ' + infile)
+            if outfile not in ['', '-'] and os.path.abspath(infile) == os.path.abspath(outfile):
+                # The output file is written as the sources are rendered.
+                die('output file would overwrite source file: ' + infile)
+    if out_dir:
+        # Batch mode: convert each source file to an HTML file in the output directory.
+        sources = files[len(prepend_files):]
+        prologue: List[Tuple[str, str]] = []  # Prepended sources and layout header.
+        epilogue: List[Tuple[str, str]] = []  # Layout footer.
+        for infile in prepend_files:
+            if infile == PREPEND_TAG:
+                prologue.append((infile, prepend))
+            else:
+                with open(infile) as f:
+                    prologue.append((infile, f.read()))
+        if layout != '':
+            header = sources.pop(0)[len(RESOURCE_TAG):]
+            footer = sources.pop()[len(RESOURCE_TAG):]
+            prologue.append((header, readResource(header)))
+            epilogue.append((footer, readResource(footer)))
+        outfiles = [os.path.join(out_dir, os.path.splitext(os.path.basename(infile))[0] + '.html')
+                    for infile in sources]
+        for infile, outfile in zip(sources, outfiles):
+            if outfiles.count(outfile) > 1:
+                die('duplicate output file: ' + outfile)
+            if os.path.abspath(infile) == os.path.abspath(outfile):
+                die('output file would overwrite source file: ' + infile)
+        os.makedirs(out_dir, exist_ok=True)
+        batch = Batch(prologue, epilogue, safe_mode, html_replacement, cache_dir, report=True)
+        errors = batch.errors
+        if jobs == 1 or serving:  # The server worker pool provides request concurrency.
+            for infile, outfile in zip(sources, outfiles):
+                errors += batch.convert(infile, outfile)
+        else:
+            from concurrent.futures import ProcessPoolExecutor  # Deferred: only batch mode uses worker processes.
+            # Each worker process renders the prologue once and reuses it for each of its files.
+            with ProcessPoolExecutor(max_workers=jobs, initializer=initWorker,
+                                     initargs=(prologue, epilogue, safe_mode, html_replacement, cache_dir)) as executor:
+                errors += sum(executor.map(convertFile, sources, outfiles))
+        if errors > 0:
+            die()
+        return
     # Convert Rimu source files to HTML.
-    output = ''
     errors = 0
     options = rimu.RenderOptions()
+    cache = rimu.RenderCache(directory=cache_dir) if cache_dir else None
+    layoutcache = layouts.LayoutCache(cache_dir or None)
     if html_replacement is not None:
         options.htmlReplacement = html_replacement
-    for infile in files:
-        source = ''
-        options.safeMode = safe_mode
-        ext = ''
-        if infile.startswith(RESOURCE_TAG):
-            infile = infile[len(RESOURCE_TAG):]
-            source = readResource(infile)
-            options.safeMode = 0  # Resources are trusted.
-        elif infile == STDIN:
-            source = sys.stdin.read()
-        elif infile == PREPEND_TAG:
-            source = prepend
-            options.safeMode = 0  # --prepend options are trusted.
+    # Load the renderer state and HTML of the prepended sources from the compiled prelude cache.
+    prelude_key = ''
+    prelude: Optional[List[str]] = None  # Cached prelude HTML.
+    prelude_html: List[str] = []  # Rendered prelude HTML.
+    messages = 0
+    if (cache_dir or serving) and prepend_files:
+        prelude_key = preludecache.key(
+            [(infile, prepend if infile == PREPEND_TAG else readFile(infile)) for infile in prepend_files],
+            VERSION, html_replacement)
+        if cache_dir:
+            prelude = preludecache.load(cache_dir, prelude_key, rimu.renderer.default)
         else:
-            if not os.path.isfile(infile):
-                die('source file does not exist: ' + infile)
-            try:
-                with open(infile) as f:
-                    source = f.read()
-            except:
-                die('source file permission denied: ' + infile)
-            if infile in prepend_files:
-                # Prepended and ~/.rimurc files are trusted.
-                options.safeMode = 0
-            ext = os.path.splitext(infile)[1]
-        # Skip .html and pass-through inputs.
-        if not (ext == '.html' or (pass_through and infile == STDIN)):
-            def callback(message: rimu.CallbackMessage) -> None:
-                nonlocal errors
-                msg = f'{message.type}: {"/dev/stdin" if infile == STDIN else infile}: {message.text}'
-                if len(msg) > 120:
-                    msg = msg[: 117] + '...'
-                sys.stderr.write(msg + '\n')
-                if message.type == 'error':
-                    errors += 1
-            options.callback = callback
-            source = rimu.render(source, options)
-        source = source.strip()
-        if source:
-            output += source + '\n'
-    output = output.strip()
+            # Server workers keep preludes in memory.
+            prelude = preludecache.recall(prelude_key, rimu.renderer.default)
     if len(outfile) == 0 or outfile == '-':
-        sys.stdout.write(output)
+        output = OutputWriter(sys.stdout)
     else:
-        with open(outfile, 'w') as f:
-            f.write(output)
+        output = OutputWriter(open(outfile, 'w'))
+    try:
+        for i, infile in enumerate(files):
+            is_prelude = i < len(prepend_files)
+            if is_prelude and prelude is not None:
+                output.begin()
+                output.write(prelude[i])
+                continue
+            source: Union[str, TextIO] = ''
+            options.safeMode = safe_mode
+            ext = ''
+            is_layout = infile.startswith(RESOURCE_TAG)
+            if is_layout:
+                infile = infile[len(RESOURCE_TAG):]
+                source = readResource(infile)
+                options.safeMode = 0  # Resources are trusted.
+            elif infile == STDIN:
+                source = sys.stdin
+            elif infile == PREPEND_TAG:
+                source = prepend
+                options.safeMode = 0  # --prepend options are trusted.
+            else:
+                try:
+                    source = open(infile)
+                except:
+                    die('source file permission denied: ' + infile)
+                if infile in prepend_files:
+                    # Prepended and ~/.rimurc files are trusted.
+                    options.safeMode = 0
+                ext = os.path.splitext(infile)[1]
+            output.begin()
+            # Skip .html and pass-through inputs.
+            if ext == '.html' or (pass_through and infile == STDIN):
+                html = source if isinstance(source, str) else source.read()
+                output.write(html)
+                if is_prelude:
+                    prelude_html.append(html)
+            else:
+                def callback(message: rimu.CallbackMessage) -> None:
+                    nonlocal errors, messages
+                    messages += 1
+                    msg = f'{message.type}: {"/dev/stdin" if infile == STDIN else infile}: {message.text}'
+                    if len(msg) > 120:
+                        msg = msg[: 117] + '...'
+                    sys.stderr.write(msg + '\n')
+                    if message.type == 'error':
+                        errors += 1
+                options.callback = callback
+                if is_prelude and prelude_key:
+                    html = rimu.render(source if isinstance(source, str) else source.read(), options)
+                    output.write(html)
+                    prelude_html.append(html)
+                elif is_layout:
+                    assert isinstance(source, str)
+                    output.write(layoutcache.render(rimu.renderer.default, infile, source, options))
+                elif cache is not None:
+                    output.write(rimu.render(source if isinstance(source, str) else source.read(), options, cache))
+                else:
+                    for chunk in rimu.render_iter(source, options):
+                        output.write(chunk)
+            if not isinstance(source, str) and source is not sys.stdin:
+                source.close()
+            if is_prelude and prelude_key and i == len(prepend_files) - 1 and messages == 0:
+                # Prelude sources that report messages are not cached (so the messages are reported every time).
+                if cache_dir:
+                    preludecache.save(cache_dir, prelude_key, rimu.renderer.default, prelude_html)
+                else:
+                    preludecache.remember(prelude_key, rimu.renderer.default, prelude_html)
+    finally:
+        output.close()
     if errors > 0:
         die()
+
+
+class Batch:
+    '''Batch mode converter. The prologue (prepended sources and layout header)
+       is rendered once and the resulting renderer state and HTML are reused for
+       each converted file, so each file is converted as if by a separate rimuc
+       command.'''
+    errors: int  # Number of prologue errors.
+
+    def __init__(self, prologue: List[Tuple[str, str]], epilogue: List[Tuple[str, str]],
+                 safe_mode: Optional[int], html_replacement: Optional[str], cache_dir: str, report: bool):
+        self.epilogue = epilogue
+        self.safe_mode = safe_mode
+        self.html_replacement = html_replacement
+        self.errors = 0
+        self.messages = 0
+        self.cache = rimu.RenderCache(directory=cache_dir) if cache_dir else None
+        self.layouts = layouts.LayoutCache(cache_dir or None)
+        self.renderer = rimu.Renderer()
+        key = preludecache.key(prologue, VERSION, html_replacement, 'batch') if cache_dir and prologue else ''
+        chunks = preludecache.load(cache_dir, key, self.renderer) if key else None
+        if chunks is not None:
+            self.chunks = chunks
+        else:
+            # Prologue sources are trusted. Prologue messages are only reported once.
+            # The last prologue source is the layout header if there is a layout footer.
+            self.chunks = [self.render(self.renderer, name, source, 0, report,
+                                       layout=bool(epilogue) and i == len(prologue) - 1)
+                           for i, (name, source) in enumerate(prologue)]
+            if key and self.messages == 0:
+                preludecache.save(cache_dir, key, self.renderer, self.chunks)
+
+    def render(self, renderer: rimu.Renderer, infile: str, source: Union[str, TextIO],
+               safe_mode: Optional[int], report: bool = True, layout: bool = False) -> str:
+        '''Render source (or a `layout` header or footer) to HTML, report and count error messages.'''
+        def callback(message: rimu.CallbackMessage) -> None:
+            self.messages += 1
+            if not report:
+                return
+            msg = f'{message.type}: {infile}: {message.text}'
+            if len(msg) > 120:
+                msg = msg[: 117] + '...'
+            sys.stderr.write(msg + '\n')
+            if message.type == 'error':
+                self.errors += 1
+        options = rimu.RenderOptions(safeMode=safe_mode, htmlReplacement=self.html_replacement,
+                                     callback=callback)
+        if layout:
+            return self.layouts.render(renderer, infile, source if isinstance(source, str) else source.read(), options)
+        return renderer.render(source if isinstance(source, str) else source.read(), options, self.cache)
+
+    def convert(self, infile: str, outfile: str) -> int:
+        '''Convert source file to HTML output file, return the number of errors.'''
+        self.errors = 0
+        renderer = self.renderer.copy()
+        output = OutputWriter(open(outfile, 'w'))
+        try:
+            for chunk in self.chunks:
+                output.begin()
+                output.write(chunk)
+            output.begin()
+            with open(infile) as source:
+                if os.path.splitext(infile)[1] == '.html':
+                    output.write(source.read())
+                else:
+                    output.write(self.render(renderer, infile, source, self.safe_mode))
+            for name, text in self.epilogue:
+                output.begin()
+                output.write(self.render(renderer, name, text, 0, layout=True))
+        finally:
+            output.close()
+        return self.errors
+
+
+_worker: Optional[Batch] = None  # Batch converter of the worker process.
+
+
+def initWorker(prologue: List[Tuple[str, str]], epilogue: List[Tuple[str, str]],
+               safe_mode: Optional[int], html_replacement: Optional[str], cache_dir: str) -> None:
+    '''Process pool worker initializer.'''
+    global _worker
+    _worker = Batch(prologue, epilogue, safe_mode, html_replacement, cache_dir, report=False)
+
+
+def convertFile(infile: str, outfile: str) -> int:
+    '''Process pool worker task: convert source file to HTML output file.'''
+    assert _worker is not None
+    return _worker.convert(infile, outfile)
+
+
+class OutputWriter:
+    '''Writes the HTML output as it is rendered. The output of each source
+       file is stripped of leading and trailing white space and separated
+       from the preceding output by a newline.'''
+
+    def __init__(self, f: TextIO):
+        self.f = f
+        self.empty = True  # True if nothing has been written.
+        self.started = False  # True if the current source output has started.
+        self.pending = ''  # Trailing white space from the current source output.
+
+    def begin(self) -> None:
+        '''Start the next source output.'''
+        self.started = False
+        self.pending = ''
+
+    def write(self, text: str) -> None:
+        if not self.started:
+            text = text.lstrip()
+            if not text:
+                return
+            if not self.empty:
+                self.f.write('\n')
+            self.started = True
+            self.empty = False
+        text = self.pending + text
+        stripped = text.rstrip()
+        self.f.write(stripped)
+        self.pending = text[len(stripped):]
+
+    def close(self) -> None:
+        if self.f is sys.stdout:
+            self.f.flush()
+        else:
+            self.f.close()
@@ -0,0 +1,117 @@
+'''
+ rimuc server (`rimuc --server SOCKET`).
+
+ The server listens on a Unix domain socket for rimuc command-lines sent by
+ clients (see `rimuc.client`) and executes them in a pool of warm worker
+ processes, so a request does not pay interpreter start up and import costs.
+ Each request is executed as if by a separate rimuc command in the client's
+ working directory: the response contains the output, messages and exit
+ status. Workers keep the renderer state following each prelude (.rimurc and
+ prepended sources) in memory so repeated requests do not render it again.
+'''
+
+import contextlib
+import io
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+
+import rimu
+from rimuc import client, rimuc
+
+# Options that cannot be used in server requests.
+ILLEGAL_OPTIONS = ['--server', '--client']
+
+
+def execute(args: List[str], cwd: str, stdin: str) -> Dict[str, Any]:
+    '''Worker process task: execute a rimuc command-line and return the response.'''
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    status = 0
+    saved = (sys.argv, sys.stdin, os.getcwd())
+    try:
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            for option in ILLEGAL_OPTIONS:
+                if option in args:
+                    rimuc.die(f'{option} option cannot be used in server requests')
+            os.chdir(cwd)
+            sys.argv = ['rimuc'] + args
+            sys.stdin = io.StringIO(stdin)
+            rimu.render('', rimu.RenderOptions(reset=True))  # Discard the previous request's state.
+            rimuc.main()
+    except SystemExit as e:
+        status = e.code if isinstance(e.code, int) else 1
+        if isinstance(e.code, str):
+            stderr.write(e.code + '\n')
+    except Exception as e:
+        status = 1
+        stderr.write(f'error: {e}\n')
+    finally:
+        sys.argv, sys.stdin = saved[0], saved[1]
+        os.chdir(saved[2])
+    return {'status': status, 'stdout': stdout.getvalue(), 'stderr': stderr.getvalue()}
+
+
+def initWorker() -> None:
+    '''Process pool worker initializer.'''
+    rimuc.serving = True
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # The server shuts the workers down.
+
+
+class Handler(socketserver.StreamRequestHandler):
+    '''Reads a request, executes it in a worker process and writes the response.'''
+    server: 'Server'
+
+    def handle(self) -> None:
+        try:
+            request = json.loads(self.rfile.read())
+            args = [str(arg) for arg in request['args']]
+            future = self.server.executor.submit(execute, args, str(request['cwd']), str(request.get('stdin', '')))
+            response = future.result()
+        except Exception as e:
+            response = {'status': 1, 'stdout': '', 'stderr': f'illegal request: {e}\n'}
+        self.wfile.write(json.dumps(response).encode())
+
+
+if hasattr(socket, 'AF_UNIX'):  # Unix domain sockets are not available on Windows.
+    class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        '''rimuc server listening on Unix domain socket `address`. Requests are
+           executed by a pool of `jobs` worker processes.'''
+        daemon_threads = True
+
+        def __init__(self, address: str, jobs: int = 1):
+            self.executor = ProcessPoolExecutor(max_workers=jobs, initializer=initWorker)
+            super().__init__(address, Handler)
+
+        def server_close(self) -> None:
+            super().server_close()
+            self.executor.shutdown()
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self.server_address)  # type: ignore
+
+
+def serve(address: str, jobs: int) -> None:
+    '''Serve requests until the server process is interrupted or terminated.'''
+    if not hasattr(socket, 'AF_UNIX'):
+        rimuc.die('--server requires Unix domain sockets')
+    if os.path.exists(address):
+        try:
+            client.request(address, ['--version'])
+        except OSError:
+            os.unlink(address)  # Stale socket file.
+        else:
+            rimuc.die(f'server is already running: {address}')
+    server = Server(address, jobs)
+    # Terminate gracefully (delete the socket file) when sent SIGTERM.
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
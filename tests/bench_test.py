@@ -0,0 +1,43 @@
+import rimu
+from bench import corpus, micro, run
+
+
+def test_generate():
+    params = corpus.Parameters(listDepth=4, macroCount=20, blockDepth=3)
+    source = corpus.generate(20000, 7, params)
+    assert len(source) >= 20000
+    assert source == corpus.generate(20000, 7, params)
+    assert source != corpus.generate(20000, 8, params)
+    assert '      *** ' in source  # Fourth level list item.
+    assert '\n....\n' in source  # Nested division.
+    messages = []
+    rimu.render(source, rimu.RenderOptions(reset=True, callback=lambda message: messages.append(message.text)))
+    assert messages == []
+
+
+def test_run():
+    results = run.run(5000, 1, 1, rimuc=False)
+    result = results['results']['render/mixed']
+    assert result['bytes'] >= 5000 and result['mbPerSecond'] > 0 and result['peakMemory'] > 0
+    assert set(result['latency']) == {'p50', 'p90', 'p99', 'max'}
+    assert result['allocations']['Fragment allocations'] > 0 and result['allocations']['Expand bytes'] > 0
+    assert run.compare(results, results) == []
+    slower = {'results': {'render/mixed': dict(result, mbPerSecond=result['mbPerSecond'] / 2)}}
+    assert run.compare(slower, results)[0].startswith('render/mixed: throughput')
+    assert run.compare(slower, results, threshold=60) == []
+
+
+def test_benchImport():
+    result = run.benchImport(1)
+    assert result['seconds'] > 0 and result['modules'] > 0 and len(result['slowest']) == 5
+    results = {'results': {'import/rimuc': result}}
+    assert run.compare(results, results) == []
+    slower = {'results': {'import/rimuc': dict(result, seconds=result['seconds'] * 2)}}
+    assert run.compare(slower, results)[0].startswith('import/rimuc: time')
+    assert 'import/rimuc' in run.report(slower, results)
+
+
+def test_micro():
+    for name, benchmark in micro.BENCHMARKS.items():
+        result = benchmark(scale=1000)
+        assert result and all(seconds >= 0 for seconds in result.values()), name
@@ -29,5 +29,5 @@ def test_injectHtmlAttributes():
 def test_slugify():
     b.init()
     assert b.slugify('-Foo bar  ') == 'foo-bar'
-    b.ids.insert(0, 'foo-bar')
+    b.ids.add('foo-bar')
     assert b.slugify('Foo bar') == 'foo-bar-2'
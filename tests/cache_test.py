@@ -0,0 +1,78 @@
+import rimu
+from rimu import cache
+
+
+def test_RenderCache():
+    c = rimu.RenderCache()
+    r = rimu.Renderer()
+    assert r.render('Hello *World*', cache=c) == '<p>Hello <em>World</em></p>'
+    assert (c.hits, c.misses, len(c)) == (0, 1, 1)
+    assert r.render('Hello *World*', cache=c) == '<p>Hello <em>World</em></p>'
+    assert (c.hits, c.misses, len(c)) == (1, 1, 1)
+    # Renders in a different state are cached separately.
+    assert r.render('Hello *World*', rimu.RenderOptions(safeMode=1), cache=c) == '<p>Hello <em>World</em></p>'
+    assert (c.hits, c.misses, len(c)) == (1, 2, 2)
+    c.clear()
+    assert (c.hits, c.misses, c.bytes, len(c)) == (0, 0, 0, 0)
+
+
+def test_impure():
+    c = rimu.RenderCache()
+    r = rimu.Renderer()
+    # Renders that update the renderer state or report messages are not cached.
+    for source in ["{x}='1'", '.class', '{undefined}', '{undefined}']:
+        messages = []
+        r.render(source, rimu.RenderOptions(reset=True, callback=lambda message: messages.append(message)), cache=c)
+        assert len(c) == 0, source
+    assert len(messages) == 1  # Messages are reported every time.
+    # Macro values are part of the renderer state.
+    r.render('', rimu.RenderOptions(reset=True))
+    r.render("{x}='1'", cache=c)
+    assert r.render('{x}', cache=c) == '<p>1</p>'
+    r.render("{x}='2'", cache=c)
+    assert r.render('{x}', cache=c) == '<p>2</p>'
+    assert (c.hits, len(c)) == (0, 2)
+    r.render("{x}='1'", cache=c)
+    assert r.render('{x}', cache=c) == '<p>1</p>'
+    assert (c.hits, len(c)) == (1, 2)
+
+
+def test_limits():
+    c = rimu.RenderCache(maxEntries=2)
+    for source in ['one', 'two', 'three', 'one']:
+        rimu.render(source, rimu.RenderOptions(reset=True), c)
+    assert (c.hits, c.evictions, len(c)) == (0, 2, 2)
+    c = rimu.RenderCache(maxBytes=len('<p>one</p><p>two</p>'))
+    for source in ['one', 'two', 'three', 'x' * 100]:
+        rimu.render(source, rimu.RenderOptions(reset=True), c)
+    assert (c.evictions, len(c), c.bytes) == (2, 1, len('<p>three</p>'))
+
+
+def test_directory(tmp_path):
+    c1 = rimu.RenderCache(directory=str(tmp_path))
+    assert rimu.render('Hello', rimu.RenderOptions(reset=True), c1) == '<p>Hello</p>'
+    c1.close()
+    # On-disk entries persist across caches.
+    c2 = rimu.RenderCache(directory=str(tmp_path))
+    assert rimu.render('Hello', rimu.RenderOptions(reset=True), c2) == '<p>Hello</p>'
+    assert (c2.hits, c2.misses) == (1, 0)
+    assert (tmp_path / cache.DATABASE_NAME).is_file()
+    c2.clear()
+    c2.close()
+    c3 = rimu.RenderCache(directory=str(tmp_path))
+    rimu.render('Hello', rimu.RenderOptions(reset=True), c3)
+    assert (c3.hits, c3.misses) == (0, 1)
+    c3.close()
+
+
+def test_fingerprint():
+    r1 = rimu.Renderer()
+    r2 = rimu.Renderer(r1.snapshot())
+    r1.render('')
+    r2.render('')
+    assert cache.fingerprint(r1) == cache.fingerprint(r2)
+    assert cache.definitionsFingerprint(r2) is cache.definitionsFingerprint(r2)  # Memoized snapshot fingerprint.
+    r2.render("{x}='1'")
+    assert cache.fingerprint(r1) != cache.fingerprint(r2)
+    r1.render("{x}='1'")
+    assert cache.fingerprint(r1) == cache.fingerprint(r2)
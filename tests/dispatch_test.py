@@ -0,0 +1,45 @@
+import re
+
+from rimu import delimitedblocks, dispatch, lineblocks
+
+
+def test_firstChars():
+    first = dispatch.firstChars(re.compile(r'^\\?(#{1,6})\s+(.+?)$'))
+    assert first is not None
+    assert first.chars == {'\\', '#'}
+    first = dispatch.firstChars(re.compile(r'^\\?\s*(\d*\.)\s+(.*)$'))
+    assert first is not None
+    assert first.contains('1') and first.contains(' ') and first.contains('.')
+    assert not first.contains('x')
+    first = dispatch.firstChars(re.compile(r'^(<\/?([a-z]\w*))', re.IGNORECASE))
+    assert first is not None and first.chars == {'<'}
+    # Patterns that can match any line.
+    assert dispatch.firstChars(re.compile(r'(.*)')) is None  # Not anchored.
+    assert dispatch.firstChars(re.compile(r'^\s*$')) is None  # Matches blank lines.
+    assert dispatch.firstChars(re.compile(r'^[^x]')) is None  # Negated set.
+    assert dispatch.firstChars(re.compile(r'^a', re.IGNORECASE)) is None
+    assert dispatch.firstChars(re.compile(r'^a', re.MULTILINE)) is None
+
+
+def test_Table():
+    table = dispatch.Table((re.compile(r'^a'), re.compile(r'b'), re.compile(r'^\\?a'), re.compile(r'^c')))
+    assert table.next('abc', -1) == 0
+    assert table.next('abc', 0) == 1
+    assert table.next('abc', 1) == 2
+    assert table.next('abc', 2) == -1
+    assert table.next('\\abc', -1) == 1
+    assert table.next('', -1) == 1
+    assert table.next('c', 1) == 3
+    # Tables are cached by pattern.
+    patterns = tuple(d.openMatch for d in delimitedblocks.DEFAULT_DEFS)
+    assert dispatch.table(patterns) is dispatch.table(patterns)
+    # Every line block definition is a candidate for a line it matches.
+    for line in ['# x', '\\# x', "{m}='v'", '<<#x>>', '.x', "^='<b>|</b>'", "/x/='y'", '// x', '<image:x>']:
+        candidates = []
+        i = lineblocks.TABLE.next(line, -1)
+        while i != -1:
+            candidates.append(i)
+            i = lineblocks.TABLE.next(line, i)
+        for i, d in enumerate(lineblocks.defs):
+            if d.match.search(line):
+                assert i in candidates
@@ -1,4 +1,9 @@
+import copy
+
+from rimu import expansion
 from rimu.expansion import Expand
+from rimu.macros import Macro
+from rimu.spans import Fragment
 
 
 def test_expansionOptions():
@@ -15,3 +20,25 @@ def test_expansionOptions():
         macros=False,
         spans=True,
         specials=False)
+
+
+def test_constants():
+    assert expansion.MACROS == Expand(macros=True)
+    assert expansion.MACROS_SPANS == Expand(macros=True, spans=True)
+    try:
+        expansion.MACROS.spans = True
+        assert False, 'constants should be immutable'
+    except AttributeError:
+        pass
+    assert expansion.MACROS == Expand(macros=True)
+    opts = Expand.copyFrom(expansion.MACROS)
+    opts.spans = True
+    assert opts == expansion.MACROS_SPANS
+    assert copy.copy(expansion.MACROS) == expansion.MACROS
+
+
+def test_slots():
+    assert not hasattr(Expand(), '__dict__')
+    assert not hasattr(expansion.EMPTY, '__dict__')
+    assert not hasattr(Fragment('text', False), '__dict__')
+    assert not hasattr(Macro('name'), '__dict__')
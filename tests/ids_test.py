@@ -0,0 +1,29 @@
+from rimu.ids import Ids
+
+
+def test_ids():
+    ids = Ids(['foo', 'bar'])
+    assert 'foo' in ids and 'baz' not in ids
+    ids.add('baz')
+    assert list(ids) == ['foo', 'bar', 'baz']
+    assert ids == Ids(['baz', 'bar', 'foo'])
+    copy = ids.copy()
+    copy.add('qux')
+    assert len(copy) == 4 and len(ids) == 3
+    ids.clear()
+    assert len(ids) == 0
+
+
+def test_unique():
+    ids = Ids(['foo', 'foo-2', 'foo-4'])
+    assert ids.unique('foo') == 'foo-3'
+    assert ids.unique('foo') == 'foo-3'  # Suffixes are not allocated until the id is added.
+    ids.add('foo-3')
+    assert ids.unique('foo') == 'foo-5'
+    ids.clear()
+    ids.add('foo')
+    assert ids.unique('foo') == 'foo-2'
+    # Repeated titles.
+    for _ in range(2, 1002):
+        ids.add(ids.unique('foo'))
+    assert list(ids)[-1] == 'foo-1001'
@@ -0,0 +1,53 @@
+import random
+
+import rimu
+
+LINES = ['', '', 'Paragraph *text*.', '# Header', "{x}='1'", "{x}='2'", '{x}', '.note', '- Item', '  * Item',
+         'term:: definition', '``', '..', '<div>', '// Comment', "{--header-ids}='true'", "/foo/='bar'", 'foo',
+         "{m}='a\nb'", '{m}', '> Quote']
+
+
+def test_render():
+    preview = rimu.IncrementalRenderer()
+    source = '# Title\n\nParagraph one.\n\nParagraph two.\n\nParagraph three.'
+    assert preview.render(source) == rimu.Renderer().render(source)
+    assert (preview.rendered, preview.reused) == (4, 0)
+    # Only the edited block (and the preceding block, which read the edited line) is rendered.
+    source = source.replace('two', '2')
+    assert preview.render(source) == rimu.Renderer().render(source)
+    assert (preview.rendered, preview.reused) == (2, 2)
+    # Rendering continues until the renderer state converges.
+    source = "{x}='1'\n\n{x}\n\n{x}"
+    preview.render(source)
+    assert preview.render(source.replace('1', '2')) == '<p>2</p>\n<p>2</p>'
+    assert (preview.rendered, preview.reused) == (5, 0)  # Macro invocation lines are blocks.
+
+
+def test_edits():
+    # Incremental renders are identical to full renders.
+    rng = random.Random(1)
+    for _ in range(100):
+        lines = [rng.choice(LINES) for _ in range(rng.randint(0, 30))]
+        preview = rimu.IncrementalRenderer(rimu.RenderOptions(reset=True))
+        for _ in range(5):
+            source = '\n'.join(lines)
+            assert preview.render(source) == rimu.Renderer().render(source, rimu.RenderOptions(reset=True)), source
+            i = rng.randint(0, len(lines))
+            if rng.random() < 0.5:
+                lines.insert(i, rng.choice(LINES))
+            elif lines:
+                lines[min(i, len(lines) - 1)] = rng.choice(LINES)
+
+
+def test_ids():
+    # Block states share the id log.
+    preview = rimu.IncrementalRenderer(rimu.RenderOptions(reset=True))
+    source = "{--header-ids}='true'\n\n# A\n\n# A\n\n.reset='true'\n\n{--header-ids}='true'\n\n# A\n\n# B"
+    assert preview.render(source) == rimu.Renderer().render(source, rimu.RenderOptions(reset=True))
+    states = [b.state for b in preview.blocks]
+    assert [s.count for s in states] == [0, 1, 2, 0, 0, 1, 2]
+    assert states[1].log is states[2].log and states[4].log is states[6].log
+    assert states[6].log == ['a', 'b']
+    for edit in ['# B', '# C', '# A']:
+        source = source[:source.rindex('#')] + edit
+        assert preview.render(source) == rimu.Renderer().render(source, rimu.RenderOptions(reset=True))
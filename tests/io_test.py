@@ -1,18 +1,20 @@
+import mmap
 import re
+from io import StringIO
 
 from rimu import io
 
 
 def test_Reader():
+    assert len(list(io.splitLines(''))) == 1
     reader = io.Reader('')
     assert reader.eof() == False
-    assert len(reader.lines) == 1
     assert reader.cursor == ''
     reader.next()
     assert reader.eof() == True
 
+    assert len(list(io.splitLines('Hello\nWorld!'))) == 2
     reader = io.Reader('Hello\nWorld!')
-    assert len(reader.lines) == 2
     assert reader.cursor == 'Hello'
     reader.next()
     assert reader.cursor == 'World!'
@@ -20,16 +22,16 @@ def test_Reader():
     reader.next()
     assert reader.eof() == True
 
+    assert len(list(io.splitLines('\n\nHello'))) == 3
     reader = io.Reader('\n\nHello')
-    assert len(reader.lines) == 3
     reader.skipBlankLines()
     assert reader.cursor == 'Hello'
     assert reader.eof() == False
     reader.next()
     assert reader.eof() == True
 
+    assert len(list(io.splitLines('Hello\n*\nWorld!\nHello\n< Goodbye >'))) == 5
     reader = io.Reader('Hello\n*\nWorld!\nHello\n< Goodbye >')
-    assert len(reader.lines) == 5
     lines = reader.readTo(re.compile(r'\*'))
     assert len(lines) == 1
     assert lines[0] == 'Hello'
@@ -42,8 +44,8 @@ def test_Reader():
     reader.next()
     assert reader.eof() == True
 
+    assert len(list(io.splitLines('\n\nHello\nWorld!'))) == 4
     reader = io.Reader('\n\nHello\nWorld!')
-    assert len(reader.lines) == 4
     reader.skipBlankLines()
     lines = reader.readTo(re.compile(r'^$'))
     assert len(lines) == 2
@@ -58,3 +60,43 @@ def test_Writer():
     writer.write('World!')
     assert writer.buffer[1] == 'World!'
     assert writer.toString() == 'HelloWorld!'
+
+
+def test_ReaderStream():
+    text = 'Hello\r\n\r\nWorld!\r\rGoodbye\n'
+    reader = io.Reader(StringIO(text, newline=''))
+    lines = []
+    while not reader.eof():
+        lines.append(reader.cursor)
+        reader.next()
+    assert lines == list(io.splitLines(text))
+    assert lines == ['Hello', '', 'World!', '', 'Goodbye', '']
+
+
+def test_ReaderMmap(tmp_path):
+    path = tmp_path / 'test.rmu'
+    path.write_bytes('Hello\r\nWörld!\n\u0000'.encode())
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        reader = io.Reader(m)
+        lines = []
+        while not reader.eof():
+            lines.append(reader.cursor)
+            reader.next()
+    assert lines == ['Hello', 'Wörld!', ' ']
+
+
+def test_ReaderInsert():
+    reader = io.Reader('Hello\nWorld!')
+    reader.insert(['foo', 'bar'])
+    assert reader.cursor == 'Hello'
+    reader.next()
+    assert reader.cursor == 'foo'
+    reader.insert(['baz'])
+    reader.next()
+    assert reader.cursor == 'baz'
+    reader.next()
+    assert reader.cursor == 'bar'
+    reader.next()
+    assert reader.cursor == 'World!'
+    reader.next()
+    assert reader.eof()
@@ -0,0 +1,96 @@
+import json
+import random
+
+import pytest
+
+import rimu
+from rimu import cache, ir
+
+from tests.incremental_test import LINES
+
+HTML_LINES = LINES + ['Inline <b>HTML</b> &amp; *quote*', '<span class="x">', '`<code>`', '<!-- Comment -->',
+                      '.-macros', '.+specials', '<image:x.png|<b>>', 'Term:: <i>definition</i>', '<div>{x}</div>']
+
+
+def parse(source, **options):
+    '''Parse the source, check the HTML, messages and renderer state are the
+       same as a render and return the IR.'''
+    r, messages = rimu.Renderer(), []
+    html = r.render(source, rimu.RenderOptions(callback=messages.append, **options))
+    p, parseMessages = rimu.Renderer(), []
+    tree = ir.parse(p, source, rimu.RenderOptions(callback=parseMessages.append, **options))
+    tree = json.loads(json.dumps(tree))
+    assert ir.render(tree) == html, source
+    assert [(m.type, m.text) for m in parseMessages] == [(m.type, m.text) for m in messages]
+    assert cache.fingerprint(p) == cache.fingerprint(r)
+    return tree
+
+
+def test_parse():
+    tree = parse('# Title *a*\n\n<div>\nHTML\n</div>\n\nInline <b>HTML</b>.', safeMode=1)
+    assert tree['blocks'] == [
+        ['block', 'header', 1, '<h1>Title ', ['quote', '*', '<em>a</em>'], '</h1>'],
+        ['block', 'html', 1, ['html', '<div>\nHTML\n</div>']],
+        ['block', 'paragraph', 0, '<p>Inline ', ['replacement', ['html', '<b>']], 'HTML',
+         ['replacement', ['html', '</b>']], '.</p>'],
+    ]
+    assert ir.render(tree, safeMode=3) == \
+        '<h1>Title <em>a</em></h1>\n&lt;div&gt;\nHTML\n&lt;/div&gt;\n<p>Inline &lt;b&gt;HTML&lt;/b&gt;.</p>'
+    assert ir.render(tree, safeMode=2, htmlReplacement='X') == '<h1>Title <em>a</em></h1>\nX\n<p>Inline XHTMLX.</p>'
+
+
+def test_render():
+    # IRs render the same HTML as renders with any safeMode.
+    rng = random.Random(1)
+    for _ in range(50):
+        source = '\n'.join(rng.choice(HTML_LINES) for _ in range(rng.randint(0, 30)))
+        tree = parse(source, safeMode=rng.choice((0, 1, 2, 5, 9)))
+        for s in range(16):
+            for htmlReplacement in ('<mark>replaced HTML</mark>', 'X'):
+                try:
+                    html = ir.render(tree, s, htmlReplacement)
+                except ValueError:
+                    assert s & 0x3 == 2 and htmlReplacement == 'X', source
+                    continue
+                assert html == rimu.Renderer().render(
+                    source, rimu.RenderOptions(safeMode=s, htmlReplacement=htmlReplacement)), source
+
+
+def test_safe_mode():
+    # Block Attributes are injected into the filtered HTML.
+    tree = parse('.note\n<div>HTML</div>', safeMode=2)
+    assert [node[:2] for node in tree['blocks']] == [['safeMode', [0]], ['safeMode', [1]], ['safeMode', [5, 13]], ['safeMode', [9]]]
+    assert ir.render(tree) == '<mark class="note">replaced HTML</mark>'
+    assert ir.render(tree, safeMode=0) == '<div class="note">HTML</div>'
+    assert ir.render(tree, safeMode=3) == '&lt;div&gt;HTML&lt;/div&gt;'
+    assert ir.render(tree, safeMode=6, htmlReplacement='X') == 'X'  # Block Attributes are skipped.
+    with pytest.raises(ValueError):
+        ir.render(tree, safeMode=2, htmlReplacement='X')
+    # Macro definitions.
+    tree = parse("{x}='X'\n{x}")
+    assert ir.render(tree) == '<p>X</p>'
+    assert ir.render(tree, safeMode=1) == '<p>{x}</p>'  # Macro definitions are skipped.
+    assert ir.render(tree, safeMode=9) == '<p>X</p>'
+
+
+def test_compatibility():
+    tree = parse('Inline <b>HTML</b>.')
+    assert ir.render(tree, safeMode=1) == '<p>Inline HTML.</p>'
+    assert ir.render(tree, safeMode=3) == '<p>Inline &lt;b&gt;HTML&lt;/b&gt;.</p>'
+    for safeMode in (-1, 16):
+        with pytest.raises(ValueError):
+            ir.render(tree, safeMode=safeMode)
+    with pytest.raises(ValueError):
+        ir.render({'format': 0})
+    # Replaced HTML block macros are not expanded.
+    tree = parse('<div>HTML</div>', safeMode=1)
+    with pytest.raises(ValueError):
+        ir.render(tree, safeMode=2, htmlReplacement='{x}')
+
+
+def test_parse_api():
+    source = "{x}='<b>X</b>'\n\n{x}"
+    tree = rimu.parse(source, rimu.RenderOptions(reset=True, safeMode=9))  # Macro definitions are allowed.
+    assert rimu.render_ir(tree) == '<p>X</p>'
+    assert rimu.render_ir(tree, safeMode=11) == '<p>&lt;b&gt;X&lt;/b&gt;</p>'
+    rimu.render('', rimu.RenderOptions(reset=True))
@@ -0,0 +1,85 @@
+import json
+
+import rimu
+from rimu import delimitedblocks, document, io, linekinds, lineblocks, lists
+
+from bench import micro
+
+LINES = [
+    '', '  ', 'Paragraph text.', '# Header', '\\# Escaped header', '== Header ==', '// Comment', '/*', '*/',
+    '- Item', '  * Item', '1. Item', '.. Item', 'Term:: Definition', '\\- Escaped item', '..', '.. division',
+    '"""', '>>', '``', '-- code', '<div>', '<!-- comment -->', '<span>', '  Indented', '> Quote paragraph',
+    '.class #id', ".safeMode='1'", "{macro}='value'", "{macro}='", '{macro}', '{macro} text', "^='<sup>|</sup>'",
+    "/foo/='bar'", "|code|='<pre>|</pre>'", '<image:x.png>', '<image:x.png|alt>', '<<#anchor>>', 'ÄÖÜ',
+]
+
+
+def classifier() -> linekinds.Classifier:
+    with rimu.Renderer().activate():
+        document.init()
+        return document.lineClassifier()
+
+
+def test_classify():
+    kinds = classifier().classify('\n'.join(LINES))
+    assert len(kinds) == len(LINES)
+    assert kinds[LINES.index('')] == linekinds.BLANK
+    assert kinds[LINES.index('Paragraph text.')] == linekinds.OTHER
+    assert kinds[LINES.index('# Header')] == linekinds.HEADER
+    assert kinds[LINES.index('// Comment')] & linekinds.COMMENT
+    assert kinds[LINES.index('- Item')] & linekinds.LIST_ITEM
+    assert kinds[LINES.index('Term:: Definition')] & linekinds.LIST_ITEM
+    assert kinds[LINES.index('``')] & linekinds.DELIMITER
+    assert kinds[LINES.index('.class #id')] & linekinds.ATTRIBUTES
+    assert kinds[LINES.index('{macro}')] & linekinds.MACRO
+    assert kinds[LINES.index("/foo/='bar'")] & linekinds.LINE_BLOCK
+    # Lines are never missing the kind of a matching definition.
+    definitions = [(d.match, d.kind) for d in lineblocks.defs] + \
+        [(d.match, linekinds.LIST_ITEM) for d in lists.defs] + \
+        [(d.openMatch, d.kind) for d in delimitedblocks.DEFAULT_DEFS]
+    for line, kind in zip(LINES, kinds):
+        for pattern, k in definitions:
+            if pattern.search(line):
+                assert kind & k == k, (line, k)
+
+
+def test_Reader():
+    reader = io.Reader('# Header\n\n{macro}\nText', classifier())
+    assert reader.kind == linekinds.HEADER
+    reader.next()
+    assert reader.kind == linekinds.BLANK
+    reader.next()
+    assert reader.kind & linekinds.MACRO
+    reader.insert(['Inserted'])
+    reader.cursor = 'Updated'
+    assert reader.kind == linekinds.UNKNOWN
+    reader.next()
+    assert reader.cursor == 'Inserted' and reader.kind == linekinds.UNKNOWN
+    reader.next()
+    assert reader.cursor == 'Text' and reader.kind == linekinds.OTHER
+    reader.next()
+    assert reader.eof()
+    assert io.Reader('Text').kind == linekinds.UNKNOWN
+
+
+def test_classifyLines():
+    with open('./tests/rimu-tests.json') as f:
+        specs = [spec for spec in json.load(f) if 'py' not in spec.get('unsupported', '')]
+    for spec in specs:
+        results = []
+        for classifyLines in [False, True]:
+            messages = []
+            opts = rimu.RenderOptions(safeMode=spec['options'].get('safeMode'),
+                                      htmlReplacement=spec['options'].get('htmlReplacement'),
+                                      reset=True, callback=lambda message: messages.append(message.text),
+                                      classifyLines=classifyLines)
+            results.append((rimu.render(spec['input'], opts), messages))
+        assert results[0] == results[1], spec['description']
+
+
+def test_referenceManual():
+    # The line classification pass does not change the rendered HTML.
+    source = micro.referenceManual(20)
+    outputs = [rimu.Renderer().render(source, rimu.RenderOptions(classifyLines=classifyLines))
+               for classifyLines in [False, True]]
+    assert outputs[0] == outputs[1]
@@ -1,14 +1,19 @@
-# from rimu import macros, options
-from rimu import options
-from rimu.macros import defs, init, getValue, setValue, render
+import json
+from unittest.mock import patch
+
+import rimu
+from rimu import macros, options
+from rimu.macros import init, getValue, setValue, render
+
+from bench import micro
 
 
 def test_parse():
     init()
     options.init()
-    assert len(defs) == 2
+    assert len(macros.defs) == 2
     setValue('x', '1')
-    assert len(defs) == 3
+    assert len(macros.defs) == 3
     assert getValue('x') == '1'
     assert getValue('y') is None
     assert render(r'\{x} = {x}') == '{x} = 1'
@@ -18,3 +23,43 @@ def test_parse():
     assert getValue('x') == '1'
     setValue('y', r'$1 $2')
     assert render(r'{y|foo|bar}') == 'foo bar'
+
+
+def test_setValues():
+    init()
+    options.init()
+    setValue('x', '1')
+    macros.setValues({'y': '2', 'x?': '3', 'z': '{y}'})
+    assert list(macros.defs) == ['--', '--header-ids', 'x', 'y', 'z']
+    assert getValue('x') == '1'
+    assert render('{x} {y} {z}') == '1 2 {y}'
+
+
+def test_patternCache():
+    init()
+    options.init()
+    macros.compilePattern.cache_clear()
+    setValue('x', 'foo')
+    assert render('{x=fo+} bar\n{x!fo+} baz\n{x=fo+} qux') == ' bar\n qux'
+    info = macros.compilePattern.cache_info()
+    assert (info.hits, info.misses, info.maxsize) == (2, 1, macros.PATTERN_CACHE_SIZE)
+    messages = []
+    options.callback = messages.append
+    assert render('{x=fo(} bar') == '{x=fo(} bar'
+    assert len(messages) == 1
+
+
+def test_singlePass():
+    # Single pass macro expansion renders the same HTML as the two pass reference implementation.
+    with open('./tests/rimu-tests.json') as f:
+        specs = [spec for spec in json.load(f) if 'py' not in spec.get('unsupported', '')]
+    sources = [(spec['input'], spec['options']) for spec in specs] + [(micro.MACROS_DOCUMENT, {})]
+    for source, opts in sources:
+        outputs = []
+        for implementation in [micro.twoPassRender, macros.render]:
+            r = rimu.Renderer()
+            renderOptions = rimu.RenderOptions(safeMode=opts.get('safeMode'), htmlReplacement=opts.get('htmlReplacement'),
+                                               callback=lambda _: None)
+            with patch.object(macros, 'render', implementation):
+                outputs.append(r.render(source, renderOptions))
+        assert outputs[0] == outputs[1], source
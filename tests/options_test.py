@@ -58,9 +58,14 @@ def test_setOption():
     options.setOption('safeMode', '1')
     options.setOption('reset', 'ILLEGAL')
     assert options.safeMode == 1
+    options.setOption('replacementsEngine', 'ILLEGAL')
+    assert options.replacementsEngine == 'sequential'
+    options.setOption('replacementsEngine', 'single-pass')
+    assert options.replacementsEngine == 'single-pass'
     # Reset clears options.
     options.setOption('reset', 'true')
     assert options.safeMode == 0
+    assert options.replacementsEngine == 'sequential'
 
 
 def test_htmlSafeModeFilter():
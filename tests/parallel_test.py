@@ -0,0 +1,63 @@
+import random
+
+import rimu
+from rimu import cache, parallel, state
+
+from tests.incremental_test import LINES
+
+
+def render(source, jobs=2, chunkLines=2, **options):
+    '''Render the source sequentially and in parallel, check the HTML, messages
+       and renderer states are the same and return the HTML.'''
+    sequential, messages = rimu.Renderer(), []
+    html = sequential.render(source, rimu.RenderOptions(callback=messages.append, **options))
+    r, parallelMessages = rimu.Renderer(), []
+    assert parallel.render(r, source, rimu.RenderOptions(callback=parallelMessages.append, **options),
+                           jobs, chunkLines) == html, source
+    assert [(m.type, m.text) for m in parallelMessages] == [(m.type, m.text) for m in messages]
+    assert cache.fingerprint(r) == cache.fingerprint(sequential)
+    return html
+
+
+def test_render():
+    source = "{--header-ids}='true'\n\n" + '\n\n'.join([
+        '# Title', "{x}='1'", 'Paragraph {x}.', '.note', '- Item', "{x}='2'", '{undefined}',
+        "|code|='<pre class=\"code\">|</pre>'", '``\ncode\n``', '# Title'] * 3)
+    html = render(source)
+    assert '<h1 id="title-6">Title</h1>' in html
+    assert '<pre class="code">code</pre>' in html
+    # Source lines.
+    rng = random.Random(1)
+    for _ in range(20):
+        source = '\n'.join(rng.choice(LINES) for _ in range(rng.randint(0, 40)))
+        render(source, reset=True)
+        render(source, reset=True, classifyLines=True)
+
+
+def test_scan():
+    source = '\n\n'.join(f'Paragraph {i}.' for i in range(10))
+    r = rimu.Renderer()
+    r.render('')
+    start = parallel.Boundary(0, 0, state.dump(r), cache.fingerprint(r), False)
+    boundaries = parallel.scan(source, start, False, 5)
+    # Chunks start at top-level blocks.
+    assert [b.start for b in boundaries] == [6, 12, 18, 19]
+    assert [b.extent for b in boundaries] == [7, 13, 19, 19]
+    chunk = parallel.renderChunk('\n'.join(source.split('\n')[:7]), start, 6, False)
+    assert chunk.html == '<p>Paragraph 0.</p>\n<p>Paragraph 1.</p>\n<p>Paragraph 2.</p>\n'
+    assert chunk.ended and chunk.fingerprint == boundaries[0].fingerprint
+    # The scan's inline renderer is only used by the scan's renderer.
+    assert r.inlineRenderer is None and rimu.Renderer().render('# *a*') == '<h1><em>a</em></h1>'
+
+
+def test_reconcile():
+    # The scan does not render inline text: here it finds an explicit id in the raw
+    # header text and does not allocate the header id.
+    source = "{--header-ids}='true'\n\n" + '\n\n'.join(['# Title', '# *a* id="x"', '# Title'] * 3)
+    assert render(source).count('id="title') == 6
+
+
+def test_render_parallel():
+    source = '\n\n'.join(['# Title', 'Paragraph.'] * 3)
+    # Small documents are rendered sequentially.
+    assert rimu.render_parallel(source, rimu.RenderOptions(reset=True), jobs=2) == rimu.render(source)
@@ -0,0 +1,62 @@
+import rimu
+from rimu import lineblocks, profiler, spans
+
+SOURCE = """{m}='*macro*'
+
+# Header
+
+- Item {m}
+- Item
+
+``
+code
+``
+
+.note
+Paragraph _text_ <https://example.com|link>.
+"""
+
+
+def test_Profiler():
+    p = rimu.Profiler()
+    opts = rimu.RenderOptions(reset=True, profiler=p)
+    assert rimu.render(SOURCE, opts) == rimu.render(SOURCE, rimu.RenderOptions(reset=True))
+    assert set(p.phases) == {'render'} | set(profiler.PHASES)
+    assert p.phases['render'].calls == 1
+    assert p.phases['lists'].calls > 1  # Including unmatched calls.
+    assert [stats.calls for stats in p.definitions['lists'].values()] == [1]
+    assert p.phases['spans.fragQuotes'].calls > 0
+    # The render time includes the phase times.
+    assert p.phases['render'].time >= p.phases['lists'].time > 0
+    assert p.phases['render'].time >= sum(stats.selfTime for stats in p.phases.values())
+    # Per definition statistics.
+    assert p.definitions['delimitedblocks']['code'].calls == 1
+    assert p.definitions['delimitedblocks']['paragraph'].calls == 1
+    assert p.definitions['macros.render']['m'].calls == 1
+    assert len(p.definitions['lineblocks']) == 3  # Macro definition, header and Block Attributes.
+    assert p.definitions['spans.fragReplacements']
+    assert 'paragraph' in p.report()
+    p.reset()
+    assert p.phases == {}
+
+
+def test_disabled():
+    original = lineblocks.render
+    p = rimu.Profiler()
+    rimu.render('Text', rimu.RenderOptions(profiler=p))
+    calls = p.phases['render'].calls
+    # The timing wrappers are removed after profiled renders.
+    assert lineblocks.render is original and not profiler._originals
+    assert not hasattr(spans.fragQuotes, '__wrapped__')
+    rimu.render('Text')
+    assert p.phases['render'].calls == calls  # Renders are only profiled if a profiler is specified.
+    chunks = list(rimu.render_iter('One\n\nTwo', rimu.RenderOptions(profiler=p)))
+    assert len(chunks) == 2
+    assert p.phases['render'].calls == calls + 3
+    assert p.definitions['delimitedblocks']['paragraph'].calls == 3
+    assert not hasattr(spans.fragQuotes, '__wrapped__')
+    # Unprofiled renders call the installed wrappers without timing them.
+    with profiler.installed():
+        assert hasattr(spans.fragQuotes, '__wrapped__')
+        assert rimu.Renderer().render('# *Text*') == '<h1><em>Text</em></h1>'
+    assert p.phases['render'].calls == calls + 3
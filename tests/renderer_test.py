@@ -0,0 +1,86 @@
+import threading
+
+import pytest
+
+import rimu
+from rimu import document, macros, options, quotes, renderer
+
+
+def test_renderer():
+    r1 = rimu.Renderer()
+    r2 = rimu.Renderer()
+    assert r1.render("{x}='1'") == ''
+    assert r2.render("{x}='2'") == ''
+    assert r1.render('{x}') == '<p>1</p>'
+    assert r2.render('{x}') == '<p>2</p>'
+    # Renderer definitions are not visible to other renderers.
+    assert renderer.current() is renderer.default
+    rimu.render('', rimu.RenderOptions(reset=True))
+    assert macros.getValue('x') is None
+    with r1.activate():
+        assert renderer.current() is r1
+        assert macros.getValue('x') == '1'
+        assert options.safeMode == 0
+    assert renderer.current() is renderer.default
+
+
+def test_threads():
+    errors = []
+
+    def worker(n: int) -> None:
+        r = rimu.Renderer()
+        r.render(f"{{n}}='{n}'\n.safeMode='0'\n^='<sup>|</sup>'")
+        for i in range(50):
+            result = r.render(f'# {{n}}-{i}\n^x^', rimu.RenderOptions(safeMode=n % 2 * 8))
+            if result != f'<h1>{n}-{i}</h1>\n<p><sup>x</sup></p>':
+                errors.append(result)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+
+
+def test_snapshot():
+    base = rimu.Renderer()
+    base.render("{x}='1'\n^='<sup>|</sup>'\n/foo/='bar'\n|code|='<pre class=\"x\">|</pre>'")
+    preamble = base.snapshot()
+    assert base.snapshot() is preamble  # The definitions have not been updated.
+    with pytest.raises(AttributeError):
+        preamble.macroDefs = []
+    r1 = rimu.Renderer(preamble)
+    r2 = rimu.Renderer(preamble)
+    assert r1.render('{x} ^y^ foo') == '<p>1 <sup>y</sup> bar</p>'
+    # Updated definitions are copied and are not visible to the snapshot or other renderers.
+    r1.render("{x}='2'\n^='<b>|</b>'\n|code|='<pre>|</pre>'")
+    assert r1.render('{x} ^y^\n\n--\nz\n--') == '<p>2 <b>y</b></p>\n<pre>z</pre>'
+    assert r2.render('{x} ^y^\n\n--\nz\n--') == '<p>1 <sup>y</sup></p>\n<pre class="x">z</pre>'
+    assert base.render('{x} ^y^') == '<p>1 <sup>y</sup></p>'
+    r1.restore(preamble)
+    assert r1.render('{x} ^y^') == '<p>1 <sup>y</sup></p>'
+    r1.setMacros({'x': '3', 'y': '4'})
+    assert r1.render('{x}{y}') == '<p>34</p>'
+    assert r2.render('{x}{y}') == '<p>1{y}</p>'
+    # Resets restore the default definitions, not the snapshot definitions.
+    assert r2.render('{x}', rimu.RenderOptions(reset=True)) == '<p>{x}</p>'
+
+
+def test_resetRestoresDefaults():
+    rimu.render("{x}='1'\n^='<sup>|</sup>'", rimu.RenderOptions(reset=True))
+    assert macros.getValue('x') == '1'
+    rimu.render('', rimu.RenderOptions(reset=True))
+    assert macros.getValue('x') is None
+    assert quotes.defs is document.defaults().quoteDefs
+    assert quotes.quotesRe is document.defaults().quotesRe
+
+
+def test_copy():
+    r1 = rimu.Renderer()
+    r1.render("{x}='1'\n.safeMode='1'\n.cls\n")
+    r2 = r1.copy()
+    assert r2.safeMode == 1 and r2.classes == 'cls'
+    assert r2.render('{x}', rimu.RenderOptions(safeMode=0)) == '<p class="cls">1</p>'
+    assert r2.render("{x}='2'\n{x}") == '<p>2</p>'
+    assert r1.render('{x}') == '<p class="cls">1</p>'
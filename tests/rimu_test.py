@@ -1,7 +1,10 @@
+import io
 import json
 
+import pytest
+
 import rimu
-from rimu import options
+from rimu import options, replacements
 
 
 def unexpectedError(message: options.CallbackMessage) -> None:
@@ -12,7 +15,41 @@ def test_render():
     assert rimu.render('Hello World!') == '<p>Hello World!</p>'
 
 
-def test_jsonTests():
+def test_render_iter():
+    source = '# Title\n\nHello *World*!\n\n- Item\n'
+    chunks = list(rimu.render_iter(source))
+    assert chunks == ['<h1>Title</h1>\n', '<p>Hello <em>World</em>!</p>\n', '<ul><li>Item</li></ul>']
+    assert ''.join(chunks) == rimu.render(source)
+
+    # Stream source is read as it is needed.
+    class Stream(io.StringIO):
+        reads = 0
+
+        def read(self, size=-1):
+            self.reads += 1
+            return super().read(16 if size < 0 else min(size, 16))
+    stream = Stream(source * 100)
+    chunks = rimu.render_iter(stream)
+    assert next(chunks) == '<h1>Title</h1>\n'
+    assert stream.reads == 1
+    assert next(chunks) + ''.join(chunks) == rimu.render(source * 100)[len('<h1>Title</h1>\n'):]
+
+    # Renders during the iteration are independent, the renderer is updated when the iteration finishes.
+    r = rimu.Renderer()
+    chunks = r.render_iter("{x}='1'\n\n- {x}\n\n.cls\n# {x}")
+    assert next(chunks) == '<ul><li>1</li></ul>'
+    assert r.render('- {x}\n\n# Title') == '<ul><li>{x}</li></ul><h1>Title</h1>'
+    assert list(chunks) == ['<h1 class="cls">1</h1>']
+    assert r.render('{x}') == '<p>1</p>'
+    # Abandoned iterations do not update the renderer.
+    chunks = r.render_iter("{x}='2'\n\n{x}\n\nMore")
+    assert next(chunks) == '<p>2</p>\n'
+    del chunks
+    assert r.render('{x}') == '<p>1</p>'
+
+
+@pytest.mark.parametrize('engine', replacements.ENGINES)
+def test_jsonTests(engine):
     with open('./tests/rimu-tests.json') as f:
         data = json.load(f)
     for spec in data:
@@ -26,6 +63,7 @@ def test_jsonTests():
         renderOptions.safeMode = spec['options'].get('safeMode')
         renderOptions.htmlReplacement = spec['options'].get('htmlReplacement')
         renderOptions.reset = spec['options'].get('reset')
+        renderOptions.replacementsEngine = engine
         msg = ''
 
         def callback(message: rimu.CallbackMessage):
@@ -1,12 +1,21 @@
+import concurrent.futures
+import gzip
+import importlib
 import io
 import json
+import os
+import socket
 import sys
+import threading
 from typing import Any, Tuple, Union
 
 import pytest
 
+import rimu
 import rimuc
 from rimu import document
+from rimuc import client, layouts
+from rimuc import prelude as preludecache
 
 
 def execRimuc(capsys, monkeypatch=None, args=[], input='') -> Tuple[Any, Union[str, int, None]]:
@@ -32,6 +41,24 @@ def test_readResource():
     rimuc.readResource('manpage.txt')
 
 
+def test_lazyResources(capsys, monkeypatch):
+    resources = importlib.import_module('rimuc.resources')
+    assert sorted(resources.NAMES) == sorted(os.listdir('./src/rimuc/resources'))
+    resources.read.cache_clear()
+    captured, exitcode = execRimuc(capsys, monkeypatch, input='Hello')
+    assert exitcode == 0 and captured.out == '<p>Hello</p>'
+    assert resources.read.cache_info().currsize == 0  # No resources are read without a layout.
+    assert 'missing' not in rimuc.resources
+    assert len(rimuc.resources) == len(resources.NAMES)
+    # Compressed resources.
+    manpage = rimuc.readResource('manpage.txt')
+    resources.read.cache_clear()
+    monkeypatch.setattr(resources, 'loadData',
+                        lambda filename: gzip.compress(manpage.encode()) if filename.endswith('.gz') else None)
+    assert rimuc.readResource('manpage.txt') == manpage
+    resources.read.cache_clear()
+
+
 def test_helpCommand(capsys):
     captured, exitcode = execRimuc(capsys, args=['-h'])
     assert exitcode == 0
@@ -91,3 +118,194 @@ def test_jsonTests(capsys, monkeypatch):
                 assert output.startswith(expectedOutput)
             else:
                 raise Exception(description + ': illegal predicate: ' + predicate)
+
+
+def test_outDir(capsys, tmp_path):
+    sources = {'one': "# One\n\n{x}='1'\n{x} {title}", 'two': '# Two\n\n{x} {title}\n<b>two</b>'}
+    for name, source in sources.items():
+        (tmp_path / f'{name}.rmu').write_text(source)
+    files = [str(tmp_path / f'{name}.rmu') for name in sources]
+    options = ['--layout', 'sequel', '--title', 'Title', '--prepend', "{title}='Prepended'"]
+    for jobs in ['1', '2']:
+        outDir = tmp_path / f'jobs{jobs}'
+        captured, exitcode = execRimuc(capsys, args=options + ['--out-dir', str(outDir), '--jobs', jobs] + files)
+        assert exitcode == 1  # Undefined {x} macro in two.rmu.
+        # Each file is converted as if by a separate rimuc command.
+        for name in sources:
+            outfile = tmp_path / f'{name}.html'
+            execRimuc(capsys, args=options + ['--output', str(outfile), str(tmp_path / f'{name}.rmu')])
+            assert (outDir / f'{name}.html').read_text() == outfile.read_text()
+    captured, exitcode = execRimuc(capsys, args=['--jobs', '2'] + files)
+    assert exitcode == 1
+    assert captured.err.startswith('--jobs requires the --out-dir option')
+    captured, exitcode = execRimuc(capsys, args=['--out-dir', str(tmp_path), files[0], files[0]])
+    assert exitcode == 1
+    assert captured.err.startswith('duplicate output file')
+    # Output files that would overwrite source files are rejected before they are opened.
+    for args in [['-o', files[0], files[0]], ['--layout', 'plain', '--prepend-file', str(tmp_path / 'one.html'),
+                                              str(tmp_path / 'one.rmu')]]:
+        (tmp_path / 'one.html').write_text('<p>one</p>')
+        captured, exitcode = execRimuc(capsys, args=args)
+        assert exitcode == 1
+        assert captured.err.startswith('output file would overwrite source file')
+    assert (tmp_path / 'one.rmu').read_text() == sources['one']
+    assert (tmp_path / 'one.html').read_text() == '<p>one</p>'
+
+
+def test_cacheDir(capsys, tmp_path):
+    infile = tmp_path / 'doc.rmu'
+    infile.write_text('# Title\n\nHello *World*')
+    outputs = []
+    for _ in range(2):
+        outfile = tmp_path / 'doc.html'
+        execRimuc(capsys, args=['--cache-dir', str(tmp_path / 'cache'), '--layout', 'plain', str(infile)])
+        outputs.append(outfile.read_text())
+    assert outputs[0] == outputs[1]
+    assert (tmp_path / 'cache' / 'rimu-cache.sqlite').is_file()
+
+
+def test_server(capsys, tmp_path):
+    if not hasattr(socket, 'AF_UNIX'):
+        pytest.skip('Unix domain sockets are not available')
+    from rimuc.server import Server
+    address = str(tmp_path / 'rimuc.sock')
+    server = Server(address, jobs=2)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        response = client.request(address, ['--no-rimurc'], stdin='Hello *Rimu*!')
+        assert response == {'status': 0, 'stdout': '<p>Hello <em>Rimu</em>!</p>', 'stderr': ''}
+        # Requests do not share state.
+        response = client.request(address, ['--no-rimurc', '-p', "{x}='X'"], stdin='{x}')
+        assert response['stdout'] == '<p>X</p>'
+        response = client.request(address, ['--no-rimurc'], stdin='{x}')
+        assert response['status'] == 1
+        assert response['stderr'] == 'error: /dev/stdin: undefined macro: {x}: {x}\n'
+        # Preludes are kept in memory by the workers.
+        (tmp_path / 'prelude.rmu').write_text("{x}='Y'")
+        for _ in range(3):
+            response = client.request(address, ['--no-rimurc', '--prepend-file', 'prelude.rmu'],
+                                      stdin='{x}', cwd=str(tmp_path))
+            assert response == {'status': 0, 'stdout': '<p>Y</p>', 'stderr': ''}
+        (tmp_path / 'doc.rmu').write_text('# Title')
+        response = client.request(address, ['--no-rimurc', '--layout', 'plain', 'doc.rmu'], cwd=str(tmp_path))
+        assert response['status'] == 0
+        assert '<h1 id="title">Title</h1>' in (tmp_path / 'doc.html').read_text()
+        response = client.request(address, ['--server', address])
+        assert response == {'status': 1, 'stdout': '', 'stderr': '--server option cannot be used in server requests\n'}
+        # Concurrent requests.
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+            responses = list(executor.map(
+                lambda i: client.request(address, ['--no-rimurc'], stdin=f'Paragraph {i}'), range(8)))
+        assert [r['stdout'] for r in responses] == [f'<p>Paragraph {i}</p>' for i in range(8)]
+        # Client command.
+        captured, exitcode = execRimuc(capsys, args=['--client', address, '--no-rimurc', str(tmp_path / 'doc.rmu')])
+        assert exitcode == 0
+        assert captured.out == '<h1>Title</h1>'
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+    assert not os.path.exists(address)
+
+
+def test_readsStdin():
+    assert client.readsStdin([])
+    assert client.readsStdin(['--layout', 'plain', '--no-rimurc'])
+    assert client.readsStdin(['-o', 'doc.html', 'a.rmu', '-'])
+    assert not client.readsStdin(['--title', 'Title', 'a.rmu'])
+    assert not client.readsStdin(['--version'])
+
+
+def test_preludeCache(capsys, tmp_path):
+    prelude = tmp_path / 'prelude.rmu'
+    prelude.write_text("{x}='X'\n\n<hr>")
+    infile = tmp_path / 'doc.rmu'
+    infile.write_text('{x} {y}')
+    cache = tmp_path / 'cache'
+    args = ['--cache-dir', str(cache), '--prepend-file', str(prelude), '-p', "{y}='Y'", str(infile)]
+    captured, exitcode = execRimuc(capsys, args=args)
+    assert (exitcode, captured.out) == (0, '<hr>\n<p>X Y</p>')
+    files = list(cache.glob('prelude-*.json'))
+    assert len(files) == 1
+    # The cached prelude is loaded instead of rendering the prelude sources.
+    files[0].write_text(files[0].read_text().replace('"X"', '"cached"'))
+    captured, exitcode = execRimuc(capsys, args=args)
+    assert (exitcode, captured.out) == (0, '<hr>\n<p>cached Y</p>')
+    # Updated prelude sources are rendered again.
+    prelude.write_text("{x}='Z'")
+    captured, exitcode = execRimuc(capsys, args=args)
+    assert (exitcode, captured.out) == (0, '<p>Z Y</p>')
+    assert len(list(cache.glob('prelude-*.json'))) == 2
+    # Preludes that report messages are not cached.
+    prelude.write_text('{undefined}')
+    for _ in range(2):
+        captured, exitcode = execRimuc(capsys, args=args)
+        assert exitcode == 1
+        assert 'undefined macro' in captured.err
+    assert len(list(cache.glob('prelude-*.json'))) == 2
+    # Batch mode.
+    prelude.write_text("{x}='X'")
+    for _ in range(2):
+        captured, exitcode = execRimuc(capsys, args=args[:-1] + ['--out-dir', str(tmp_path / 'out'), str(infile)])
+        assert exitcode == 0
+        assert (tmp_path / 'out' / 'doc.html').read_text() == '<p>X Y</p>'
+    assert len(list(cache.glob('prelude-*.json'))) == 3
+
+
+def test_preludeMemory(capsys, monkeypatch, tmp_path):
+    monkeypatch.setattr(rimuc.rimuc, 'serving', True)
+    monkeypatch.setattr(preludecache, '_memory', {})
+    prelude = tmp_path / 'prelude.rmu'
+    prelude.write_text("{x}='X'\n\n<hr>")
+    args = ['--prepend-file', str(prelude), '-p', "{y}='Y'"]
+    captured, exitcode = execRimuc(capsys, monkeypatch, args=args, input='{x} {y}')
+    assert (exitcode, captured.out) == (0, '<hr>\n<p>X Y</p>')
+    assert len(preludecache._memory) == 1
+    # The prelude kept in memory is restored instead of rendering the prelude sources.
+    data, _ = next(iter(preludecache._memory.values()))
+    data['macroDefs'] = [[name, 'remembered' if value == 'X' else value] for name, value in data['macroDefs']]
+    captured, exitcode = execRimuc(capsys, monkeypatch, args=args, input='{x} {y}')
+    assert (exitcode, captured.out) == (0, '<hr>\n<p>remembered Y</p>')
+    # Updated prelude sources are rendered again.
+    prelude.write_text("{x}='Z'")
+    captured, exitcode = execRimuc(capsys, monkeypatch, args=args, input='{x} {y}')
+    assert (exitcode, captured.out) == (0, '<p>Z Y</p>')
+    assert len(preludecache._memory) == 2
+    # The least recently used preludes are discarded.
+    for i in range(preludecache.MEMORY_SIZE):
+        execRimuc(capsys, monkeypatch, args=['-p', f"{{y}}='{i}'"], input='{y}')
+    assert len(preludecache._memory) == preludecache.MEMORY_SIZE
+
+
+def test_layoutCache(tmp_path):
+    header = rimuc.readResource('sequel-header.rmu')
+    footer = rimuc.readResource('sequel-footer.rmu')
+
+    def render(cache, prelude):
+        r = rimu.Renderer()
+        r.render(prelude)
+        html = cache.render(r, 'sequel-header.rmu', header, rimu.RenderOptions(safeMode=0))
+        html += r.render('# Title')
+        html += cache.render(r, 'sequel-footer.rmu', footer, rimu.RenderOptions(safeMode=0))
+        return html
+
+    layouts._entries.clear()
+    cache = layouts.LayoutCache(str(tmp_path))
+    html = render(cache, "{--theme}='legend'")
+    assert (cache.hits, cache.misses) == (0, 2)
+    assert render(cache, "{--theme}='legend'") == html
+    assert (cache.hits, cache.misses) == (2, 2)
+    # Macros that are not referenced by the layout do not affect the key.
+    assert render(cache, "{--theme}='legend'\n\n{unused}='X'") == html
+    assert (cache.hits, cache.misses) == (4, 2)
+    # Styling macros do (the footer does not reference the theme).
+    assert render(cache, "{--theme}='graystone'") != html
+    assert (cache.hits, cache.misses) == (5, 3)
+    # On-disk entries.
+    layouts._entries.clear()
+    cache = layouts.LayoutCache(str(tmp_path))
+    assert render(cache, "{--theme}='legend'") == html
+    assert (cache.hits, cache.misses) == (2, 0)
+    assert len(list(tmp_path.glob('layout-*.json'))) == 3
+    layouts._entries.clear()
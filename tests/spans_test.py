@@ -1,9 +1,9 @@
 '''Basic rendering tests (full syntax tested in rimu_test.py).'''
 
-import re
-
 from rimu import options, quotes, replacements
-from rimu.spans import Fragment, defrag, fragQuote, fragReplacements, render
+from rimu.spans import (Fragment, defrag, fragQuote, fragReplacements,
+                        postReplacements, preReplacements, render,
+                        scanReplacements)
 
 
 def test_spans():
@@ -39,3 +39,69 @@ def test_spans():
     input = '<br>'
     output = render(input)
     assert output == '<br>'
+
+
+def test_singlePassReplacements():
+    options.init()
+    quotes.init()
+    replacements.init()
+    options.setOption('replacementsEngine', 'single-pass')
+    plan = replacements.singlePass(replacements.defs)
+    assert plan is not None
+
+    input = '[Link](http://example.com) x_y'
+    frags = scanReplacements(input, 0, replacements.defs, plan)
+    assert defrag(frags) == '<a href="http://example.com">Link</a> x_y'
+    assert [f.done for f in frags] == [False, True, False, True, False]
+
+    # The URL is truncated by the preceding (higher precedence) inline image.
+    input = 'http://example.com/<image:x.png>'
+    assert render(input) == '<a href="http://example.com/">http://example.com/</a><img src="x.png" alt="x.png">'
+
+    # The line-break matches at the end of the fragment preceding the escaped HTML tag.
+    input = r'Hello \\<b>x</b>'
+    assert render(input) == 'Hello<br>&lt;b&gt;x</b>'
+
+    # The plan is rebuilt when definitions are added.
+    replacements.setDefinition(r'\.{3}', '', '&hellip;')
+    plan = replacements.singlePass(replacements.defs)
+    assert plan is not None
+    assert len(plan.lookahead) == len(replacements.DEFAULT_DEFS) + 1
+    assert render('x... y_z') == 'x&hellip; y_z'
+
+    # Definitions with start of fragment assertions cannot be processed in a single pass.
+    replacements.setDefinition(r'^foo', '', 'bar')
+    assert replacements.singlePass(replacements.defs) is None
+    assert render('foo') == 'bar'
+
+
+def test_startAssertions():
+    options.init()
+    quotes.init()
+    replacements.init()
+    # Assertions that depend on the preceding text see the text following the previous replacement.
+    replacements.setDefinition(r'\bab', '', 'X')
+    assert render('abab ab') == 'XX X'
+    replacements.init()
+    replacements.setDefinition(r'\bfoo', '', 'X')
+    assert render('foofoo') == 'XX'
+    replacements.init()
+    replacements.setDefinition(r'(?<!b)b', '', 'X')
+    assert render('bb') == 'XX'
+    replacements.init()
+    replacements.setDefinition(r'^ab', '', 'X')
+    assert render('ababc ab') == 'XXc ab'
+
+
+def test_largeParagraphs():
+    # Stress test: large numbers of quotes and replacements do not exhaust the stack.
+    options.init()
+    quotes.init()
+    replacements.init()
+    input = 'Hello *Cruel* World! ' * 100000
+    assert render(input) == 'Hello <em>Cruel</em> World! ' * 100000
+    input = '**Hello** `Cruel` _World_! ' * 10000
+    assert render(input) == '<strong>Hello</strong> <code>Cruel</code> <em>World</em>! ' * 10000
+    input = '_a_ [b](c) ' * 10000
+    assert render(input) == '<em>a</em> <a href="c">b</a> ' * 10000
+
@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+import rimu
+from rimu import document, state
+
+PRELUDE = '''{macro}='*Macro*'
+
+~='<s>|</s>'
+
+/rimu/i='Rimu'
+
+|code|='<pre class="code">|</pre> +macros'
+
+.lead #intro
+'''
+
+
+def test_dumpLoad():
+    r = rimu.Renderer()
+    r.render(PRELUDE)
+    data = state.dump(r)
+    loaded = state.load(json.loads(json.dumps(data)))
+    assert state.dump(loaded) == data
+    source = '{macro} ~rimu~\n\n``\n{macro}\n``'
+    html = r.copy().render(source)
+    assert html == ('<p class="lead" id="intro"><em>Macro</em> <s>Rimu</s></p>\n'
+                    '<pre class="code">*Macro*</pre>')
+    assert loaded.render(source) == html
+
+
+def test_defaults():
+    loaded = state.load(state.dump(rimu.Renderer()))
+    defaults = document.defaults()
+    assert loaded.quoteDefs is defaults.quoteDefs
+    assert loaded.replacementDefs is defaults.replacementDefs
+    assert loaded.blockDefs is defaults.blockDefs
+    assert loaded.macroDefs is defaults.macroDefs
+    assert loaded.render('*Hello*') == '<p><em>Hello</em></p>'
+
+
+def test_invalid():
+    with pytest.raises(ValueError):
+        state.load({'format': 0})
+    data = state.dump(rimu.Renderer())
+    data['blockDefs'] = [['foo', '', '', [None] * 5]]
+    r = rimu.Renderer()
+    r.render("{x}='X'")
+    with pytest.raises(ValueError):
+        state.load(data, r)
+    assert r.render('{x}') == '<p>{x}</p>'  # The renderer is reset.